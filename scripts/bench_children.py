@@ -0,0 +1,103 @@
+"""
+Synthetic child processes for `scripts/benchmark.py`.
+
+    noisy: write --mb MB of lines of --line-length bytes to stdout, at --rate
+           MB/s (0: as fast as possible), then write own CPU times (JSON) to
+           --cpu-file
+    tree:  build a process tree of --depth levels with --fanout children per
+           node, all sleeping; with --ignore-term, nodes ignore SIGTERM
+
+Usage:
+    python scripts/bench_children.py noisy --mb 64 --rate 0 --line-length 100
+    python scripts/bench_children.py tree --depth 5 --fanout 2
+"""
+
+import argparse
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import time
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_chunk(line_length: int) -> bytes:
+    """About CHUNK_SIZE bytes of whole lines (at least one line)."""
+    n_lines = max(1, CHUNK_SIZE // line_length)
+    lines = []
+    for i in range(n_lines):
+        prefix = f"{i:08d} "
+        lines.append(
+            (prefix + "x" * max(0, line_length - len(prefix) - 1))[: line_length - 1]
+        )
+    return ("\n".join(lines) + "\n").encode()
+
+
+def noisy(args):
+    chunk = make_chunk(args.line_length)
+    total = int(args.mb * 1024 * 1024)
+    rate = args.rate * 1024 * 1024
+    view = memoryview(chunk)
+    written = 0
+    start = time.monotonic()
+    while written < total:
+        n = min(len(chunk), total - written)
+        offset = 0
+        while offset < n:
+            offset += os.write(1, view[offset:n])
+        written += n
+        if rate:
+            delay = start + written / rate - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    if args.cpu_file:
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        with open(args.cpu_file, "w") as f:
+            json.dump({"user": usage.ru_utime, "system": usage.ru_stime}, f)
+
+
+def tree(args):
+    if args.ignore_term:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    if args.depth > 1:
+        for _ in range(args.fanout):
+            child_args = [
+                sys.executable,
+                __file__,
+                "tree",
+                "--depth",
+                str(args.depth - 1),
+                "--fanout",
+                str(args.fanout),
+            ]
+            if args.ignore_term:
+                child_args.append("--ignore-term")
+            subprocess.Popen(child_args)
+    time.sleep(3600)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+    p = subparsers.add_parser("noisy")
+    p.add_argument("--mb", type=float, default=64, help="MB to write in total")
+    p.add_argument("--rate", type=float, default=0, help="MB/s (0: unlimited)")
+    p.add_argument("--line-length", type=int, default=100, help="Bytes per line")
+    p.add_argument("--cpu-file", help="Where to write own CPU times (JSON)")
+    p = subparsers.add_parser("tree")
+    p.add_argument("--depth", type=int, default=3, help="Levels of the tree")
+    p.add_argument("--fanout", type=int, default=1, help="Children per node")
+    p.add_argument("--ignore-term", action="store_true", help="Ignore SIGTERM")
+    args = parser.parse_args()
+    if args.kind == "noisy":
+        noisy(args)
+    else:
+        tree(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+"""
+Benchmark suite of dmon: log pipeline, CLI latency and large-fleet operations.
+
+Benchmarks (select with --only, comma-separated):
+
+- throughput: runner throughput (MB/s) and CPU per MB of its own, for a
+  synthetic child writing as fast as possible, per pipeline variant
+  (plain, timestamps, json, queue) and line length
+- rate: runner CPU per MB and CPU% for a child writing at a fixed MB/s
+- rotation: latency of a log rotation (with / without index, compression)
+- fleet: `dmon list` and `dmon status --all` wall time with 10/100/1000 fake
+  tasks (meta files of a few live processes)
+- cli: cold-start wall time of `dmon --version`, `--help` and `list`
+- stop: `dmon stop` wall time of a task with a deep process tree, and the
+  processes of the tree left running afterwards
+
+Results are printed and written as JSON (with the commit and platform) to
+--output; --compare prints the change of every number against an earlier
+JSON file, to spot regressions across commits.
+
+Usage:
+    python scripts/benchmark.py [--only throughput,fleet] [--quick] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+CHILDREN = Path(__file__).resolve().parent / "bench_children.py"
+sys.path.insert(0, str(SRC))
+
+import psutil  # noqa: E402
+
+from dmon.control import get_runner_command  # noqa: E402
+from dmon.runner import CONFIG_ENV, encode_options  # noqa: E402
+from dmon.types import DmonMeta  # noqa: E402
+
+
+BENCHMARKS = ["throughput", "rate", "rotation", "fleet", "cli", "stop"]
+MB = 1024 * 1024
+
+# pipeline variants of the runner: extra options of runner.main()
+VARIANTS = {
+    "plain": {},
+    "timestamps": {"timestamps": True},
+    "json": {"log_format": "json"},
+    "queue": {"queue_size": 4 * MB},
+}
+
+
+def dmon_env(tmp: Path):
+    return {
+        **os.environ,
+        "PYTHONPATH": str(SRC),
+        "DMON_STATE_DIR": str(tmp / "state"),  # keep the user's registry clean
+    }
+
+
+def run_dmon(args, cwd: Path, env) -> float:
+    """Run the dmon CLI and return its wall time in ms."""
+    t0 = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "dmon", *args],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return (time.perf_counter() - t0) * 1000
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_runner(tmp: Path, extra: dict, mb: float, rate: float, line_length: int):
+    """
+    Run the runner on a noisy child; return (wall seconds, runner CPU seconds).
+    """
+    cpu_file = tmp / "child-cpu.json"
+    options = {
+        "cmd": [
+            sys.executable,
+            str(CHILDREN),
+            "noisy",
+            "--mb",
+            str(mb),
+            "--rate",
+            str(rate),
+            "--line-length",
+            str(line_length),
+            "--cpu-file",
+            str(cpu_file),
+        ],
+        "log_path": str(tmp / "bench.log"),
+        "max_log_size": 1024 * MB,  # rotation is measured separately
+        "rotate_log_path": str(tmp / "bench.rotate.log"),
+        "max_rotate_log_size": 5 * MB,
+        "buffer_size": MB // 4,
+        "buffer_lines": 1000,
+        **extra,
+    }
+    env = {**os.environ, CONFIG_ENV: encode_options(options)}
+    cpu0 = children_cpu()
+    t0 = time.perf_counter()
+    subprocess.run(get_runner_command(), env=env, cwd=tmp)
+    wall = time.perf_counter() - t0
+    # the runner waits for the child, so its CPU time is counted too
+    cpu = children_cpu() - cpu0
+    with open(cpu_file) as f:
+        child = json.load(f)
+    for name in os.listdir(tmp):
+        if name.startswith("bench."):
+            os.unlink(tmp / name)
+    return wall, cpu - child["user"] - child["system"]
+
+
+def bench_throughput(args):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dmon-bench-") as tmp:
+        for variant, extra in VARIANTS.items():
+            for line_length in args.line_lengths:
+                samples = [
+                    run_runner(Path(tmp), extra, args.mb, 0, line_length)
+                    for _ in range(args.runs)
+                ]
+                wall = statistics.median(s[0] for s in samples)
+                cpu = statistics.median(s[1] for s in samples)
+                results[f"{variant}/{line_length}B"] = {
+                    "mb_per_s": round(args.mb / wall, 1),
+                    "cpu_ms_per_mb": round(cpu * 1000 / args.mb, 2),
+                }
+    return results
+
+
+def bench_rate(args):
+    mb = args.rate * args.rate_seconds
+    with tempfile.TemporaryDirectory(prefix="dmon-bench-") as tmp:
+        wall, cpu = run_runner(Path(tmp), {}, mb, args.rate, 100)
+    return {
+        f"{args.rate:g}MBps": {
+            "cpu_ms_per_mb": round(cpu * 1000 / mb, 2),
+            "cpu_percent": round(cpu / wall * 100, 1),
+        }
+    }
+
+
+def bench_rotation(args):
+    from dmon.pump import LogWriter
+
+    results = {}
+    chunk = (b"x" * 99 + b"\n") * 1000
+    for name, kwargs in {
+        "plain": {"index": False},
+        "index": {"index": True},
+        "index+compress": {"index": True, "compress": True},
+    }.items():
+        latencies = []
+        with tempfile.TemporaryDirectory(prefix="dmon-bench-") as tmp:
+            for i in range(args.rotations):
+                # a directory per rotation: rotated names have 1 s resolution
+                writer = LogWriter(str(Path(tmp) / str(i) / "bench.log"), 0, **kwargs)
+                for _ in range(args.rotation_mb * MB // len(chunk)):
+                    writer.write(chunk)
+                t0 = time.perf_counter()
+                writer.rotate()
+                latencies.append((time.perf_counter() - t0) * 1000)
+                writer.close()
+                # compression runs in the background; keep it out of the next one
+                for thread in threading.enumerate():
+                    if thread.name == "dmon-compress":
+                        thread.join()
+        results[name] = {
+            "median_ms": round(statistics.median(latencies), 3),
+            "max_ms": round(max(latencies), 3),
+        }
+    return results
+
+
+def make_fleet(meta_dir: Path, n: int, procs):
+    meta_dir.mkdir(parents=True)
+    for i in range(n):
+        proc = procs[i % len(procs)]
+        DmonMeta(
+            task=f"task-{i:04d}",
+            meta_path=str(meta_dir / f"task-{i:04d}.meta.json"),
+            log_path=str(meta_dir.parent / "logs" / f"task-{i:04d}.log"),
+            cmd=["sleep", "3600"],
+            cwd=str(meta_dir.parent),
+            pid=proc.pid,
+            create_time=psutil.Process(proc.pid).create_time(),
+            create_time_human="N/A",
+        ).dump(meta_dir / f"task-{i:04d}.meta.json")
+
+
+def bench_fleet(args):
+    results = {}
+    procs = [subprocess.Popen(["sleep", "3600"]) for _ in range(8)]
+    try:
+        for n in args.fleet_sizes:
+            with tempfile.TemporaryDirectory(prefix="dmon-bench-") as tmp:
+                tmp = Path(tmp)
+                make_fleet(tmp / ".dmon", n, procs)
+                env = dmon_env(tmp)
+                for name, cli_args in (
+                    ("list", ["list"]),
+                    ("status", ["status", "--all"]),
+                ):
+                    ms = statistics.median(
+                        run_dmon(cli_args, tmp, env) for _ in range(args.runs)
+                    )
+                    results[f"{name}/{n}"] = {"wall_ms": round(ms, 1)}
+    finally:
+        for proc in procs:
+            proc.kill()
+            proc.wait()
+    return results
+
+
+def bench_cli(args):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dmon-bench-") as tmp:
+        tmp = Path(tmp)
+        env = dmon_env(tmp)
+        for name, cli_args in (
+            ("version", ["--version"]),
+            ("help", ["--help"]),
+            ("list", ["list"]),
+        ):
+            ms = statistics.median(
+                run_dmon(cli_args, tmp, env) for _ in range(args.runs)
+            )
+            results[name] = {"wall_ms": round(ms, 1)}
+    return results
+
+
+def bench_stop(args):
+    results = {}
+    n_procs = sum(args.fanout**level for level in range(args.depth))
+    variants = {"cooperative": []}
+    if args.stubborn:
+        variants["stubborn"] = ["--ignore-term"]
+    for name, extra in variants.items():
+        samples = []
+        leftovers = []
+        for _ in range(args.stop_runs):
+            with tempfile.TemporaryDirectory(prefix="dmon-bench-") as tmp:
+                tmp = Path(tmp)
+                cmd = [
+                    sys.executable,
+                    str(CHILDREN),
+                    "tree",
+                    "--depth",
+                    str(args.depth),
+                    "--fanout",
+                    str(args.fanout),
+                    *extra,
+                ]
+                (tmp / "dmon.yaml").write_text(json.dumps({"tasks": {"tree": cmd}}))
+                env = dmon_env(tmp)
+                run_dmon(["start", "tree"], tmp, env)
+                meta = DmonMeta.load(tmp / ".dmon" / "tree.meta.json")
+                root = psutil.Process(meta.pid)
+                deadline = time.monotonic() + 30
+                while time.monotonic() < deadline:
+                    tree = [root, *root.children(recursive=True)]
+                    if len(tree) >= n_procs:
+                        break
+                    time.sleep(0.05)
+                samples.append(run_dmon(["stop", "tree"], tmp, env))
+                alive = [p for p in tree if p.is_running()]
+                leftovers.append(len(alive))
+                for p in alive:
+                    p.kill()
+        results[f"{name}/depth{args.depth}x{args.fanout}"] = {
+            "processes": n_procs,
+            "wall_ms": round(statistics.median(samples), 1),
+            "leftover_processes": max(leftovers),
+        }
+    return results
+
+
+def get_meta():
+    def git(*git_args):
+        proc = subprocess.run(
+            ["git", *git_args], cwd=ROOT, stdout=subprocess.PIPE, text=True
+        )
+        return proc.stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield f"{prefix}{key}", value
+
+
+def print_comparison(baseline: dict, current: dict):
+    old = dict(flatten(baseline["results"]))
+    print(f"\nCompared with {baseline['meta']['commit']} ({baseline['meta']['time']}):")
+    for key, value in flatten(current["results"]):
+        if key not in old:
+            continue
+        change = (value - old[key]) / old[key] * 100 if old[key] else 0
+        print(f"  {key:<50} {old[key]:>10g} -> {value:>10g} ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--only", help=f"Comma-separated benchmarks of {', '.join(BENCHMARKS)}"
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="Smaller sizes and fewer runs"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="Runs per measurement")
+    parser.add_argument(
+        "--mb", type=float, default=64, help="MB written per throughput run"
+    )
+    parser.add_argument(
+        "--line-lengths",
+        default="80,1000",
+        help="Comma-separated line lengths in bytes",
+    )
+    parser.add_argument(
+        "--rate", type=float, default=10, help="MB/s of the fixed-rate child"
+    )
+    parser.add_argument(
+        "--rate-seconds", type=float, default=3, help="Duration of the fixed-rate run"
+    )
+    parser.add_argument("--rotations", type=int, default=10, help="Rotations to time")
+    parser.add_argument("--rotation-mb", type=int, default=5, help="Segment size in MB")
+    parser.add_argument(
+        "--fleet-sizes",
+        default="10,100,1000",
+        help="Comma-separated numbers of fake tasks",
+    )
+    parser.add_argument(
+        "--depth", type=int, default=5, help="Depth of the process tree"
+    )
+    parser.add_argument("--fanout", type=int, default=2, help="Children per tree node")
+    parser.add_argument(
+        "--stop-runs", type=int, default=3, help="Runs of the stop benchmark"
+    )
+    parser.add_argument(
+        "--stubborn",
+        action="store_true",
+        help="Also stop a tree ignoring SIGTERM (slow)",
+    )
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Compare with the results in this JSON file")
+    args = parser.parse_args()
+
+    if args.quick:
+        args.runs = 3
+        args.mb = 16
+        args.rate_seconds = 1
+        args.rotations = 3
+        args.rotation_mb = 1
+        args.fleet_sizes = "10,100"
+        args.depth = 3
+        args.stop_runs = 1
+    args.line_lengths = [int(n) for n in args.line_lengths.split(",")]
+    args.fleet_sizes = [int(n) for n in args.fleet_sizes.split(",")]
+    selected = args.only.split(",") if args.only else BENCHMARKS
+    unknown = set(selected) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    functions = {
+        "throughput": bench_throughput,
+        "rate": bench_rate,
+        "rotation": bench_rotation,
+        "fleet": bench_fleet,
+        "cli": bench_cli,
+        "stop": bench_stop,
+    }
+    output = {"meta": get_meta(), "results": {}}
+    for name in BENCHMARKS:
+        if name not in selected:
+            continue
+        print(f"Running {name}...", file=sys.stderr)
+        output["results"][name] = functions[name](args)
+
+    print(json.dumps(output, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Compare `dmon grep` with a serial `zgrep` over a synthetic log history.
+
+The history (in a scratch directory) is made of rotated segments named like
+the runner does ('<log>.<YYYYmmdd-HHMMSS>'), half of them gzip-compressed with
+their index, plus a live log. Both tools count the lines matching a pattern;
+the counts must agree.
+
+Usage:
+    python scripts/grep_benchmark.py [--size-mb N] [--segments N] [--pattern P] [--json]
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+sys.path.insert(0, str(SRC))
+
+from dmon.logindex import INDEX_SUFFIX, IndexWriter, compress_segment  # noqa: E402
+
+
+WORDS = ["alpha", "beta", "gamma", "delta", "request", "handled", "user", "cache"]
+
+
+def write_segment(path: Path, size: int, rng: random.Random, start_time: float):
+    """Write a plain segment of about size bytes with its index."""
+    idx = IndexWriter(str(path) + INDEX_SUFFIX, str(path), every_seconds=float("inf"))
+    offset = lineno = 0
+    with path.open("wb") as f:
+        while offset < size:
+            lines = []
+            for _ in range(1000):
+                level = "ERROR" if rng.random() < 0.001 else "INFO"
+                words = " ".join(rng.choice(WORDS) for _ in range(8))
+                lines.append(f"{level} id={rng.randrange(10**9)} {words}\n")
+            data = "".join(lines).encode()
+            f.write(data)
+            offset += len(data)
+            lineno += len(lines)
+            idx.add(offset, lineno, start_time + offset / size)
+    idx.close()
+
+
+def make_history(tmp: Path, size_mb: int, n_segments: int) -> Path:
+    rng = random.Random(0)
+    log_path = tmp / "bench.log"
+    seg_size = size_mb * 1024 * 1024 // (n_segments + 1)
+    now = time.time() - n_segments * 60
+    for i in range(n_segments):
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now + i * 60))
+        seg = tmp / f"bench.log.{stamp}"
+        write_segment(seg, seg_size, rng, now + i * 60)
+        if i % 2 == 0:
+            compress_segment(seg)
+    write_segment(log_path, seg_size, rng, time.time())
+    return log_path
+
+
+def timed(cmd, env=None):
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, text=True, env=env)
+    return time.perf_counter() - start, proc.stdout
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=512, help="Total history size")
+    parser.add_argument("--segments", type=int, default=16, help="Rotated segments")
+    parser.add_argument("--pattern", default="ERROR id=1", help="Pattern to search")
+    parser.add_argument("--json", action="store_true", help="Output JSON results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="dmon-grep-bench-") as tmp:
+        log_path = make_history(Path(tmp), args.size_mb, args.segments)
+        (Path(tmp) / "dmon.yaml").write_text(
+            f'tasks:\n  bench:\n    cmd: "true"\n    log_path: "{log_path}"\n'
+        )
+        files = sorted(
+            str(p) for p in Path(tmp).glob("bench.log*") if p.suffix != INDEX_SUFFIX
+        )
+        env = {**os.environ, "PYTHONPATH": str(SRC)}
+        dmon_cmd = [sys.executable, "-m", "dmon", "grep", "-c"]
+        dmon_cmd += ["--config", tmp, "bench", args.pattern]
+        dmon_time, dmon_out = timed(dmon_cmd, env)
+
+        results = {
+            "size_mb": args.size_mb,
+            "files": len(files),
+            "dmon_grep_s": round(dmon_time, 3),
+            "dmon_grep_matches": int(dmon_out.strip() or 0),
+        }
+        if shutil.which("zgrep"):
+            # serial: one file after another
+            zgrep_time, zgrep_out = timed(["zgrep", "-c", "-E", args.pattern, *files])
+            counts = [line.rsplit(":", 1)[-1] for line in zgrep_out.splitlines()]
+            results["zgrep_s"] = round(zgrep_time, 3)
+            results["zgrep_matches"] = sum(int(c) for c in counts if c.isdigit())
+            results["speedup"] = round(zgrep_time / dmon_time, 2)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for key, value in results.items():
+            print(f"{key:<18} {value}")
+    if "zgrep_matches" in results:
+        sys.exit(0 if results["zgrep_matches"] == results["dmon_grep_matches"] else 1)
+
+
+if __name__ == "__main__":
+    main()
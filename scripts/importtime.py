@@ -0,0 +1,132 @@
+"""
+Track the import-time budget of each dmon subcommand.
+
+Every scenario runs the real CLI under `python -X importtime` in a scratch
+directory (with a throwaway `dmon.yaml`), sums the self time of all imports
+and checks the result against `importtime_budget.json`:
+
+- `max_ms`: upper bound of the median total import time
+- `forbidden`: modules that must never be imported by the subcommand
+
+Usage:
+    python scripts/importtime.py [--runs N] [--scale FACTOR] [--json]
+
+`--scale` multiplies every `max_ms` (useful on slow CI machines). Exits with
+non-zero status if any scenario is over budget.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+BUDGET_PATH = Path(__file__).resolve().parent / "importtime_budget.json"
+
+CONFIG = """\
+tasks:
+  noop: ["{python}", "-c", "import time; time.sleep(30)"]
+"""
+
+# (scenario name, CLI args); scenarios run in order in the same directory
+SCENARIOS = [
+    ("version", ["--version"]),
+    ("help", ["--help"]),
+    ("list", ["list"]),
+    ("status", ["status", "noop"]),
+    ("status-default", ["status"]),
+    ("start", ["start", "noop"]),
+    ("stop", ["stop", "noop"]),
+    ("exec", ["exec", "--config", "exec.yaml"]),
+]
+
+
+def parse_importtime(stderr: str):
+    """Return (total self time in ms, set of imported module names)."""
+    total_us = 0
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        total_us += int(parts[0])
+        modules.add(parts[2].strip())
+    return total_us / 1000, modules
+
+
+def run_scenario(args, cwd: Path):
+    env = {**os.environ, "PYTHONPATH": str(SRC)}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "dmon", *args],
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    return parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Runs per scenario")
+    parser.add_argument(
+        "--scale", type=float, default=1.0, help="Multiply all budgets by this"
+    )
+    parser.add_argument("--json", action="store_true", help="Output JSON results")
+    args = parser.parse_args()
+
+    budget = json.loads(BUDGET_PATH.read_text(encoding="utf-8"))
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dmon-importtime-") as tmp:
+        cwd = Path(tmp)
+        python = sys.executable.replace("\\", "/")
+        (cwd / "dmon.yaml").write_text(CONFIG.format(python=python))
+        (cwd / "exec.yaml").write_text(f'tasks:\n  noop: ["{python}", "-c", "pass"]\n')
+        timings = {name: [] for name, _ in SCENARIOS}
+        modules = {name: set() for name, _ in SCENARIOS}
+        for _ in range(args.runs):
+            for name, cli_args in SCENARIOS:
+                ms, mods = run_scenario(cli_args, cwd)
+                timings[name].append(ms)
+                modules[name] |= mods
+
+    failed = False
+    for name, _ in SCENARIOS:
+        spec = budget.get(name, {})
+        median = statistics.median(timings[name])
+        max_ms = spec.get("max_ms")
+        limit = max_ms * args.scale if max_ms is not None else None
+        bad_modules = sorted(set(spec.get("forbidden", [])) & modules[name])
+        ok = (limit is None or median <= limit) and not bad_modules
+        failed |= not ok
+        results[name] = {
+            "median_ms": round(median, 2),
+            "budget_ms": limit,
+            "forbidden_imported": bad_modules,
+            "ok": ok,
+        }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, res in results.items():
+            budget_str = f"{res['budget_ms']:.1f}" if res["budget_ms"] else "-"
+            line = f"{name:<16} {res['median_ms']:>8.2f} ms  (budget {budget_str} ms)"
+            if res["forbidden_imported"]:
+                line += f"  forbidden: {', '.join(res['forbidden_imported'])}"
+            print(("OK    " if res["ok"] else "FAIL  ") + line)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
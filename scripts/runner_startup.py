@@ -0,0 +1,177 @@
+"""
+Measure the startup latency and memory footprint of the dmon runner.
+
+The runner is launched like `dmon start` does (see `control.get_runner_command`),
+with a child that signals a FIFO as soon as it runs and then sleeps, and the
+time until the child runs is compared with spawning the same child directly.
+The runner's RSS is sampled once its pump is up. A separate `-X importtime`
+run checks that the runner never imports the FORBIDDEN modules.
+
+Usage:
+    python scripts/runner_startup.py [--runs N] [--max-overhead-ms MS] [--max-rss-mb MB] [--json]
+
+Exits with non-zero status if over budget.
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+
+ROOT = Path(__file__).resolve().parent.parent
+SRC = ROOT / "src"
+sys.path.insert(0, str(SRC))
+
+import psutil  # noqa: E402
+
+from dmon.control import get_runner_command  # noqa: E402
+from dmon.runner import CONFIG_ENV, encode_options  # noqa: E402
+
+
+FORBIDDEN = ["argparse", "logging", "logging.handlers", "datetime", "subprocess"]
+if sys.platform.startswith("win"):
+    FORBIDDEN.remove("subprocess")  # the runner spawns with it on Windows
+
+
+def runner_options(tmp: Path, cmd) -> dict:
+    return {
+        "cmd": cmd,
+        "log_path": str(tmp / "bench.log"),
+        "max_log_size": 5 * 1024 * 1024,
+        "rotate_log_path": str(tmp / "bench.rotate.log"),
+        "max_rotate_log_size": 5 * 1024 * 1024,
+        "sock_path": str(tmp / "bench.sock"),
+        "buffer_size": 256 * 1024,
+        "buffer_lines": 1000,
+    }
+
+
+def child_cmd(fifo: Path, sleep: float):
+    return ["sh", "-c", f'echo > "{fifo}"; exec sleep {sleep}']
+
+
+def wait_child(fifo: Path, t0: float) -> float:
+    # opening the FIFO for reading blocks until the child opens it
+    fd = os.open(fifo, os.O_RDONLY)
+    elapsed = time.perf_counter() - t0
+    os.read(fd, 16)
+    os.close(fd)
+    return elapsed * 1000
+
+
+def measure_direct(tmp: Path) -> float:
+    fifo = tmp / "fifo"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(child_cmd(fifo, 0))
+    ms = wait_child(fifo, t0)
+    proc.wait()
+    return ms
+
+
+def measure_runner(tmp: Path, command):
+    fifo = tmp / "fifo"
+    env = {
+        **os.environ,
+        CONFIG_ENV: encode_options(runner_options(tmp, child_cmd(fifo, 1))),
+    }
+    env["PYTHONPATH"] = str(SRC)  # for the non-isolated command
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(command, env=env, cwd=tmp)
+    ms = wait_child(fifo, t0)
+    # sample RSS once the pump and control socket are up
+    deadline = time.monotonic() + 5
+    while not (tmp / "bench.sock").exists() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    rss = psutil.Process(proc.pid).memory_info().rss / 1024 / 1024
+    proc.wait()
+    return ms, rss
+
+
+def imported_modules(tmp: Path, command):
+    fifo = tmp / "fifo"
+    os.unlink(fifo)
+    env = {**os.environ, CONFIG_ENV: encode_options(runner_options(tmp, ["true"]))}
+    env["PYTHONPATH"] = str(SRC)
+    command = [command[0], "-X", "importtime", *command[1:]]
+    proc = subprocess.run(command, env=env, cwd=tmp, stderr=subprocess.PIPE, text=True)
+    modules = set()
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if line.startswith("import time:") and len(parts) == 3:
+            modules.add(parts[2].strip())
+    os.mkfifo(fifo)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="Runs per variant")
+    parser.add_argument(
+        "--max-overhead-ms",
+        type=float,
+        default=60,
+        help="Budget of the median time added by the runner before the child runs",
+    )
+    parser.add_argument(
+        "--max-rss-mb", type=float, default=20, help="Budget of the median runner RSS"
+    )
+    parser.add_argument("--json", action="store_true", help="Output JSON results")
+    args = parser.parse_args()
+
+    variants = {
+        "start": get_runner_command(),  # what `dmon start` uses
+        "module": [sys.executable, "-m", "dmon.runner"],  # plain interpreter
+    }
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="dmon-runner-bench-") as tmp:
+        tmp = Path(tmp)
+        os.mkfifo(tmp / "fifo")
+        direct = statistics.median(measure_direct(tmp) for _ in range(args.runs))
+        results["direct_spawn_ms"] = round(direct, 2)
+        for name, command in variants.items():
+            samples = [measure_runner(tmp, command) for _ in range(args.runs)]
+            ms = statistics.median(s[0] for s in samples)
+            results[name] = {
+                "child_start_ms": round(ms, 2),
+                "overhead_ms": round(ms - direct, 2),
+                "rss_mb": round(statistics.median(s[1] for s in samples), 2),
+                "forbidden_imported": sorted(
+                    set(FORBIDDEN) & imported_modules(tmp, command)
+                ),
+            }
+
+    start = results["start"]
+    ok = (
+        start["overhead_ms"] <= args.max_overhead_ms
+        and start["rss_mb"] <= args.max_rss_mb
+        and not start["forbidden_imported"]
+    )
+    results["ok"] = ok
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"direct spawn     {results['direct_spawn_ms']:>8.2f} ms")
+        for name in variants:
+            res = results[name]
+            line = (
+                f"{name:<8} child starts after {res['child_start_ms']:>8.2f} ms "
+                f"(+{res['overhead_ms']:.2f} ms), RSS {res['rss_mb']:.2f} MB"
+            )
+            if res["forbidden_imported"]:
+                line += f", forbidden: {', '.join(res['forbidden_imported'])}"
+            print(line)
+        print(
+            ("OK" if ok else "FAIL")
+            + f" (budget: +{args.max_overhead_ms} ms, {args.max_rss_mb} MB)"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
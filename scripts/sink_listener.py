@@ -0,0 +1,119 @@
+"""
+Stand-in collector for the runner's network log sinks (`log_sinks`).
+
+Listens on a Unix datagram socket, a Unix stream socket or a TCP port, and
+prints every message received (decoding RFC 6587 octet-counted frames on
+streams), followed by a count on exit (Ctrl-C). With --slow, it sleeps after
+each read to simulate a collector that cannot keep up.
+
+Usage:
+    python scripts/sink_listener.py unix_dgram /tmp/dmon-sink.sock
+    python scripts/sink_listener.py unix_stream /tmp/dmon-sink.sock [--framing octet]
+    python scripts/sink_listener.py tcp 127.0.0.1:5140 [--quiet] [--slow 0.1]
+"""
+
+import argparse
+import os
+import socket
+import sys
+import threading
+import time
+
+
+count = 0
+lock = threading.Lock()
+
+
+def emit(msg: bytes, quiet: bool):
+    global count
+    with lock:
+        count += 1
+        if not quiet:
+            sys.stdout.write(msg.decode("utf-8", "replace").rstrip("\n") + "\n")
+            sys.stdout.flush()
+
+
+def split_frames(buf: bytes, framing: str):
+    """
+    Split complete messages off buf; return (messages, rest).
+    """
+    msgs = []
+    while buf:
+        if framing == "octet":
+            length, sep, rest = buf.partition(b" ")
+            if not sep:
+                break
+            n = int(length)
+            if len(rest) < n:
+                break
+            msgs.append(rest[:n])
+            buf = rest[n:]
+        else:
+            line, sep, rest = buf.partition(b"\n")
+            if not sep:
+                break
+            msgs.append(line)
+            buf = rest
+    return msgs, buf
+
+
+def serve_stream(conn: socket.socket, args):
+    buf = b""
+    with conn:
+        while True:
+            data = conn.recv(64 * 1024)
+            if not data:
+                break
+            msgs, buf = split_frames(buf + data, args.framing)
+            for msg in msgs:
+                emit(msg, args.quiet)
+            if args.slow:
+                time.sleep(args.slow)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("kind", choices=["unix_dgram", "unix_stream", "tcp"])
+    parser.add_argument("target", help="Socket path, or host:port for tcp")
+    parser.add_argument(
+        "--framing",
+        choices=["octet", "line"],
+        default="line",
+        help="Stream framing: 'octet' for rfc5424 sinks, 'line' for raw sinks",
+    )
+    parser.add_argument("--quiet", action="store_true", help="Only count messages")
+    parser.add_argument("--slow", type=float, default=0, help="Seconds to sleep per read")
+    args = parser.parse_args()
+
+    if args.kind == "tcp":
+        host, _, port = args.target.rpartition(":")
+        server = socket.create_server((host, int(port)))
+    else:
+        if os.path.exists(args.target):
+            os.unlink(args.target)
+        sock_type = socket.SOCK_DGRAM if args.kind == "unix_dgram" else socket.SOCK_STREAM
+        server = socket.socket(socket.AF_UNIX, sock_type)
+        server.bind(args.target)
+    print(f"Listening on {args.kind}:{args.target}", file=sys.stderr)
+
+    try:
+        if args.kind == "unix_dgram":
+            while True:
+                emit(server.recv(256 * 1024), args.quiet)
+                if args.slow:
+                    time.sleep(args.slow)
+        server.listen(8)
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=serve_stream, args=(conn, args), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if args.kind != "tcp":
+            os.unlink(args.target)
+        print(f"Received {count} messages", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
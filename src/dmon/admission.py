@@ -0,0 +1,202 @@
+"""
+Admission control of bulk starts (`dmon start --all`, `dmon restart @group`,
+...), against boot storms where every task initializes at the same time.
+
+Before each launch, the queue waits, in order:
+
+1. for a slot: at most `max_parallel` started tasks count as initializing,
+   each for `init_time` seconds after its launch (or until it exits), so
+   `init_time` must be positive for `max_parallel` to have an effect;
+2. for the stagger: `stagger` seconds plus up to `jitter` random seconds
+   since the previous launch;
+3. at the gate: while the 1-minute load average is above `max_load`, or
+   available memory is below `min_available_mb`, for up to `gate_timeout`
+   seconds (then the task is started anyway).
+
+A task that already has a meta file is not waited for, as its start fails
+right away. The load average lags behind a burst of launches, so the gate is
+best combined with a slot limit or a stagger. The time spent in each step is reported per
+task, to tune the settings.
+"""
+
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import psutil
+from termcolor import colored
+
+from .control import get_live_process
+from .types import DmonAdmission, DmonMeta
+
+
+POLL_INTERVAL = 0.1
+"""Seconds between checks of initializing tasks while waiting for a slot"""
+GATE_INTERVAL = 1.0
+"""Seconds between checks of load / memory at the gate"""
+WAITS = ("slot", "stagger", "gate")
+MIN_REPORTED_WAIT = 0.005
+"""Waits shorter than this are left out of the report"""
+
+
+class AdmissionRecord:
+    def __init__(self, task: str):
+        self.task = task
+        self.waits: Dict[str, float] = dict.fromkeys(WAITS, 0.0)
+        """Seconds waited in each step"""
+        self.start_seconds = 0.0
+        """Seconds the start itself took"""
+        self.ok = False
+
+
+def get_gate_reason(options: DmonAdmission) -> Optional[str]:
+    """
+    Why launches are held at the gate now, or None if they are not.
+    """
+    if options.max_load > 0:
+        load = psutil.getloadavg()[0]
+        if load > options.max_load:
+            return f"load average {load:.2f} > {options.max_load:g}"
+    if options.min_available_mb > 0:
+        available = psutil.virtual_memory().available / 1024 / 1024
+        if available < options.min_available_mb:
+            return (
+                f"available memory {available:.0f} MB < {options.min_available_mb:g} MB"
+            )
+    return None
+
+
+class AdmissionQueue:
+    def __init__(self, options: DmonAdmission):
+        self.options = options
+        self.initializing: List[Tuple[float, DmonMeta]] = []
+        """Deadline (monotonic) and meta of tasks counted as initializing"""
+        self.last_launch: Optional[float] = None
+        self.records: List[AdmissionRecord] = []
+        self.begin = time.monotonic()
+
+    def prune(self, now: float):
+        self.initializing = [
+            (deadline, meta)
+            for deadline, meta in self.initializing
+            if deadline > now and get_live_process(meta) is not None
+        ]
+
+    def wait_slot(self) -> float:
+        t0 = time.monotonic()
+        while self.options.max_parallel > 0:
+            now = time.monotonic()
+            self.prune(now)
+            if len(self.initializing) < self.options.max_parallel:
+                break
+            earliest = min(deadline for deadline, _ in self.initializing)
+            time.sleep(max(0.0, min(POLL_INTERVAL, earliest - now)))
+        return time.monotonic() - t0
+
+    def wait_stagger(self) -> float:
+        if self.last_launch is None:
+            return 0.0
+        delay = self.options.stagger + random.uniform(0, self.options.jitter)
+        remaining = self.last_launch + delay - time.monotonic()
+        if remaining <= 0:
+            return 0.0
+        time.sleep(remaining)
+        return remaining
+
+    def wait_gate(self, task: str) -> float:
+        t0 = time.monotonic()
+        timeout = self.options.gate_timeout
+        notified = False
+        while True:
+            reason = get_gate_reason(self.options)
+            if reason is None:
+                break
+            waited = time.monotonic() - t0
+            if timeout > 0 and waited >= timeout:
+                print(
+                    colored(
+                        f"Gate timeout after {waited:.1f} s ({reason}); starting '{task}' anyway",
+                        color="yellow",
+                        attrs=["bold"],
+                    ),
+                    file=sys.stderr,
+                )
+                break
+            if not notified:
+                print(
+                    colored(f"Holding '{task}': {reason}", color="yellow"),
+                    file=sys.stderr,
+                )
+                notified = True
+            time.sleep(GATE_INTERVAL)
+        return time.monotonic() - t0
+
+    def admit(self, task: str, wait: bool = True) -> AdmissionRecord:
+        """
+        Wait until the task may be launched; without waiting if wait is False
+        (e.g. the start is going to fail anyway, as the task is started).
+        """
+        record = AdmissionRecord(task)
+        if wait:
+            record.waits["slot"] = self.wait_slot()
+            record.waits["stagger"] = self.wait_stagger()
+            record.waits["gate"] = self.wait_gate(task)
+        self.records.append(record)
+        return record
+
+    def launched(
+        self, record: AdmissionRecord, meta: Optional[DmonMeta], start_seconds: float
+    ):
+        """
+        Record the result of a launch: the meta of the started task, or None if
+        it was not started (then it takes no slot).
+        """
+        record.start_seconds = start_seconds
+        record.ok = meta is not None
+        print_record(record, len(self.records))
+        if meta is None:
+            return
+        now = time.monotonic()
+        self.last_launch = now
+        if self.options.init_time > 0:
+            self.initializing.append((now + self.options.init_time, meta))
+
+    def report(self):
+        """
+        Print a summary of the waits of all tasks.
+        """
+        total = time.monotonic() - self.begin
+        started = sum(record.ok for record in self.records)
+        lines = [
+            f"[admission] started {started}/{len(self.records)} tasks in {total:.2f} s"
+        ]
+        for name in WAITS:
+            waits = [record.waits[name] for record in self.records]
+            if waits and max(waits) >= MIN_REPORTED_WAIT:
+                lines.append(
+                    f"  {name:<8} total {sum(waits):8.2f} s  max {max(waits):7.2f} s"
+                )
+        print(colored("\n".join(lines), color="cyan"), file=sys.stderr)
+
+
+def print_record(record: AdmissionRecord, index: int):
+    waited = sum(record.waits.values())
+    details = ", ".join(
+        f"{name} {seconds:.2f} s"
+        for name, seconds in record.waits.items()
+        if seconds >= MIN_REPORTED_WAIT
+    )
+    print(
+        colored(
+            f"[admission] #{index} '{record.task}': waited {waited:.2f} s"
+            + (f" ({details})" if details else "")
+            + (
+                f", started in {record.start_seconds * 1000:.1f} ms"
+                if record.ok
+                else ", not started"
+            ),
+            color="cyan",
+        ),
+        file=sys.stderr,
+    )
@@ -0,0 +1,387 @@
+"""
+Python API to manage dmon tasks in-process, without the CLI.
+
+Tasks are selected as with the CLI (names, glob patterns, '@group' references
+or tags) from the given config file, or dmon.yaml / pyproject.toml found from
+the current directory. Relative paths in the config are resolved against the
+current directory, as with the CLI. Results are returned as TaskResult /
+TaskStatus instead of being printed; invalid task selections still raise
+ValueError or TypeError.
+
+    from dmon.api import TaskManager
+
+    manager = TaskManager("dmon.yaml")
+    result = manager.start("web")
+    if not result.ok:
+        print(result.message)
+    print(manager.status("web").running)
+    manager.stop("web")
+
+AsyncTaskManager runs the same operations in a thread pool, so that a single
+asyncio controller can drive many tasks at once:
+
+    from dmon.api import AsyncTaskManager
+
+    async with AsyncTaskManager("dmon.yaml") as manager:
+        results = await manager.start_many(["worker-*"])
+        exited = await manager.wait_many(["worker-*"], timeout=60)
+        await manager.stop_many(all=True)
+
+Tasks started here run detached, like with `dmon start`, and can be managed
+with the CLI as well (and the other way round).
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import functools
+from pathlib import Path
+import time
+from typing import List, Optional, Sequence, Union
+
+import psutil
+
+from .config import fill_default_paths, get_task_config
+from .constants import DEFAULT_META_DIR, ON_WINDOWS
+from .control import (
+    ensure_meta_dir,
+    get_existing_meta,
+    get_meta_paths,
+    get_live_process,
+    launch_task,
+    remove_meta,
+    task_lock,
+    terminate_posix,
+    terminate_win,
+)
+from .statspage import read_stats
+from .types import DmonMeta, DmonTaskConfig, PathType, TaskResult, TaskStatus
+
+
+__all__ = ["TaskManager", "AsyncTaskManager", "TaskResult", "TaskStatus"]
+
+Selection = Union[Sequence[str], str, None]
+
+WAIT_INTERVAL = 0.1
+"""Seconds between checks when waiting for tasks to exit"""
+
+
+class TaskManager:
+    """
+    Start, stop and inspect the tasks of a dmon config. Methods are safe to
+    call from multiple threads; start / stop of the same task is serialized by
+    the task's lock (shared with the CLI).
+    """
+
+    def __init__(self, config: Optional[str] = None, timeout: float = 5.0):
+        self.config = config
+        """Path of the config file; None to search as the CLI does"""
+        self.timeout = timeout
+        """Default seconds to wait for a task to exit on stop before killing it"""
+
+    def get_configs(
+        self,
+        tasks: Selection = None,
+        all: bool = False,
+        tags: Optional[Sequence[str]] = None,
+    ) -> List[DmonTaskConfig]:
+        """
+        Get the configs of the selected tasks, with default meta / log paths
+        filled in. With no selection, the default (or only) task is used.
+        Raise ValueError or TypeError if the selection is invalid.
+        """
+        names, cfgs = get_task_config(tasks, self.config, all, tags=tags)
+        fill_default_paths(names, cfgs)
+        return cfgs
+
+    def get_config(self, task: Optional[str] = None) -> DmonTaskConfig:
+        cfgs = self.get_configs(task)
+        if len(cfgs) != 1:
+            raise ValueError(f"'{task}' selects {len(cfgs)} tasks; expected one")
+        return cfgs[0]
+
+    def start(self, task: Optional[str] = None) -> TaskResult:
+        return self.start_config(self.get_config(task))
+
+    def start_config(self, cfg: DmonTaskConfig) -> TaskResult:
+        """
+        Start a task from its config (see get_configs()). Like `dmon start`,
+        this fails if the task has a meta file, even if its process has
+        exited: stop() (or restart()) removes a stale meta file.
+        """
+        meta_path = Path(cfg.meta_path).resolve()
+        ensure_meta_dir(meta_path)
+        with task_lock(meta_path):
+            meta = get_existing_meta(meta_path)
+            if meta is not None:
+                if get_live_process(meta) is not None:
+                    message = f"already running (PID {meta.pid})"
+                else:
+                    message = (
+                        f"meta file already exists, but process {meta.pid} is not"
+                        " running; stop the task to remove the stale meta file"
+                    )
+                return TaskResult(cfg.task, False, message, meta)
+            try:
+                meta = launch_task(cfg)
+            except (OSError, RuntimeError, ValueError) as e:
+                return TaskResult(cfg.task, False, str(e))
+        return TaskResult(cfg.task, True, f"started (PID {meta.pid})", meta)
+
+    def stop(
+        self, task: Optional[str] = None, timeout: Optional[float] = None
+    ) -> TaskResult:
+        cfg = self.get_config(task)
+        return self.stop_meta(cfg.meta_path, timeout, task=cfg.task)
+
+    def stop_meta(
+        self,
+        meta_path: PathType,
+        timeout: Optional[float] = None,
+        task: str = "",
+    ) -> TaskResult:
+        """
+        Stop the task of a meta file: terminate it, kill it (and its children)
+        if it does not exit in time, and remove the meta file.
+        A stale meta file (process already exited) is removed, and reported
+        as not ok.
+        """
+        meta_path = Path(meta_path).resolve()
+        timeout = self.timeout if timeout is None else timeout
+        with task_lock(meta_path):
+            try:
+                meta = DmonMeta.load(meta_path)
+            except ValueError as e:
+                return TaskResult(task, False, str(e))
+            if meta is None:
+                return TaskResult(
+                    task, False, "meta file not found (maybe not started)"
+                )
+            task = meta.task or task
+            proc = get_live_process(meta)
+            if proc is None:
+                remove_meta(meta_path)
+                return TaskResult(
+                    task,
+                    False,
+                    f"process {meta.pid} not found (already exited); removed stale meta file",
+                    meta,
+                )
+
+            messages: List[str] = []
+
+            def notify(message: str, color: str):
+                messages.append(message)
+
+            try:
+                if ON_WINDOWS:
+                    ret = terminate_win(proc, timeout, notify=notify)
+                else:
+                    ret = terminate_posix(proc, timeout, notify=notify)
+            except psutil.NoSuchProcess:
+                ret = 0  # exited meanwhile
+                messages.append(f"Process {meta.pid} exited")
+            if ret == 0:
+                remove_meta(meta_path)
+        return TaskResult(task, ret == 0, "\n".join(messages), meta)
+
+    def restart(
+        self, task: Optional[str] = None, timeout: Optional[float] = None
+    ) -> TaskResult:
+        """
+        Stop the task if running, then start it.
+        """
+        cfg = self.get_config(task)
+        stopped = self.stop_meta(cfg.meta_path, timeout, task=cfg.task)
+        result = self.start_config(cfg)
+        if stopped.meta is not None:
+            result.message = f"{stopped.message}\n{result.message}"
+        return result
+
+    def status(self, task: Optional[str] = None) -> TaskStatus:
+        cfg = self.get_config(task)
+        return self.status_meta(cfg.meta_path, task=cfg.task)
+
+    def status_meta(self, meta_path: PathType, task: str = "") -> TaskStatus:
+        """
+        Get the status of the task of a meta file, with the runner's pump
+        counters if it has a stats page.
+        """
+        meta_path = Path(meta_path).resolve()
+        status = TaskStatus(task, str(meta_path))
+        try:
+            status.meta = DmonMeta.load(meta_path)
+        except ValueError as e:
+            status.error = str(e)
+        if status.meta is not None:
+            status.task = status.meta.task or task
+            status.running = get_live_process(status.meta) is not None
+            if status.meta.stats_path:
+                status.stats = read_stats(status.meta.stats_path)
+        return status
+
+    def list(self, dir: PathType = DEFAULT_META_DIR) -> List[TaskStatus]:
+        """
+        Get the status of all tasks with a meta file in the given directory.
+        """
+        return [
+            self.status_meta(meta_path) for meta_path in sorted(get_meta_paths(dir))
+        ]
+
+    def wait(self, task: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until the task's process exits (or is not started); return False
+        on timeout. The meta file of an exited task is kept (see stop()).
+        """
+        meta_path = self.get_config(task).meta_path
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.status_meta(meta_path).running:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(WAIT_INTERVAL)
+        return True
+
+
+class AsyncTaskManager:
+    """
+    asyncio variant of TaskManager: every operation runs in a thread pool of
+    at most `max_workers` threads, and the *_many() methods run them for many
+    tasks concurrently (returning results in selection order).
+    Use as `async with`, or call close() when done.
+    """
+
+    def __init__(
+        self,
+        config: Optional[str] = None,
+        timeout: float = 5.0,
+        max_workers: int = 32,
+    ):
+        self.manager = TaskManager(config, timeout)
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="dmon-api")
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Run a blocking function in the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def get_configs(
+        self,
+        tasks: Selection = None,
+        all: bool = False,
+        tags: Optional[Sequence[str]] = None,
+    ) -> List[DmonTaskConfig]:
+        return await self.run(self.manager.get_configs, tasks, all, tags)
+
+    async def start(self, task: Optional[str] = None) -> TaskResult:
+        return await self.run(self.manager.start, task)
+
+    async def start_many(
+        self,
+        tasks: Selection = None,
+        all: bool = False,
+        tags: Optional[Sequence[str]] = None,
+    ) -> List[TaskResult]:
+        cfgs = await self.get_configs(tasks, all, tags)
+        return list(
+            await asyncio.gather(
+                *(self.run(self.manager.start_config, cfg) for cfg in cfgs)
+            )
+        )
+
+    async def stop(
+        self, task: Optional[str] = None, timeout: Optional[float] = None
+    ) -> TaskResult:
+        return await self.run(self.manager.stop, task, timeout)
+
+    async def stop_many(
+        self,
+        tasks: Selection = None,
+        all: bool = False,
+        tags: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> List[TaskResult]:
+        cfgs = await self.get_configs(tasks, all, tags)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.run(self.manager.stop_meta, cfg.meta_path, timeout, cfg.task)
+                    for cfg in cfgs
+                )
+            )
+        )
+
+    async def restart(
+        self, task: Optional[str] = None, timeout: Optional[float] = None
+    ) -> TaskResult:
+        return await self.run(self.manager.restart, task, timeout)
+
+    async def status(self, task: Optional[str] = None) -> TaskStatus:
+        return await self.run(self.manager.status, task)
+
+    async def status_many(
+        self,
+        tasks: Selection = None,
+        all: bool = False,
+        tags: Optional[Sequence[str]] = None,
+    ) -> List[TaskStatus]:
+        cfgs = await self.get_configs(tasks, all, tags)
+        return list(
+            await asyncio.gather(
+                *(
+                    self.run(self.manager.status_meta, cfg.meta_path, cfg.task)
+                    for cfg in cfgs
+                )
+            )
+        )
+
+    async def list(self, dir: PathType = DEFAULT_META_DIR) -> List[TaskStatus]:
+        return await self.run(self.manager.list, dir)
+
+    async def wait_meta(self, meta_path: PathType, timeout: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while (await self.run(self.manager.status_meta, meta_path)).running:
+            if deadline is not None and loop.time() >= deadline:
+                return False
+            await asyncio.sleep(WAIT_INTERVAL)
+        return True
+
+    async def wait(
+        self, task: Optional[str] = None, timeout: Optional[float] = None
+    ) -> bool:
+        """
+        Wait until the task's process exits; return False on timeout.
+        """
+        cfg = await self.run(self.manager.get_config, task)
+        return await self.wait_meta(cfg.meta_path, timeout)
+
+    async def wait_many(
+        self,
+        tasks: Selection = None,
+        all: bool = False,
+        tags: Optional[Sequence[str]] = None,
+        timeout: Optional[float] = None,
+    ) -> List[bool]:
+        """
+        Wait until the processes of all selected tasks exit; return for each
+        whether it exited before the timeout.
+        """
+        cfgs = await self.get_configs(tasks, all, tags)
+        return list(
+            await asyncio.gather(
+                *(self.wait_meta(cfg.meta_path, timeout) for cfg in cfgs)
+            )
+        )
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+        return False
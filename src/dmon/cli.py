@@ -1,28 +1,20 @@
 import argparse
-from pathlib import Path
-import shlex
+import os
 import sys
+import time
 
-from colorama import just_fix_windows_console
-
-from .config import check_name_in_config, get_task_config
-from .control import (
-    execute,
-    get_meta_paths,
-    list_processes,
-    restart,
-    start,
-    stop,
-    status,
-)
+# NOTE: keep module-level imports minimal; subcommand handlers import what
+# they need lazily to keep CLI cold start fast (see scripts/importtime.py)
 from .constants import (
     DEFAULT_META_DIR,
     DEFAULT_RUN_NAME,
     LOG_PATH_TEMPLATE,
     META_PATH_TEMPLATE,
+    ON_WINDOWS,
+    PROFILE_ENV,
+    PROFILE_OUT_ENV,
     ROTATE_LOG_PATH_TEMPLATE,
 )
-from .types import DmonTaskConfig
 
 
 def get_version():
@@ -32,19 +24,352 @@ def get_version():
     return importlib.metadata.version("python-dmon")
 
 
+class LazyVersionAction(argparse.Action):
+    """
+    Like argparse's 'version' action, but only looks up the package version
+    when the option is actually given.
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, help=None):
+        super().__init__(
+            option_strings=option_strings,
+            dest=dest,
+            default=argparse.SUPPRESS,
+            nargs=0,
+            help=help or "show program's version number and exit",
+        )
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        parser.exit(message=get_version() + "\n")
+
+
+class DmonArgumentParser(argparse.ArgumentParser):
+    """
+    Top-level parser that only looks up the version when rendering help.
+    """
+
+    def format_help(self):
+        self.description = (
+            f"dmon v{get_version()} - Lightweight cross-platform daemon manager"
+        )
+        return super().format_help()
+
+
+def handle_start_restart(args, sp: argparse.ArgumentParser):
+    from .config import fill_default_paths, get_task_config
+
+    try:
+        tasks, task_cfgs = get_task_config(
+            args.task, args.config, args.all, tags=args.tag
+        )
+    except Exception as e:
+        sp.error(str(e))
+
+    # check if meta_file or log_file path is provided;
+    # if so, only one task should be specified
+    if args.meta_file or args.log_file:
+        if len(tasks) == 1:
+            task_cfgs[0].meta_path = args.meta_file or task_cfgs[0].meta_path
+            task_cfgs[0].log_path = args.log_file or task_cfgs[0].log_path
+        else:
+            sp.error(
+                f"'--meta-file' and '--log-file' can only be specified when {args.command}ing a single task"
+            )
+    fill_default_paths(tasks, task_cfgs)
+
+    from dataclasses import fields
+
+    from .types import DmonAdmission
+
+    admission = DmonAdmission(
+        max_parallel=args.max_parallel,
+        init_time=args.init_time,
+        stagger=args.stagger,
+        jitter=args.jitter,
+        max_load=args.max_load,
+        min_available_mb=args.min_available_mb,
+        gate_timeout=args.gate_timeout,
+    )
+    for fld in fields(admission):
+        if getattr(admission, fld.name) < 0:
+            sp.error(f"'--{fld.name.replace('_', '-')}' must be non-negative")
+    if admission.max_parallel and not admission.init_time:
+        sp.error("'--init-time' must be positive with '--max-parallel'")
+
+    from .control import restart, start
+
+    if args.command == "start":
+        return start(task_cfgs, admission)
+    else:
+        return restart(task_cfgs, admission=admission)
+
+
+def handle_exec(args, sp: argparse.ArgumentParser):
+    from .config import fill_default_paths, get_task_config
+
+    try:
+        tasks, task_cfgs = get_task_config(args.task, args.config)
+    except Exception as e:
+        sp.error(str(e))
+    if args.tee:
+        fill_default_paths(tasks, task_cfgs)
+
+    from .control import execute
+
+    return execute(task_cfgs[0], tee=args.tee)
+
+
+def is_selector(task: str) -> bool:
+    return task.startswith("@") or any(c in task for c in "*?[")
+
+
+def select_task_names(selectors, tags, cfg_path):
+    """
+    Resolve glob patterns, @groups and tags to task names.
+    Glob patterns match both configured tasks and tasks with meta files
+    (e.g. ad-hoc tasks started by 'dmon run').
+    """
+    from .config import is_pattern, load_compiled_config, match_pattern, select_tasks
+    from .constants import META_SUFFIX
+    from .control import get_meta_paths
+
+    cfg = None
+    if tags or any(not is_pattern(sel) for sel in selectors):
+        # groups and tags are only defined in config
+        cfg = load_compiled_config(cfg_path)
+    else:
+        try:
+            cfg = load_compiled_config(cfg_path)
+        except FileNotFoundError:
+            pass
+
+    meta_names = sorted(
+        p.name[: -len(META_SUFFIX)] for p in get_meta_paths(DEFAULT_META_DIR)
+    )
+    names = []
+    for selector in selectors:
+        matched = []
+        if is_pattern(selector):
+            matched = match_pattern(selector.lower(), meta_names)
+        if cfg is not None:
+            try:
+                matched.extend(select_tasks(cfg, [selector]))
+            except ValueError:
+                if not matched:
+                    raise
+        elif not matched:
+            raise ValueError(f"No task matches '{selector}' in {DEFAULT_META_DIR}")
+        names.extend(matched)
+    if tags:
+        assert cfg is not None
+        names.extend(select_tasks(cfg, [], tags))
+    return list(dict.fromkeys(names))
+
+
+def handle_stop_status(args, sp: argparse.ArgumentParser):
+    from pathlib import Path
+
+    meta_paths = []
+
+    # Collect meta paths from --all
+    if args.all:
+        from .control import get_meta_paths
+
+        meta_paths.extend(get_meta_paths(DEFAULT_META_DIR))
+
+    # Collect meta paths from --meta-file
+    if args.meta_file:
+        meta_paths.append(args.meta_file)
+
+    # Collect meta paths from task names
+    tasks = [task for task in args.task if not is_selector(task)]
+    meta_paths.extend([META_PATH_TEMPLATE.format(task=task) for task in tasks])
+
+    # Collect meta paths from glob patterns, @groups and --tag
+    selectors = [task for task in args.task if is_selector(task)]
+    if selectors or args.tag:
+        try:
+            tasks = select_task_names(selectors, args.tag, args.config)
+        except Exception as e:
+            sp.error(str(e))
+        meta_paths.extend([META_PATH_TEMPLATE.format(task=task) for task in tasks])
+
+    # If no meta paths collected, use default task
+    if len(meta_paths) == 0:
+        from .config import get_task_config
+
+        try:
+            tasks, _ = get_task_config(args.task, args.config)
+        except Exception as e:
+            sp.error(str(e))
+        meta_paths.extend([META_PATH_TEMPLATE.format(task=task) for task in tasks])
+
+    # Remove duplicates
+    unique_meta_paths = sorted(set(Path(p).resolve() for p in meta_paths))
+
+    if args.command == "stop":
+        from .control import stop
+
+        return stop(unique_meta_paths)
+    elif args.command == "rotate":
+        from .control import rotate
+
+        return rotate(unique_meta_paths, reopen=args.reopen)
+    else:
+        from .control import status
+
+        return status(unique_meta_paths, runner_stats=args.runner_stats)
+
+
+def parse_time_window(args, sp: argparse.ArgumentParser):
+    from .logs import parse_time
+
+    since = until = None
+    try:
+        if args.since:
+            since = parse_time(args.since)
+        if args.until:
+            until = parse_time(args.until)
+    except ValueError as e:
+        sp.error(str(e))
+    if since is not None and until is not None and since > until:
+        sp.error("'--since' must not be later than '--until'")
+    return since, until
+
+
+def handle_logs(args, sp: argparse.ArgumentParser):
+    from .logs import get_log_path, show_logs, show_recent
+
+    since, until = parse_time_window(args, sp)
+    if args.lines is not None and args.lines < 0:
+        sp.error("'--lines' must be non-negative")
+    if args.tail and (args.follow or since is not None or until is not None):
+        sp.error("'--tail' cannot be used with '--follow', '--since' or '--until'")
+    if args.follow and until is not None:
+        sp.error("'--follow' cannot be used with '--until'")
+
+    tasks = [task for task in args.task if not is_selector(task)]
+    selectors = [task for task in args.task if is_selector(task)]
+    try:
+        if selectors or args.tag:
+            tasks.extend(select_task_names(selectors, args.tag, args.config))
+        if len(tasks) == 0:
+            from .config import get_task_config
+
+            tasks, _ = get_task_config(None, args.config)
+    except Exception as e:
+        sp.error(str(e))
+
+    targets = [(task, get_log_path(task, args.config)) for task in dict.fromkeys(tasks)]
+    if args.tail:
+        return show_recent(targets, lines=args.lines)
+    return show_logs(
+        targets, lines=args.lines, follow=args.follow, since=since, until=until
+    )
+
+
+def handle_grep(args, sp: argparse.ArgumentParser):
+    import re
+
+    from .grep import compile_pattern, grep_logs
+    from .logs import get_log_path
+
+    since, until = parse_time_window(args, sp)
+    if args.jobs is not None and args.jobs < 1:
+        sp.error("'--jobs' must be positive")
+    try:
+        compile_pattern(args.pattern, args.ignore_case, args.fixed_strings)
+    except re.error as e:
+        sp.error(f"invalid pattern: {e}")
+    return grep_logs(
+        get_log_path(args.task, args.config),
+        args.pattern,
+        ignore_case=args.ignore_case,
+        fixed=args.fixed_strings,
+        count=args.count,
+        since=since,
+        until=until,
+        workers=args.jobs,
+    )
+
+
+def handle_list(args, sp: argparse.ArgumentParser):
+    if args.global_:
+        if args.dir:
+            sp.error("'--global' cannot be used with a directory")
+        from .control import list_global_processes
+
+        return list_global_processes(args.full)
+
+    from .control import list_processes
+
+    dir = args.dir or DEFAULT_META_DIR
+    return list_processes(dir, args.full)
+
+
+def handle_run(args, sp: argparse.ArgumentParser):
+    import shlex
+
+    from .config import check_name_in_config
+
+    if not args.name:
+        sp.error("Please provide a non-empty name for the task.")
+    elif check_name_in_config(args.name):
+        sp.error(
+            f"Task '{args.name}' already exists in config. Please choose another name."
+        )
+
+    from .control import start
+    from .types import DmonTaskConfig
+
+    task_cfg = DmonTaskConfig(
+        task=args.name,
+        cmd=shlex.join(args.command_list) if args.shell else args.command_list,
+        cwd=args.cwd,
+        meta_path=args.meta_file or META_PATH_TEMPLATE.format(task=args.name),
+        log_path=args.log_file or LOG_PATH_TEMPLATE.format(task=args.name),
+        log_rotate=args.log_rotate,
+        rotate_log_path=args.rotate_log_path
+        or ROTATE_LOG_PATH_TEMPLATE.format(task=args.name),
+    )
+    return start([task_cfg])
+
+
 def main():
-    just_fix_windows_console()
+    start = time.perf_counter()
+    # the profiling module is only imported when profiling is enabled
+    profiler = None
+    profile_out = os.environ.get(PROFILE_OUT_ENV)
+    if os.environ.get(PROFILE_ENV, "") not in ("", "0") or profile_out:
+        from .profiling import enable
+
+        profiler = enable(start, profile_out)
+
+    if ON_WINDOWS:
+        # ANSI colors only need fixing up on legacy Windows consoles
+        from colorama import just_fix_windows_console
 
-    parser = argparse.ArgumentParser(
+        just_fix_windows_console()
+
+    parser = DmonArgumentParser(
         prog="dmon",
-        description=f"dmon v{get_version()} - Lightweight cross-platform daemon manager",
+        description="dmon - Lightweight cross-platform daemon manager",
         # formatter_class=argparse.ArgumentDefaultsHelpFormatter,
     )
     parser.add_argument(
         "-v",
         "--version",
-        action="version",
-        version=get_version(),
+        action=LazyVersionAction,
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=f"Print per-phase timings to stderr (or set {PROFILE_ENV}=1)",
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="FILE",
+        help=f"Also dump cProfile stats to FILE, e.g. dmon.pstats (or set {PROFILE_OUT_ENV})",
     )
 
     subparsers = parser.add_subparsers(dest="command")
@@ -58,7 +383,7 @@ def main():
     )
     sp_start.add_argument(
         "task",
-        help="Configured task name (default: the only task if there's just one)",
+        help="Configured task name, glob pattern (e.g. 'worker-*') or @group (default: the only task if there's just one)",
         nargs="*",
     )
     sp_start.add_argument(
@@ -80,7 +405,7 @@ def main():
     )
     sp_stop.add_argument(
         "task",
-        help="Configured task name (default: the only task if there's just one)",
+        help="Configured task name, glob pattern (e.g. 'worker-*') or @group (default: the only task if there's just one)",
         nargs="*",
     )
     sp_stop.add_argument("--meta-file", help="Path to meta file")
@@ -99,7 +424,7 @@ def main():
     )
     sp_restart.add_argument(
         "task",
-        help="Configured task name (default: the only task if there's just one)",
+        help="Configured task name, glob pattern (e.g. 'worker-*') or @group (default: the only task if there's just one)",
         nargs="*",
     )
     sp_restart.add_argument(
@@ -121,7 +446,7 @@ def main():
     )
     sp_status.add_argument(
         "task",
-        help="Configured task name (default: the only task if there's just one)",
+        help="Configured task name, glob pattern (e.g. 'worker-*') or @group (default: the only task if there's just one)",
         nargs="*",
     )
     sp_status.add_argument(
@@ -134,6 +459,34 @@ def main():
         action="store_true",
         help=f"Check status of all processes in meta dir ({DEFAULT_META_DIR})",
     )
+    sp_status.add_argument(
+        "--runner-stats",
+        action="store_true",
+        help="Also query per-stream, log queue / latency and sink counters from runners over their control sockets (default: False)",
+    )
+
+    # rotate subcommand
+    sp_rotate = subparsers.add_parser(
+        "rotate",
+        help="Rotate log files of background process(es) now",
+        description="Rotate log files of background process(es) started with the runner now, at a line boundary, or only reopen them (e.g. after logrotate renamed them)",
+    )
+    sp_rotate.add_argument(
+        "task",
+        help="Configured task name, glob pattern (e.g. 'worker-*') or @group (default: the only task if there's just one)",
+        nargs="*",
+    )
+    sp_rotate.add_argument("--meta-file", help="Path to meta file")
+    sp_rotate.add_argument(
+        "--all",
+        action="store_true",
+        help=f"Rotate log files of all processes in meta dir ({DEFAULT_META_DIR})",
+    )
+    sp_rotate.add_argument(
+        "--reopen",
+        action="store_true",
+        help="Only reopen the log files, like SIGHUP to the runner (default: False)",
+    )
 
     # list subcommand
     sp_list = subparsers.add_parser(
@@ -152,6 +505,13 @@ def main():
         action="store_true",
         help="Show full width without truncating column (default: False)",
     )
+    sp_list.add_argument(
+        "-g",
+        "--global",
+        dest="global_",
+        action="store_true",
+        help="List live tasks of all directories from the per-user registry (default: False)",
+    )
 
     # run subcommand
     sp_run = subparsers.add_parser(
@@ -198,6 +558,85 @@ def main():
         help="Command (with args) to run",
     )
 
+    # logs subcommand
+    sp_logs = subparsers.add_parser(
+        "logs",
+        help="Show logs of task(s)",
+        description="Show logs of task(s), including rotated log files",
+    )
+    sp_logs.add_argument(
+        "task",
+        help="Task name, glob pattern (e.g. 'worker-*') or @group (default: the only task if there's just one)",
+        nargs="*",
+    )
+    sp_logs.add_argument(
+        "-n",
+        "--lines",
+        type=int,
+        help="Number of last lines to show (default: 10, or all lines with '--since'/'--until')",
+    )
+    sp_logs.add_argument(
+        "-f",
+        "--follow",
+        action="store_true",
+        help="Keep printing new lines, following log rotation (default: False)",
+    )
+    sp_logs.add_argument(
+        "--since",
+        help="Only show logs since this time, e.g. '10m', '2h', '03:10', '2026-01-01 03:10'",
+    )
+    sp_logs.add_argument(
+        "--until",
+        help="Only show logs until this time (same formats as '--since')",
+    )
+    sp_logs.add_argument(
+        "-t",
+        "--tail",
+        action="store_true",
+        help="Fetch the last lines from the runner's in-memory buffer instead of log files (default: False)",
+    )
+
+    # grep subcommand
+    sp_grep = subparsers.add_parser(
+        "grep",
+        help="Search logs of a task",
+        description="Search the whole log history of a task (live, rotated and compressed log files) in parallel, printing matching lines in chronological order",
+    )
+    sp_grep.add_argument("task", help="Task name")
+    sp_grep.add_argument("pattern", help="Regular expression (Python syntax)")
+    sp_grep.add_argument(
+        "-i",
+        "--ignore-case",
+        action="store_true",
+        help="Ignore case (default: False)",
+    )
+    sp_grep.add_argument(
+        "-F",
+        "--fixed-strings",
+        action="store_true",
+        help="Treat the pattern as a literal string (default: False)",
+    )
+    sp_grep.add_argument(
+        "-c",
+        "--count",
+        action="store_true",
+        help="Only print the number of matching lines (default: False)",
+    )
+    sp_grep.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+    sp_grep.add_argument(
+        "--since",
+        help="Only search logs since this time (same formats as 'logs --since')",
+    )
+    sp_grep.add_argument(
+        "--until",
+        help="Only search logs until this time (same formats as 'logs --since')",
+    )
+
     sp_exec = subparsers.add_parser(
         "exec",
         help="Execute a configured task in the foreground",
@@ -208,109 +647,124 @@ def main():
         help="Configured task name (default: the only task if there's just one)",
         nargs="?",
     )
+    sp_exec.add_argument(
+        "--tee",
+        action="store_true",
+        help="Also write the output to the task's log file(s) like 'dmon start', with rotation and the other log options (default: False)",
+    )
 
     # add custom config file option
-    for sp in [sp_start, sp_stop, sp_restart, sp_status, sp_exec]:
+    for sp in [
+        sp_start,
+        sp_stop,
+        sp_restart,
+        sp_status,
+        sp_rotate,
+        sp_logs,
+        sp_grep,
+        sp_exec,
+    ]:
         sp.add_argument(
             "--config",
             help="Path to config file or the directory containing it (default: search from current directory upwards)",
         )
 
-    args = parser.parse_args()
+    # add admission control options for bulk starts
+    for sp in [sp_start, sp_restart]:
+        group = sp.add_argument_group(
+            "admission control",
+            "Pace the start of multiple tasks, e.g. 'dmon start --all' after a reboot",
+        )
+        group.add_argument(
+            "--max-parallel",
+            type=int,
+            default=0,
+            metavar="N",
+            help="Max tasks initializing at the same time (default: 0, unlimited)",
+        )
+        group.add_argument(
+            "--init-time",
+            type=float,
+            default=10.0,
+            metavar="SECONDS",
+            help="Seconds a started task counts as initializing for --max-parallel, unless it exits earlier; must be positive (default: 10)",
+        )
+        group.add_argument(
+            "--stagger",
+            type=float,
+            default=0.0,
+            metavar="SECONDS",
+            help="Min seconds between two launches (default: 0)",
+        )
+        group.add_argument(
+            "--jitter",
+            type=float,
+            default=0.0,
+            metavar="SECONDS",
+            help="Max random seconds added to each stagger (default: 0)",
+        )
+        group.add_argument(
+            "--max-load",
+            type=float,
+            default=0.0,
+            metavar="LOAD",
+            help="Hold launches while the 1-minute load average is above this (default: 0, no gate)",
+        )
+        group.add_argument(
+            "--min-available-mb",
+            type=float,
+            default=0.0,
+            metavar="MB",
+            help="Hold launches while available memory is below this many MB (default: 0, no gate)",
+        )
+        group.add_argument(
+            "--gate-timeout",
+            type=float,
+            default=300.0,
+            metavar="SECONDS",
+            help="Max seconds to hold a launch for --max-load / --min-available-mb, then start it anyway (default: 300, 0: no limit)",
+        )
 
-    if args.command in ["start", "restart"]:
-        sp = sp_start if args.command == "start" else sp_restart
-        try:
-            tasks, task_cfgs = get_task_config(args.task, args.config, args.all)
-        except Exception as e:
-            sp.error(str(e))
+    # add tag selection option
+    for sp in [sp_start, sp_stop, sp_restart, sp_status, sp_rotate, sp_logs]:
+        sp.add_argument(
+            "--tag",
+            action="append",
+            default=[],
+            help="Select tasks with this tag (can be repeated)",
+        )
 
-        # check if meta_file or log_file path is provided;
-        # if so, only one task should be specified
-        if args.meta_file or args.log_file:
-            if len(tasks) == 1:
-                task_cfgs[0].meta_path = args.meta_file or task_cfgs[0].meta_path
-                task_cfgs[0].log_path = args.log_file or task_cfgs[0].log_path
-            else:
-                sp.error(
-                    f"'--meta-file' and '--log-file' can only be specified when {args.command}ing a single task"
-                )
-        # fill in default values if not provided
-        for task, task_cfg in zip(tasks, task_cfgs):
-            task_cfg.meta_path = task_cfg.meta_path or META_PATH_TEMPLATE.format(
-                task=task
-            )
-            task_cfg.log_path = task_cfg.log_path or LOG_PATH_TEMPLATE.format(task=task)
-            task_cfg.rotate_log_path = (
-                task_cfg.rotate_log_path or ROTATE_LOG_PATH_TEMPLATE.format(task=task)
-            )
-        if args.command == "start":
-            sys.exit(start(task_cfgs))
-        else:
-            sys.exit(restart(task_cfgs))
-    elif args.command == "exec":
-        try:
-            _, task_cfgs = get_task_config(args.task, args.config)
-        except Exception as e:
-            sp_exec.error(str(e))
-        sys.exit(execute(task_cfgs[0]))
-    elif args.command in ["stop", "status"]:
-        sp = sp_stop if args.command == "stop" else sp_status
-        meta_paths = []
-
-        # Collect meta paths from --all
-        if args.all:
-            meta_paths.extend(get_meta_paths(DEFAULT_META_DIR))
-
-        # Collect meta paths from --meta-file
-        if args.meta_file:
-            meta_paths.append(args.meta_file)
-
-        # Collect meta paths from task names
-        if len(args.task) > 0:
-            tasks = args.task
-            meta_paths.extend([META_PATH_TEMPLATE.format(task=task) for task in tasks])
-
-        # If no meta paths collected, use default task
-        if len(meta_paths) == 0:
-            try:
-                tasks, _ = get_task_config(args.task, args.config)
-            except Exception as e:
-                sp.error(str(e))
-            meta_paths.extend([META_PATH_TEMPLATE.format(task=task) for task in tasks])
+    args = parser.parse_args()
 
-        # Remove duplicates
-        unique_meta_paths = sorted(set(Path(p).resolve() for p in meta_paths))
+    if args.profile or args.profile_out:
+        from .profiling import enable
 
-        if args.command == "stop":
-            sys.exit(stop(unique_meta_paths))
-        else:
-            sys.exit(status(unique_meta_paths))
-    elif args.command == "list":
-        dir = args.dir or DEFAULT_META_DIR
-        sys.exit(list_processes(dir, args.full))
-    elif args.command == "run":
-        if not args.name:
-            sp_run.error("Please provide a non-empty name for the task.")
-        elif check_name_in_config(args.name):
-            sp_run.error(
-                f"Task '{args.name}' already exists in config. Please choose another name."
-            )
+        profiler = enable(start, args.profile_out)
+    if profiler is not None:
+        profiler.add("parse_args", time.perf_counter() - start)
 
-        task_cfg = DmonTaskConfig(
-            task=args.name,
-            cmd=shlex.join(args.command_list) if args.shell else args.command_list,
-            cwd=args.cwd,
-            meta_path=args.meta_file or META_PATH_TEMPLATE.format(task=args.name),
-            log_path=args.log_file or LOG_PATH_TEMPLATE.format(task=args.name),
-            log_rotate=args.log_rotate,
-            rotate_log_path=args.rotate_log_path
-            or ROTATE_LOG_PATH_TEMPLATE.format(task=args.name),
-        )
-        sys.exit(start([task_cfg]))
-    else:
+    handlers = {
+        "start": (handle_start_restart, sp_start),
+        "restart": (handle_start_restart, sp_restart),
+        "exec": (handle_exec, sp_exec),
+        "stop": (handle_stop_status, sp_stop),
+        "status": (handle_stop_status, sp_status),
+        "rotate": (handle_stop_status, sp_rotate),
+        "list": (handle_list, sp_list),
+        "logs": (handle_logs, sp_logs),
+        "grep": (handle_grep, sp_grep),
+        "run": (handle_run, sp_run),
+    }
+    if args.command not in handlers:
         parser.print_help()
         sys.exit(1)
+    handler, sp = handlers[args.command]
+    try:
+        ret = handler(args, sp)
+    finally:
+        if profiler is not None:
+            profiler.report()
+    sys.exit(ret)
 
 
 if __name__ == "__main__":
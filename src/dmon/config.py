@@ -1,35 +1,66 @@
+from bisect import bisect_left
+from dataclasses import asdict, fields
+import fnmatch
+import marshal
+import os
+import re
 import sys
 from pathlib import Path
-from typing import Dict, List, Optional, Sequence, Tuple, Union, cast
-
-if sys.version_info >= (3, 11):
-    import tomllib
-else:
-    import tomli as tomllib
-
-from .types import CmdType, DmonTaskConfig
-
-
-def search_config(start_dir: Path, recursive: bool) -> Optional[Path]:
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union, cast
+
+from .constants import (
+    CONFIG_CACHE_ENV,
+    CONFIG_CACHE_MAX_ENTRIES,
+    CONFIG_CACHE_PATH,
+    CONFIG_CACHE_VERSION,
+    DEFAULT_META_DIR,
+    FLUSH_POLICIES,
+    FSYNC_POLICIES,
+    LAUNCHERS,
+    LOG_FORMATS,
+    LOG_PATH_TEMPLATE,
+    META_PATH_TEMPLATE,
+    OVERFLOW_POLICIES,
+    ROTATE_LOG_PATH_TEMPLATE,
+    SINK_FORMATS,
+    SINK_TYPES,
+    STDERR_MODES,
+)
+from .profiling import phase, timed
+from .types import CmdType, DmonConfig, DmonTaskConfig
+from .utils import get_tmp_path, parse_policy
+
+
+CONFIG_FILENAMES = ["dmon.yaml", "dmon.yml", "pyproject.toml"]
+
+
+def search_config(
+    start_dir: Path, recursive: bool, searched: Optional[List[Path]] = None
+) -> Optional[Path]:
     """
     Search for dmon.yaml, dmon.yml, or pyproject.toml from the given directory upwards.
     Return the path if found, None otherwise.
+    If 'searched' is given, every directory looked into is appended to it.
     """
     current = start_dir.resolve()
     directories = [current] if not recursive else [current, *current.parents]
     for parent in directories:
-        for filename in ["dmon.yaml", "dmon.yml", "pyproject.toml"]:
+        if searched is not None:
+            searched.append(parent)
+        for filename in CONFIG_FILENAMES:
             path = parent / filename
             if path.is_file():
                 return path
     return None
 
 
-def load_config(cfg_path: Optional[str] = None):
+def locate_config(cfg_path: Optional[str] = None) -> Tuple[Path, List[Path]]:
     """
-    Load configuration from the given path, or search it from the current working directory upwards.
+    Locate the config file from the given path, or search it from the current working directory upwards.
+    Return the config file path, and the list of paths (searched directories and the file itself)
+    whose modification may change the result.
     """
-
+    deps: List[Path] = []
     if cfg_path:
         # Load configuration from the given path
         path = Path(cfg_path).resolve()
@@ -39,7 +70,7 @@ def load_config(cfg_path: Optional[str] = None):
             )
         elif path.is_dir():
             # If it's a directory, search for config files in it
-            result = search_config(path, recursive=False)
+            result = search_config(path, recursive=False, searched=deps)
             if not result:
                 raise FileNotFoundError(
                     f"No dmon.yaml or pyproject.toml found in directory '{path}'."
@@ -47,24 +78,45 @@ def load_config(cfg_path: Optional[str] = None):
             path = result
     else:
         # No path provided, search from the current working directory upwards
-        path = search_config(Path.cwd(), recursive=True)
-        if not path:
+        result = search_config(Path.cwd(), recursive=True, searched=deps)
+        if not result:
             raise FileNotFoundError(
                 "No dmon.yaml or pyproject.toml found in current or any parent directory."
             )
+        path = result
+    deps.append(path)
+    return path, deps
+
 
+def parse_config(path: Path) -> dict:
+    """
+    Parse the dmon section of the given YAML or TOML config file.
+    """
     if path.suffix in [".yaml", ".yml"]:
         import yaml
 
         with path.open("r", encoding="utf-8") as f:
             cfg = yaml.safe_load(f)
     elif path.suffix == ".toml":
+        if sys.version_info >= (3, 11):
+            import tomllib
+        else:
+            import tomli as tomllib
+
         with path.open("rb") as f:
             cfg = tomllib.load(f)
         cfg = cfg.get("tool", {}).get("dmon", {})
     else:
         raise ValueError("Config file must be YAML (.yaml/.yml) or TOML (.toml)")
-    return cfg, path
+    return cfg or {}
+
+
+def load_config(cfg_path: Optional[str] = None):
+    """
+    Load configuration from the given path, or search it from the current working directory upwards.
+    """
+    path, _ = locate_config(cfg_path)
+    return parse_config(path), path
 
 
 def validate_cmd_type(cmd, name: str) -> CmdType:
@@ -81,6 +133,45 @@ def validate_cmd_type(cmd, name: str) -> CmdType:
         )
 
 
+def validate_sink(sink, name: str) -> Dict[str, Any]:
+    if not isinstance(sink, dict):
+        raise TypeError(f"Task '{name}' 'log_sinks' items must be tables")
+    unknown = set(sink) - {"type", "path", "address", "format", "queue_size"}
+    if unknown:
+        raise TypeError(
+            f"Task '{name}' 'log_sinks' item has unknown fields: {', '.join(sorted(unknown))}"
+        )
+    if sink.get("type") not in SINK_TYPES:
+        raise TypeError(
+            f"Task '{name}' 'log_sinks' item 'type' must be one of {', '.join(SINK_TYPES)}"
+        )
+    if sink["type"] == "tcp":
+        address = sink.get("address")
+        host, _, port = address.rpartition(":") if isinstance(address, str) else "::"
+        if not host or not port.isdigit() or not 0 < int(port) < 65536:
+            raise TypeError(
+                f"Task '{name}' 'log_sinks' item 'address' must be 'host:port' for type tcp"
+            )
+    elif not isinstance(sink.get("path"), str) or not sink["path"]:
+        raise TypeError(
+            f"Task '{name}' 'log_sinks' item 'path' must be a socket path for type {sink['type']}"
+        )
+    if sink.get("format", "rfc5424") not in SINK_FORMATS:
+        raise TypeError(
+            f"Task '{name}' 'log_sinks' item 'format' must be one of {', '.join(SINK_FORMATS)}"
+        )
+    queue_size = sink.get("queue_size", 1)
+    if (
+        not isinstance(queue_size, (int, float))
+        or isinstance(queue_size, bool)
+        or queue_size <= 0
+    ):
+        raise TypeError(
+            f"Task '{name}' 'log_sinks' item 'queue_size' must be a positive number (MB)"
+        )
+    return sink
+
+
 def validate_task(task, name: str) -> DmonTaskConfig:
     ret = DmonTaskConfig(task=name)
     if isinstance(task, str) or isinstance(task, list):
@@ -120,6 +211,12 @@ def validate_task(task, name: str) -> DmonTaskConfig:
                 raise TypeError(f"Task '{name}' 'log_rotate' field must be a boolean")
             ret.log_rotate = task["log_rotate"]
 
+        for key in ["log_index", "log_compress", "log_timestamps", "log_dedup"]:
+            if key in task:
+                if not isinstance(task[key], bool):
+                    raise TypeError(f"Task '{name}' '{key}' field must be a boolean")
+                setattr(ret, key, task[key])
+
         if "log_max_size" in task:
             if (
                 not isinstance(task["log_max_size"], (int, float))
@@ -130,6 +227,133 @@ def validate_task(task, name: str) -> DmonTaskConfig:
                 )
             ret.log_max_size = task["log_max_size"]
 
+        if "log_format" in task:
+            if task["log_format"] not in LOG_FORMATS:
+                raise TypeError(
+                    f"Task '{name}' 'log_format' field must be one of {', '.join(LOG_FORMATS)}"
+                )
+            ret.log_format = task["log_format"]
+
+        if "log_stderr" in task:
+            if task["log_stderr"] not in STDERR_MODES:
+                raise TypeError(
+                    f"Task '{name}' 'log_stderr' field must be one of {', '.join(STDERR_MODES)}"
+                )
+            ret.log_stderr = task["log_stderr"]
+
+        if "stderr_log_path" in task:
+            if not isinstance(task["stderr_log_path"], str):
+                raise TypeError(
+                    f"Task '{name}' 'stderr_log_path' field must be a string"
+                )
+            ret.stderr_log_path = task["stderr_log_path"]
+
+        if "log_rate_limit" in task:
+            limit = task["log_rate_limit"]
+            if (
+                not isinstance(limit, dict)
+                or not limit
+                or not all(
+                    k in ("lines", "bytes")
+                    and isinstance(v, (int, float))
+                    and not isinstance(v, bool)
+                    and v > 0
+                    for k, v in limit.items()
+                )
+            ):
+                raise TypeError(
+                    f"Task '{name}' 'log_rate_limit' field must be a table with positive 'lines' and/or 'bytes' (per second)"
+                )
+            ret.log_rate_limit = cast(Dict[str, float], limit)
+
+        if "log_queue_size" in task:
+            if (
+                not isinstance(task["log_queue_size"], (int, float))
+                or isinstance(task["log_queue_size"], bool)
+                or task["log_queue_size"] < 0
+            ):
+                raise TypeError(
+                    f"Task '{name}' 'log_queue_size' field must be a non-negative number"
+                )
+            ret.log_queue_size = task["log_queue_size"]
+
+        if "log_overflow" in task:
+            if task["log_overflow"] not in OVERFLOW_POLICIES:
+                raise TypeError(
+                    f"Task '{name}' 'log_overflow' field must be one of {', '.join(OVERFLOW_POLICIES)}"
+                )
+            ret.log_overflow = task["log_overflow"]
+
+        for key, modes in (
+            ("log_flush", FLUSH_POLICIES),
+            ("log_fsync", FSYNC_POLICIES),
+        ):
+            if key in task:
+                if not isinstance(task[key], str):
+                    raise TypeError(f"Task '{name}' '{key}' field must be a string")
+                try:
+                    parse_policy(task[key], modes)
+                except ValueError as e:
+                    raise TypeError(
+                        f"Task '{name}' '{key}' field must be one of {', '.join(modes)} "
+                        f"(interval:<ms>, size:<bytes>): {e}"
+                    )
+                setattr(ret, key, task[key])
+
+        if "log_sinks" in task:
+            if not isinstance(task["log_sinks"], list):
+                raise TypeError(
+                    f"Task '{name}' 'log_sinks' field must be a list of tables"
+                )
+            ret.log_sinks = [validate_sink(sink, name) for sink in task["log_sinks"]]
+
+        if "log_buffer_size" in task:
+            if (
+                not isinstance(task["log_buffer_size"], (int, float))
+                or isinstance(task["log_buffer_size"], bool)
+                or task["log_buffer_size"] < 0
+            ):
+                raise TypeError(
+                    f"Task '{name}' 'log_buffer_size' field must be a non-negative number"
+                )
+            ret.log_buffer_size = task["log_buffer_size"]
+
+        if "log_buffer_lines" in task:
+            if (
+                not isinstance(task["log_buffer_lines"], int)
+                or isinstance(task["log_buffer_lines"], bool)
+                or task["log_buffer_lines"] <= 0
+            ):
+                raise TypeError(
+                    f"Task '{name}' 'log_buffer_lines' field must be a positive integer"
+                )
+            ret.log_buffer_lines = task["log_buffer_lines"]
+
+        if "launcher" in task:
+            if task["launcher"] not in LAUNCHERS:
+                raise TypeError(
+                    f"Task '{name}' 'launcher' field must be one of {', '.join(LAUNCHERS)}"
+                )
+            ret.launcher = task["launcher"]
+
+        if "preload" in task:
+            if not isinstance(task["preload"], list) or not all(
+                isinstance(module, str) for module in task["preload"]
+            ):
+                raise TypeError(
+                    f"Task '{name}' 'preload' field must be a list of module names"
+                )
+            ret.preload = task["preload"]
+
+        if ret.launcher == "forkserver":
+            from .forkserver import split_python_command
+
+            if split_python_command(ret.cmd) is None:
+                raise TypeError(
+                    f"Task '{name}' with launcher 'forkserver' must run Python without shell features, "
+                    "like 'python [-u] script.py ...', 'python -m module ...' or 'python -c code ...'"
+                )
+
         if "rotate_log_path" in task:
             if not isinstance(task["rotate_log_path"], str):
                 raise TypeError(
@@ -151,6 +375,13 @@ def validate_task(task, name: str) -> DmonTaskConfig:
             if not isinstance(task["meta_path"], str):
                 raise TypeError(f"Task '{name}' 'meta_path' field must be a string")
             ret.meta_path = task["meta_path"]
+
+        if "tags" in task:
+            if not isinstance(task["tags"], list) or not all(
+                isinstance(tag, str) for tag in task["tags"]
+            ):
+                raise TypeError(f"Task '{name}' 'tags' field must be a list of strings")
+            ret.tags = [tag.lower() for tag in task["tags"]]
     else:
         raise TypeError(
             f"Task '{name}' must be a string, list of strings, or a table; got {type(task)}"
@@ -158,38 +389,276 @@ def validate_task(task, name: str) -> DmonTaskConfig:
     return ret
 
 
+def compile_config(cfg: dict, path: Path) -> DmonConfig:
+    """
+    Validate all tasks of the given raw config.
+    Invalid tasks do not fail the whole config; their errors are recorded and raised
+    only when they are selected.
+    """
+    tasks = cfg.get("tasks", {})
+
+    if not isinstance(tasks, dict):
+        raise TypeError("'tasks' must be a table")
+
+    groups = cfg.get("groups", {})
+    if not isinstance(groups, dict) or not all(
+        isinstance(members, list) and all(isinstance(m, str) for m in members)
+        for members in groups.values()
+    ):
+        raise TypeError("'groups' must be a table of lists of task names or patterns")
+
+    compiled = DmonConfig(
+        path=str(path),
+        default_task=cfg.get("default_task", None),
+        groups={
+            str(group).lower(): [m.lower() for m in members]
+            for group, members in groups.items()
+        },
+    )
+    for name, task in tasks.items():
+        if not isinstance(name, str):
+            # e.g. `1:` or `yes:` in YAML; kept as an error of that task only
+            compiled.errors[str(name)] = (
+                f"Task name '{name}' must be a string; got {type(name)} (quote it)"
+            )
+            continue
+        try:
+            compiled.tasks[name] = validate_task(task, name)
+        except TypeError as e:
+            compiled.errors[name] = str(e)
+
+    # build selection index
+    compiled.sorted_names = sorted([*compiled.tasks, *compiled.errors])
+    for name, task_cfg in compiled.tasks.items():
+        for tag in task_cfg.tags:
+            compiled.tag_index.setdefault(tag, []).append(name)
+    return compiled
+
+
+def is_pattern(selector: str) -> bool:
+    """
+    Whether the task selector is a glob pattern (e.g. 'worker-*').
+    """
+    return any(c in selector for c in "*?[")
+
+
+def match_pattern(pattern: str, sorted_names: Sequence[str]) -> List[str]:
+    """
+    Match a glob pattern against sorted names.
+    The literal prefix of the pattern narrows the candidates by binary search.
+    """
+    prefix_len = min(
+        (i for i, c in enumerate(pattern) if c in "*?["), default=len(pattern)
+    )
+    prefix = pattern[:prefix_len]
+    lo = bisect_left(sorted_names, prefix)
+    regex = re.compile(fnmatch.translate(pattern))
+    matched = []
+    for name in sorted_names[lo:]:
+        if not name.startswith(prefix):
+            break
+        if regex.match(name):
+            matched.append(name)
+    return matched
+
+
+def select_tasks(
+    cfg: DmonConfig, selectors: Sequence[str], tags: Optional[Sequence[str]] = None
+) -> List[str]:
+    """
+    Resolve task selectors to task names, using the precomputed index of the config.
+
+    A selector is one of:
+    - a task name (case-insensitive)
+    - a glob pattern, e.g. 'worker-*'
+    - a group reference, e.g. '@workers'
+    Tasks with any of the given tags are also selected.
+    Names are returned in the order they are selected, without duplicates.
+    Raise ValueError if any selector matches nothing.
+    """
+    path = cfg.path
+    order = {name: idx for idx, name in enumerate(cfg.tasks)}
+    order.update({name: len(order) + idx for idx, name in enumerate(cfg.errors)})
+    selected: Dict[str, None] = {}
+
+    def resolve(selector: str, visiting: Tuple[str, ...]):
+        selector = selector.lower()
+        if selector.startswith("@"):
+            group = selector[1:]
+            if group not in cfg.groups:
+                raise ValueError(f"Group '{group}' not found in {path}")
+            if group in visiting:
+                raise ValueError(f"Group '{group}' references itself in {path}")
+            for member in cfg.groups[group]:
+                resolve(member, (*visiting, group))
+        elif is_pattern(selector):
+            matched = match_pattern(selector, cfg.sorted_names)
+            if not matched:
+                raise ValueError(f"No task matches '{selector}' in {path}")
+            selected.update(dict.fromkeys(sorted(matched, key=order.__getitem__)))
+        else:
+            if selector not in order:
+                raise ValueError(f"Task '{selector}' not found in {path}")
+            selected[selector] = None
+
+    for selector in selectors:
+        resolve(selector, ())
+    for tag in tags or []:
+        tag = tag.lower()
+        if tag not in cfg.tag_index:
+            raise ValueError(f"No task tagged '{tag}' in {path}")
+        selected.update(dict.fromkeys(cfg.tag_index[tag]))
+    return list(selected)
+
+
+def get_stat_signature(path: Path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_ctime_ns, st.st_size, st.st_ino)
+
+
+def read_config_cache() -> dict:
+    try:
+        with open(CONFIG_CACHE_PATH, "rb") as f:
+            data = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return {}
+    if (
+        not isinstance(data, dict)
+        or data.get("header") != get_config_cache_header()
+        or not isinstance(data.get("entries"), dict)
+    ):
+        return {}
+    return data["entries"]
+
+
+def write_config_cache(entries: dict):
+    """
+    Atomically write the config cache, only if the meta directory already exists.
+    """
+    if not DEFAULT_META_DIR.is_dir():
+        return
+    tmp_path = get_tmp_path(CONFIG_CACHE_PATH)
+    try:
+        with open(tmp_path, "wb") as f:
+            marshal.dump({"header": get_config_cache_header(), "entries": entries}, f)
+        os.replace(tmp_path, CONFIG_CACHE_PATH)
+    except (OSError, ValueError):
+        # e.g. read-only directory, or unmarshallable values in config
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def get_config_cache_header():
+    # invalidate when the interpreter (marshal format) or the task fields change
+    return (
+        CONFIG_CACHE_VERSION,
+        sys.implementation.cache_tag,
+        tuple(f.name for f in fields(DmonTaskConfig)),
+    )
+
+
+@timed("load_config")
+def load_compiled_config(cfg_path: Optional[str] = None) -> DmonConfig:
+    """
+    Load the validated configuration, using the cache in the meta directory if possible.
+
+    A cache entry is keyed on the current directory and the given config path, and is valid
+    as long as the config file and every directory searched for it are unchanged
+    (mtime, ctime, size and inode). A hit skips searching and parsing altogether.
+    """
+    use_cache = not os.environ.get(CONFIG_CACHE_ENV)
+    key = f"{Path.cwd()}\0{cfg_path or ''}"
+    with phase("read cache"):
+        entries = read_config_cache() if use_cache else {}
+
+    entry = entries.get(key)
+    if entry is not None and all(
+        get_stat_signature(Path(dep)) == sig for dep, sig in entry["deps"]
+    ):
+        data = entry["config"]
+        return DmonConfig(
+            path=data["path"],
+            tasks={
+                name: DmonTaskConfig(**task) for name, task in data["tasks"].items()
+            },
+            errors=data["errors"],
+            default_task=data["default_task"],
+            groups=data["groups"],
+            sorted_names=data["sorted_names"],
+            tag_index=data["tag_index"],
+        )
+
+    with phase("parse config"):
+        path, deps = locate_config(cfg_path)
+        # take signatures before parsing, so that concurrent edits invalidate the entry
+        dep_sigs = [(str(dep), get_stat_signature(dep)) for dep in deps]
+        compiled = compile_config(parse_config(path), path)
+
+    if use_cache:
+        entries.pop(key, None)
+        entries[key] = {
+            "deps": dep_sigs,
+            "config": {
+                "path": compiled.path,
+                "tasks": {name: asdict(t) for name, t in compiled.tasks.items()},
+                "errors": compiled.errors,
+                "default_task": compiled.default_task,
+                "groups": compiled.groups,
+                "sorted_names": compiled.sorted_names,
+                "tag_index": compiled.tag_index,
+            },
+        }
+        # keep only the most recently used entries
+        while len(entries) > CONFIG_CACHE_MAX_ENTRIES:
+            entries.pop(next(iter(entries)))
+        with phase("write cache"):
+            write_config_cache(entries)
+    return compiled
+
+
+@timed("get_task_config")
 def get_task_config(
-    names: Union[Sequence[str], str, None], cfg_path: Optional[str], all: bool = False
+    names: Union[Sequence[str], str, None],
+    cfg_path: Optional[str],
+    all: bool = False,
+    tags: Optional[Sequence[str]] = None,
 ) -> Tuple[Sequence[str], List[DmonTaskConfig]]:
     """
-    Get the validated task configurations for the given task names.
+    Get the validated task configurations for the given task names or selectors
+    (glob patterns like 'worker-*', or group references like '@workers'),
+    plus all tasks with any of the given tags.
     If 'all' is True, return all tasks.
     If no name specified, and there is only one task, return that task; otherwise, raise ValueError.
     If any task is not found, or required fields are missing, raise TypeError or ValueError.
 
     The config is loaded from the given path, or searched for dmon.yaml or pyproject.toml.
     """
-    cfg, path = load_config(cfg_path)
-    tasks = cfg.get("tasks", {})
-
-    if not isinstance(tasks, dict):
-        raise TypeError("'tasks' must be a table")
+    cfg = load_compiled_config(cfg_path)
+    path = cfg.path
+    n_tasks = len(cfg.tasks) + len(cfg.errors)
 
     if all:
-        names = list(tasks.keys())
+        names = [*cfg.tasks.keys(), *cfg.errors.keys()]
     elif isinstance(names, str):
-        names = [names]
-    elif names is None or len(names) == 0:
-        default_task_name = cfg.get("default_task", None)
+        names = select_tasks(cfg, [names], tags)
+    elif (names is not None and len(names) > 0) or tags:
+        names = select_tasks(cfg, names or [], tags)
+    else:
+        default_task_name = cfg.default_task
         if default_task_name:
             if not isinstance(default_task_name, str):
                 raise TypeError("'default_task' must be a string")
-            names = [default_task_name]
+            names = [default_task_name.lower()]
         else:
-            if len(tasks) == 0:
+            if n_tasks == 0:
                 raise ValueError(f"No task found in {path}")
-            elif len(tasks) == 1:
-                name = next(iter(tasks))
+            elif n_tasks == 1:
+                name = next(iter(cfg.tasks or cfg.errors))
                 assert isinstance(name, str)
                 names = [name]
             else:
@@ -197,24 +666,36 @@ def get_task_config(
 
     ret_tasks = []
     for name in names:
-        name = name.lower()
-        if name not in tasks:
+        if name in cfg.errors:
+            raise TypeError(cfg.errors[name])
+        if name not in cfg.tasks:
             raise ValueError(f"Task '{name}' not found in {path}")
 
-        task = validate_task(tasks[name], name)
-        ret_tasks.append(task)
+        ret_tasks.append(cfg.tasks[name])
     return names, ret_tasks
 
 
+def fill_default_paths(tasks: Sequence[str], task_cfgs: Sequence[DmonTaskConfig]):
+    """
+    Fill in the default meta / log paths of tasks if not configured.
+    """
+    for task, task_cfg in zip(tasks, task_cfgs):
+        task_cfg.meta_path = task_cfg.meta_path or META_PATH_TEMPLATE.format(task=task)
+        task_cfg.log_path = task_cfg.log_path or LOG_PATH_TEMPLATE.format(task=task)
+        task_cfg.rotate_log_path = (
+            task_cfg.rotate_log_path or ROTATE_LOG_PATH_TEMPLATE.format(task=task)
+        )
+
+
 def check_name_in_config(name: str) -> bool:
     """
     Check if the given task name exists in the tasks.
     Return True if found, False otherwise.
     """
-    cfg, _ = load_config()
-    tasks = cfg.get("tasks", {})
-
-    if not isinstance(tasks, dict):
+    try:
+        cfg = load_compiled_config()
+    except TypeError:
         return False
 
-    return name.lower() in tasks
+    name = name.lower()
+    return name in cfg.tasks or name in cfg.errors
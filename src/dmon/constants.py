@@ -11,7 +11,42 @@ META_PATH_TEMPLATE = str(DEFAULT_META_DIR / ("{task}" + META_SUFFIX))
 LOG_PATH_TEMPLATE = str(DEFAULT_LOG_DIR / "{task}.log")
 ROTATE_LOG_PATH_TEMPLATE = str(DEFAULT_LOG_DIR / "{task}.rotate.log")
 
+CONFIG_CACHE_PATH = DEFAULT_META_DIR / "config.cache"
+CONFIG_CACHE_VERSION = 2
+CONFIG_CACHE_MAX_ENTRIES = 16
+# set to a non-empty value to disable the config cache
+CONFIG_CACHE_ENV = "DMON_NO_CONFIG_CACHE"
+
 
 DEFAULT_RUN_NAME = "default_run"
 
+LOG_FORMATS = ("text", "json")
+# how the runner captures stderr: merged into stdout, tagged per line, or in a separate file
+STDERR_MODES = ("merge", "tag", "file")
+# what the runner does when its log queue is full
+OVERFLOW_POLICIES = ("block", "drop_oldest", "drop_newest")
+# when the runner writes buffered output to the log file ('interval:<ms>', 'size:<bytes>')
+FLUSH_POLICIES = ("always", "line", "interval", "size")
+# when the runner fsyncs the log file ('interval:<ms>')
+FSYNC_POLICIES = ("never", "on_rotate", "interval")
+# network log sinks of the runner
+SINK_TYPES = ("unix_dgram", "unix_stream", "tcp")
+SINK_FORMATS = ("rfc5424", "raw")
+# how the task's process is started
+LAUNCHERS = ("exec", "forkserver")
+# policies taking a ':<number>' parameter
+PARAM_POLICIES = ("interval", "size")
+
 ON_WINDOWS = sys.platform.startswith("win")
+
+# set to a non-empty value (other than '0') to print per-phase timings
+PROFILE_ENV = "DMON_PROFILE"
+# path to dump cProfile stats of the command to
+PROFILE_OUT_ENV = "DMON_PROFILE_OUT"
+
+# per-user state directory (default: $XDG_STATE_HOME/dmon)
+STATE_DIR_ENV = "DMON_STATE_DIR"
+REGISTRY_FILENAME = "registry.json"
+# set to a non-empty value (other than '0') to record started tasks in the
+# global task registry
+REGISTRY_ENV = "DMON_REGISTRY"
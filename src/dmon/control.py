@@ -1,19 +1,24 @@
+from dataclasses import asdict
 import os
 from pathlib import Path
-import shlex
-import shutil
-import signal
 import sys
-import subprocess
 import time
-from typing import List, Sequence
+from typing import List, Optional, Sequence
 
 import psutil
 from termcolor import colored
 
-from .constants import DEFAULT_META_DIR, META_SUFFIX, ON_WINDOWS
-from .types import DmonTaskConfig, DmonMeta, PathType
-from .utils import len_ansi, pad_ansi
+from .constants import DEFAULT_META_DIR, META_SUFFIX, ON_WINDOWS, REGISTRY_ENV
+from .ipc import get_sock_path, sockets_supported
+from .profiling import phase
+from .registry import register, unregister
+from .runner import CONFIG_ENV, encode_options, get_options
+from .statspage import get_stats_path, read_stats
+from .types import DmonAdmission, DmonTaskConfig, DmonMeta, PathType
+from .utils import file_lock, format_size, len_ansi, pad_ansi, resolve_command
+
+
+LOCK_SUFFIX = ".lock"
 
 
 def ensure_meta_dir(meta_path: Path):
@@ -33,25 +38,168 @@ def ensure_log_dir(log_path: Path):
     log_path.parent.mkdir(parents=True, exist_ok=True)
 
 
-def start(cfgs: Sequence[DmonTaskConfig]):
+def task_lock(meta_path: Path):
+    """
+    Hold the advisory lock of a task (next to its meta file) during a start /
+    stop, so that concurrent dmon invocations cannot start it twice or remove
+    the meta file of a task being started.
+    No-op if the meta directory does not exist (nothing started there yet).
+    """
+    import contextlib
+
+    if not meta_path.parent.is_dir():
+        return contextlib.nullcontext()
+    name = meta_path.name
+    if name.endswith(META_SUFFIX):
+        name = name[: -len(META_SUFFIX)]
+    return file_lock(meta_path.with_name(name + LOCK_SUFFIX))
+
+
+def start(cfgs: Sequence[DmonTaskConfig], admission: Optional[DmonAdmission] = None):
+    """
+    Start tasks one by one, through admission control if enabled (see
+    admission.py).
+    """
+    queue = None
+    if admission is not None and admission.enabled and len(cfgs) > 1:
+        from .admission import AdmissionQueue
+
+        queue = AdmissionQueue(admission)
     ret = 0
     for idx, cfg in enumerate(cfgs):
-        # non-zero if any start() fails
-        ret |= start_single(cfg)
+        if queue is None:
+            # non-zero if any start() fails
+            ret |= start_single(cfg)
+        else:
+            meta_path = Path(cfg.meta_path).resolve()
+            record = queue.admit(cfg.task, wait=get_existing_meta(meta_path) is None)
+            t0 = time.monotonic()
+            code = start_single(cfg)
+            meta = None
+            if code == 0:
+                meta = get_existing_meta(meta_path)
+            queue.launched(record, meta, time.monotonic() - t0)
+            ret |= code
         if idx < len(cfgs) - 1:
             print("---", file=sys.stderr)  # print a blank line between tasks
+    if queue is not None:
+        queue.report()
     return ret
 
 
+def uses_runner(cfg: DmonTaskConfig) -> bool:
+    """
+    Whether the task is started by the runner, i.e. any runner feature
+    (log rotation, timestamps, JSON logs, stderr capture, dedup, rate limit, log queue,
+    flush / fsync policy, network sinks) is enabled.
+    """
+    return (
+        cfg.log_rotate
+        or cfg.log_timestamps
+        or cfg.log_format != "text"
+        or cfg.log_stderr != "merge"
+        or cfg.log_dedup
+        or bool(cfg.log_rate_limit)
+        or cfg.log_queue_size > 0
+        or cfg.log_flush != "always"
+        or cfg.log_fsync != "never"
+        or bool(cfg.log_sinks)
+    )
+
+
+def get_stderr_log_path(log_path: Path) -> Path:
+    """
+    Default stderr log path next to the log file, e.g. 'app.log' -> 'app.err.log'.
+    """
+    if log_path.suffix == ".log":
+        return log_path.with_suffix(".err.log")
+    return log_path.with_name(log_path.name + ".err")
+
+
+def get_runner_command() -> List[str]:
+    """
+    Command to start the runner. Unless dmon is not imported from a directory
+    (e.g. a zip file), the interpreter runs isolated (-I: no PYTHON* variables,
+    user site directory or cwd in sys.path) and without the site module (-S),
+    with only dmon's parent directory in sys.path: the runner needs no other
+    packages, and skips the startup cost of site-packages for every task.
+    The task's command still gets the environment unchanged.
+    """
+    pkg_dir = Path(__file__).resolve().parent
+    if not (pkg_dir / "runner.py").is_file():
+        return [sys.executable, "-m", "dmon.runner"]
+    bootstrap = (
+        f"import sys; sys.path.insert(0, {str(pkg_dir.parent)!r}); "
+        "from dmon.runner import run; run()"
+    )
+    return [sys.executable, "-I", "-S", "-c", bootstrap]
+
+
+def set_runner_options(meta: DmonMeta, cfg: DmonTaskConfig):
+    """
+    Set the runner's log options of a task in its meta (with resolved paths),
+    and create the directories of its extra log files.
+    """
+    rotate_log_path = Path(cfg.rotate_log_path).resolve()
+
+    meta.rotate_log_path = str(rotate_log_path)
+    meta.log_max_size = cfg.log_max_size
+    meta.rotate_log_max_size = cfg.rotate_log_max_size
+    meta.log_index = cfg.log_index
+    meta.log_compress = cfg.log_compress
+    meta.log_timestamps = cfg.log_timestamps
+    meta.log_format = cfg.log_format
+    meta.log_stderr = cfg.log_stderr
+    meta.log_dedup = cfg.log_dedup
+    meta.log_rate_limit = cfg.log_rate_limit
+    meta.log_queue_size = cfg.log_queue_size
+    meta.log_overflow = cfg.log_overflow
+    meta.log_flush = cfg.log_flush
+    meta.log_fsync = cfg.log_fsync
+    meta.log_sinks = [
+        {**sink, "path": str(Path(sink["path"]).resolve())}
+        if sink["type"] != "tcp"
+        else sink
+        for sink in cfg.log_sinks
+    ]
+    if cfg.log_stderr == "file":
+        stderr_log_path = (
+            Path(cfg.stderr_log_path).resolve()
+            if cfg.stderr_log_path
+            else get_stderr_log_path(Path(meta.log_path))
+        )
+        meta.stderr_log_path = str(stderr_log_path)
+        ensure_log_dir(stderr_log_path)
+    meta.log_buffer_size = cfg.log_buffer_size
+    meta.log_buffer_lines = cfg.log_buffer_lines
+
+    ensure_log_dir(rotate_log_path)
+
+
 def start_single(cfg: DmonTaskConfig):
     meta_path = Path(cfg.meta_path).resolve()
-    log_path = Path(cfg.log_path).resolve()
-    cwd = Path(cfg.cwd).resolve()
+    ensure_meta_dir(meta_path)
+    with task_lock(meta_path):
+        return start_locked(cfg)
+
 
+def get_existing_meta(meta_path: Path) -> Optional[DmonMeta]:
+    """
+    Get the meta of a task that blocks starting it: any valid meta file, even
+    if its process has exited (it is only removed by a stop). An invalid meta
+    file does not block; it is overwritten.
+    """
     try:
-        ret_meta = DmonMeta.load(meta_path)
-    except Exception:
-        ret_meta = None
+        return DmonMeta.load(meta_path)
+    except ValueError:
+        return None
+
+
+def start_locked(cfg: DmonTaskConfig):
+    """
+    Start a task, holding its lock.
+    """
+    ret_meta = get_existing_meta(Path(cfg.meta_path).resolve())
     if ret_meta:
         print(
             f"{colored('Start failed: meta file already exists', color='red', attrs=['bold'])}",
@@ -64,7 +212,51 @@ def start_single(cfg: DmonTaskConfig):
         )
         return 1
 
-    ensure_meta_dir(meta_path)
+    try:
+        meta = launch_task(cfg)
+    except (OSError, RuntimeError, ValueError) as e:
+        print(
+            f"{colored('Start failed:', color='red', attrs=['bold'])} {e}",
+            file=sys.stderr,
+        )
+        return 1
+
+    if meta.stats_path and sockets_supported() and not meta.sock_path:
+        print(
+            colored(
+                f"Warning: meta file path too long for a Unix socket; control socket of task '{meta.task}' disabled"
+                " ('dmon logs --tail' reads log files, 'dmon rotate' is unavailable)",
+                color="yellow",
+            ),
+            file=sys.stderr,
+        )
+    with phase("render"):
+        print_status(meta)
+    return 0
+
+
+def launch_task(cfg: DmonTaskConfig) -> DmonMeta:
+    """
+    Start the process of a task and write its meta file, without checking for
+    a running instance (see start_locked()) or printing anything.
+    Return the meta; raise ValueError if the task cannot be started this way,
+    or OSError / RuntimeError if starting fails.
+    """
+    import shutil
+    import subprocess
+
+    meta_path = Path(cfg.meta_path).resolve()
+    log_path = Path(cfg.log_path).resolve()
+    cwd = Path(cfg.cwd).resolve()
+
+    if cfg.launcher == "forkserver" and (ON_WINDOWS or uses_runner(cfg)):
+        reason = (
+            "not supported on Windows"
+            if ON_WINDOWS
+            else "cannot be combined with runner log options (e.g. log_rotate)"
+        )
+        raise ValueError(f"launcher forkserver {reason}")
+
     ensure_log_dir(log_path)
 
     env = None  # default behavior of Popen
@@ -74,6 +266,10 @@ def start_single(cfg: DmonTaskConfig):
         env = {**os.environ, **cfg.env}
 
     shell = isinstance(cfg.cmd, str)
+    # exec simple commands directly, without an intermediate shell
+    run_cmd = resolve_command(
+        cfg.cmd, cwd, (os.environ if env is None else env).get("PATH")
+    )
 
     # Platform-specific parameters to run the process in background detached from parent
     kwargs = {}
@@ -99,67 +295,68 @@ def start_single(cfg: DmonTaskConfig):
         override_env=cfg.override_env,
         shell=shell,
         popen_kwargs=kwargs,
+        launcher=cfg.launcher,
+        preload=cfg.preload,
     )
 
-    if cfg.log_rotate:
-        rotate_log_path = Path(cfg.rotate_log_path).resolve()
-
-        meta.rotate_log_path = str(rotate_log_path)
-        meta.log_max_size = cfg.log_max_size
-        meta.rotate_log_max_size = cfg.rotate_log_max_size
-
-        ensure_log_dir(rotate_log_path)
-
-        # use runner to start user process and handle log rotation
-        if isinstance(cfg.cmd, str):
-            # when cmd is str, we need to split it into list for subprocess
-            cmd = shlex.split(cfg.cmd)
-        else:
-            cmd = cfg.cmd
-        args = [
-            sys.executable,
-            "-m",
-            "dmon.runner",
-            "--log-path",
-            str(log_path),
-            "--max-log-size",
-            str(cfg.log_max_size),
-            "--rotate-log-path",
-            str(rotate_log_path),
-            "--max-rotate-log-size",
-            str(cfg.rotate_log_max_size),
-        ]
-        if shell:
-            args.append("--shell")
-        args.append("--")
-        args.extend(cmd)
-        proc = subprocess.Popen(
-            args,
-            cwd=cwd,
-            env=env,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.STDOUT,
-            **kwargs,
-        )
+    if uses_runner(cfg):
+        set_runner_options(meta, cfg)
+        if sockets_supported():
+            meta.sock_path = get_sock_path(str(meta_path))
+        meta.stats_path = get_stats_path(str(meta_path))
+
+        # use runner to start user process and handle log rotation;
+        # its options are passed in the environment
+        options = get_options(asdict(meta))
+        options["cmd"] = run_cmd
+        env = {
+            **(os.environ if env is None else env),
+            CONFIG_ENV: encode_options(options),
+        }
+        with phase("spawn"):
+            proc = subprocess.Popen(
+                get_runner_command(),
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.STDOUT,
+                **kwargs,
+            )
+        pid = proc.pid
+    elif cfg.launcher == "forkserver":
+        from .forkserver import launch, split_python_command
+
+        # fork from a server with the preloaded modules imported
+        with phase("spawn"):
+            pid = launch(
+                str(meta_path.parent),
+                split_python_command(cfg.cmd),
+                str(cwd),
+                dict(os.environ if env is None else env),
+                str(log_path),
+                cfg.preload,
+                cfg.env,
+            )
     else:
         # Open the log file (append binary mode)
-        with open(log_path, "ab", buffering=0) as lof:
+        with phase("spawn"), open(log_path, "ab", buffering=0) as lof:
             # Start the child process with stdout/stderr redirected to the log
             proc = subprocess.Popen(
-                cfg.cmd,
+                run_cmd,
                 stdout=lof,
                 stderr=subprocess.STDOUT,
                 cwd=cwd,
                 env=env,
-                shell=shell,
+                shell=isinstance(run_cmd, str),
                 text=False,  # binary mode
                 bufsize=0,  # unbuffered
                 **kwargs,
             )
+        pid = proc.pid
 
-    meta.pid = proc.pid
+    meta.pid = pid
     try:
-        p = psutil.Process(proc.pid)
+        p = psutil.Process(pid)
         create_time = p.create_time()
         create_time_human = time.strftime(
             "%Y-%m-%d %H:%M:%S", time.localtime(create_time)
@@ -170,10 +367,20 @@ def start_single(cfg: DmonTaskConfig):
         # process already exited?
         pass
 
-    meta.dump(meta_path)
+    with phase("meta write"):
+        meta.dump(meta_path)
+        register(meta)
+    return meta
 
-    print_status(meta)
-    return 0
+
+def remove_meta(meta_path: Path):
+    """
+    Remove the meta file (and stats page) of a stopped task, and unregister it
+    from the global registry.
+    """
+    meta_path.unlink(missing_ok=True)
+    Path(get_stats_path(str(meta_path))).unlink(missing_ok=True)
+    unregister(meta_path)
 
 
 def stop(meta_paths: Sequence[PathType], timeout=5.0):
@@ -191,7 +398,23 @@ def stop_single(
     timeout=5.0,
 ):
     meta_path = Path(meta_path).resolve()
-    meta = DmonMeta.load(meta_path)
+    with task_lock(meta_path):
+        return stop_locked(meta_path, timeout)
+
+
+def stop_locked(meta_path: Path, timeout=5.0):
+    """
+    Stop a task, holding its lock.
+    """
+    with phase("meta load"):
+        try:
+            meta = DmonMeta.load(meta_path)
+        except ValueError as e:
+            print(
+                colored(f"Stop failed: {e}", color="red", attrs=["bold"]),
+                file=sys.stderr,
+            )
+            return 1
     if meta is None:
         print(
             colored(
@@ -217,7 +440,7 @@ def stop_single(
             file=sys.stderr,
         )
         print_status(meta)
-        meta_path.unlink(missing_ok=True)
+        remove_meta(meta_path)
         return 1
 
     # check if it's the same process by comparing create_time
@@ -231,42 +454,39 @@ def stop_single(
             file=sys.stderr,
         )
         print_status(meta)
-        meta_path.unlink(missing_ok=True)
+        remove_meta(meta_path)
         return 1
 
-    if ON_WINDOWS:
-        ret = terminate_win(proc, timeout)
-    else:
-        ret = terminate_posix(proc, timeout)
-    print_status(meta)
+    with phase("terminate"):
+        if ON_WINDOWS:
+            ret = terminate_win(proc, timeout)
+        else:
+            ret = terminate_posix(proc, timeout)
+    with phase("render"):
+        print_status(meta)
     if ret == 0:
-        meta_path.unlink(missing_ok=True)
+        remove_meta(meta_path)
     return ret
 
 
-def terminate_posix(proc: psutil.Process, timeout):
+def print_notice(message: str, color: str):
+    print(colored(message, color=color, attrs=["bold"]), file=sys.stderr)
+
+
+def terminate_posix(proc: psutil.Process, timeout, notify=print_notice):
     # send SIGTERM first for graceful shutdown (if platform supports)
     proc.terminate()
 
     # wait for the process to exit or timeout
     try:
         ret = proc.wait(timeout)
-        print(
-            colored(
-                f"Process {proc.pid} exited with code {ret}; removing meta file",
-                color="green",
-                attrs=["bold"],
-            ),
-            file=sys.stderr,
+        notify(
+            f"Process {proc.pid} exited with code {ret}; removing meta file", "green"
         )
     except psutil.TimeoutExpired:
-        print(
-            colored(
-                f"Process {proc.pid} did not exit in time; shutting down child processes",
-                color="yellow",
-                attrs=["bold"],
-            ),
-            file=sys.stderr,
+        notify(
+            f"Process {proc.pid} did not exit in time; shutting down child processes",
+            "yellow",
         )
 
         # first shut down child processes (leaf nodes first)
@@ -283,47 +503,25 @@ def terminate_posix(proc: psutil.Process, timeout):
         try:
             # check if process is already exited
             ret = proc.wait(timeout=2)
-            print(
-                colored(
-                    f"Process {proc.pid} exited with code {ret} after terminating children; removing meta file",
-                    color="green",
-                    attrs=["bold"],
-                ),
-                file=sys.stderr,
+            notify(
+                f"Process {proc.pid} exited with code {ret} after terminating children; removing meta file",
+                "green",
             )
         except psutil.TimeoutExpired:
-            print(
-                colored(
-                    f"Process {proc.pid} did not exit in time after terminating children; killing it",
-                    color="yellow",
-                    attrs=["bold"],
-                ),
-                file=sys.stderr,
+            notify(
+                f"Process {proc.pid} did not exit in time after terminating children; killing it",
+                "yellow",
             )
             try:
                 proc.kill()
-                print(
-                    colored(
-                        f"Killed process {proc.pid}; removing meta file",
-                        color="green",
-                        attrs=["bold"],
-                    ),
-                    file=sys.stderr,
-                )
+                notify(f"Killed process {proc.pid}; removing meta file", "green")
             except Exception as e:
-                print(
-                    colored(
-                        f"Failed to kill process {proc.pid}: {e}",
-                        color="red",
-                        attrs=["bold"],
-                    ),
-                    file=sys.stderr,
-                )
+                notify(f"Failed to kill process {proc.pid}: {e}", "red")
                 return 1
     return 0
 
 
-def terminate_win(proc: psutil.Process, timeout):
+def terminate_win(proc: psutil.Process, timeout, notify=print_notice):
     # On Windows, we need to stop child processes first
     children = proc.children(recursive=True)
     # reverse to kill leaf nodes first
@@ -335,64 +533,50 @@ def terminate_win(proc: psutil.Process, timeout):
             pass
     try:
         ret = proc.wait(timeout=timeout)
-        print(
-            colored(
-                f"Process {proc.pid} exited with code {ret}; removing meta file",
-                color="green",
-                attrs=["bold"],
-            ),
-            file=sys.stderr,
+        notify(
+            f"Process {proc.pid} exited with code {ret}; removing meta file", "green"
         )
     except psutil.TimeoutExpired:
-        print(
-            colored(
-                f"Process {proc.pid} did not exit in time after killing children; killing it",
-                color="yellow",
-                attrs=["bold"],
-            ),
-            file=sys.stderr,
+        notify(
+            f"Process {proc.pid} did not exit in time after killing children; killing it",
+            "yellow",
         )
         proc.kill()
-        print(
-            colored(
-                f"Killed process {proc.pid}; removing meta file",
-                color="green",
-                attrs=["bold"],
-            ),
-            file=sys.stderr,
-        )
+        notify(f"Killed process {proc.pid}; removing meta file", "green")
     return 0
 
 
 def restart(
     cfgs: Sequence[DmonTaskConfig],
     timeout=5.0,
+    admission: Optional[DmonAdmission] = None,
 ):
     meta_paths = [cfg.meta_path for cfg in cfgs]
     stop(meta_paths, timeout=timeout)
     print("--- Restarting ---", file=sys.stderr)
-    return start(cfgs)
+    return start(cfgs, admission)
 
 
-def status(meta_paths: Sequence[PathType]):
+def status(meta_paths: Sequence[PathType], runner_stats=False):
     ret = 0
     metas = []
     for idx, meta_path in enumerate(meta_paths):
         meta_path = Path(meta_path).resolve()
-        meta = DmonMeta.load(meta_path)
+        error = "meta file not found (maybe not started)\n" + str(meta_path)
+        with phase("meta load"):
+            try:
+                meta = DmonMeta.load(meta_path)
+            except ValueError as e:
+                meta, error = None, str(e)
         if meta is None:
             print(
-                colored(
-                    "Status failed: meta file not found (maybe not started)\n",
-                    color="red",
-                    attrs=["bold"],
-                )
-                + str(meta_path),
+                colored(f"Status failed: {error}", color="red", attrs=["bold"]),
                 file=sys.stderr,
             )
             ret |= 1
         else:
-            print_status(meta)
+            with phase("render"):
+                print_status(meta, runner_stats)
             metas.append(meta)
         if idx < len(meta_paths) - 1:
             print("---", file=sys.stderr)
@@ -402,6 +586,84 @@ def status(meta_paths: Sequence[PathType]):
     return ret
 
 
+def rotate(meta_paths: Sequence[PathType], reopen=False):
+    """
+    Rotate the log files of tasks started with the runner now, or only make
+    the runner reopen them (e.g. after an external rename); the request goes
+    through the runner's control socket, so no output is lost.
+    """
+    ret = 0
+    for meta_path in meta_paths:
+        ret |= rotate_single(meta_path, reopen)
+    return ret
+
+
+def rotate_single(meta_path: PathType, reopen=False):
+    import json
+
+    from .ipc import request
+
+    action = "Reopen" if reopen else "Rotate"
+    meta_path = Path(meta_path).resolve()
+    error = f"meta file not found (maybe not started)\n{meta_path}"
+    with phase("meta load"):
+        try:
+            meta = DmonMeta.load(meta_path)
+        except ValueError as e:
+            meta, error = None, str(e)
+    if meta is None:
+        pass  # error set above
+    elif not meta.rotate_log_path:
+        error = f"task '{meta.task}' is not run by the runner (no log options enabled)"
+    elif not check_running(meta.pid, meta.create_time):
+        error = f"task '{meta.task}' is not running"
+    else:
+        error = None
+        data = request(meta.sock_path, action.lower(), timeout=5.0)
+        try:
+            result = json.loads(data) if data else None
+        except ValueError:
+            result = None
+        if result is None:
+            error = f"runner of task '{meta.task}' not reachable at '{meta.sock_path}'"
+            if reopen and not ON_WINDOWS:
+                error += f" (send SIGHUP to PID {meta.pid} instead)"
+    if error is not None:
+        print(
+            colored(f"{action} failed: ", color="red", attrs=["bold"]) + error,
+            file=sys.stderr,
+        )
+        return 1
+
+    if reopen:
+        for path in result:
+            print(colored(f"Reopened {path}", color="green"), file=sys.stderr)
+        return 0
+    for path, res in result.items():
+        if res["rotated"]:
+            print(
+                colored(f"Rotated {path} to {res['rotated']}", color="green"),
+                file=sys.stderr,
+            )
+        elif res["pending"]:
+            print(
+                colored(
+                    f"Rotation of {path} is pending until its last line is complete",
+                    color="yellow",
+                ),
+                file=sys.stderr,
+            )
+        else:
+            print(
+                colored(
+                    f"{path} not rotated (empty, or already rotated this second)",
+                    color="yellow",
+                ),
+                file=sys.stderr,
+            )
+    return 0
+
+
 def check_same_process(proc: psutil.Process, create_time: float) -> bool:
     if create_time < 0:
         return False
@@ -422,6 +684,24 @@ def get_unique_process(pid: int, create_time: float):
     return None
 
 
+def get_live_process(meta: DmonMeta) -> Optional[psutil.Process]:
+    """
+    Get the process of a task if it is still running. A zombie (a task started
+    by this process that exited but was not reaped yet) is reaped and counts as
+    exited.
+    """
+    proc = get_unique_process(meta.pid, meta.create_time)
+    if proc is None:
+        return None
+    try:
+        if proc.status() != psutil.STATUS_ZOMBIE:
+            return proc
+        proc.wait(timeout=0)
+    except (psutil.Error, psutil.TimeoutExpired):
+        pass
+    return None
+
+
 def check_running(pid: int, create_time: float) -> bool:
     """
     Check if a process with given PID and create_time is running.
@@ -436,10 +716,102 @@ def check_running(pid: int, create_time: float) -> bool:
         return False
 
 
-def print_status(meta: DmonMeta):
+def get_runner_stats(meta: DmonMeta) -> Optional[dict]:
+    """
+    Query live counters from the runner's control socket; None if unavailable.
+    """
+    if not meta.sock_path:
+        return None
+    import json
+
+    from .ipc import request
+
+    data = request(meta.sock_path, "stats")
+    try:
+        return json.loads(data) if data else None
+    except ValueError:
+        return None
+
+
+def get_page_rows(counters: dict) -> List[tuple]:
+    """
+    Rows of the counters read from a runner's stats page.
+    """
+    return [
+        (
+            "PUMP",
+            f"{format_size(counters['bytes_read'])} ({counters['lines_read']} lines) read, "
+            f"{format_size(counters['bytes_written'])} written, "
+            f"{counters['rotations']} rotations",
+        ),
+        (
+            "PUMP BLOCKED",
+            f"{counters['write_blocked_ns'] / 1e6:.1f} ms on writes, "
+            f"{format_size(counters['pipe_backlog'])} pipe backlog",
+        ),
+    ]
+
+
+def get_stats_rows(stats: dict) -> List[tuple]:
+    rows = []
+    logs = stats.get("logs", {})
+    stdout_log = logs.get("stdout", {})
+    for name, counters in stats.get("streams", {}).items():
+        value = f"{format_size(counters['bytes'])}, {counters['lines']} lines"
+        if counters.get("repeated_lines"):
+            value += f", {counters['repeated_lines']} repeated"
+        if counters.get("dropped_lines"):
+            value += f", {counters['dropped_lines']} dropped ({format_size(counters['dropped_bytes'])})"
+        log = logs.get(name, {})
+        if name != "stdout" and log.get("path") != stdout_log.get("path"):
+            # written to a separate log file
+            value += f", {log.get('rotations', 0)} rotations"
+        rows.append((name.upper(), value))
+    if stdout_log:
+        rows.append(("LOG ROTATIONS", stdout_log.get("rotations", 0)))
+    seen = set()
+    for name, log in logs.items():
+        if log.get("path") in seen:
+            continue  # shared by streams
+        seen.add(log.get("path"))
+        if log.get("lost_bytes") or log.get("write_errors") or log.get("queued"):
+            rows.append(
+                (
+                    f"{name.upper()} QUEUE",
+                    f"{format_size(log.get('queued', 0))} queued, "
+                    f"{format_size(log.get('lost_bytes', 0))} ({log.get('lost_lines', 0)} lines) lost, "
+                    f"{log.get('write_errors', 0)} write errors",
+                )
+            )
+        write, fsync = log.get("write_latency"), log.get("fsync_latency")
+        if write and write["count"]:
+            value = f"write avg {write['avg_ms']:.3f} ms, max {write['max_ms']:.3f} ms"
+            if fsync and fsync["count"]:
+                value += f"; fsync avg {fsync['avg_ms']:.3f} ms, max {fsync['max_ms']:.3f} ms"
+            rows.append((f"{name.upper()} LATENCY", value))
+    for sink in stats.get("sinks", []):
+        rows.append(
+            (
+                "SINK",
+                f"{sink['name']}: {'connected' if sink['connected'] else 'disconnected'}, "
+                f"{sink['sent_lines']} lines sent, {sink['dropped_lines']} dropped, "
+                f"{format_size(sink['queued'])} queued, {sink['errors']} errors",
+            )
+        )
+    return rows
+
+
+def print_status(meta: DmonMeta, runner_stats=False):
+    """
+    Print the status of a task, with the runner's pump counters from its stats
+    page (no request to the runner). With runner_stats, also query the runner
+    over its control socket for per-stream, log queue / latency and sink
+    counters (which waits for a busy runner, up to a timeout).
+    """
+    running = check_running(meta.pid, meta.create_time)
     status = (
         colored("Running", on_color="on_green")
-        if check_running(meta.pid, meta.create_time)
+        if running
         else colored("Exited", on_color="on_light_red")
     )
 
@@ -455,10 +827,62 @@ def print_status(meta: DmonMeta):
         ("LOG ROTATE", meta.log_rotate),
         ("LOG PATH", meta.log_path),
     ]
+    if meta.launcher != "exec":
+        preload = ", ".join(meta.preload) or "none"
+        rows.insert(4, ("LAUNCHER", f"{meta.launcher} (preload: {preload})"))
     if meta.log_rotate:
-        rows.append(("ROTATE LOG PATH", meta.rotate_log_path))
         rows.append(("LOG MAX SIZE", f"{meta.log_max_size} MB"))
+        rows.append(("LOG COMPRESS", meta.log_compress))
+    if meta.rotate_log_path:
+        # started by the runner
+        rows.append(("ROTATE LOG PATH", meta.rotate_log_path))
         rows.append(("ROTATE LOG MAX SIZE", f"{meta.rotate_log_max_size} MB"))
+        rows.append(("LOG INDEX", meta.log_index))
+        rows.append(("LOG TIMESTAMPS", meta.log_timestamps))
+        rows.append(("LOG FORMAT", meta.log_format))
+        if meta.log_buffer_size > 0:
+            rows.append(
+                (
+                    "LOG BUFFER",
+                    f"{meta.log_buffer_size} MB / {meta.log_buffer_lines} lines",
+                )
+            )
+        if meta.log_stderr != "merge":
+            rows.append(("LOG STDERR", meta.log_stderr))
+        if meta.stderr_log_path:
+            rows.append(("STDERR LOG PATH", meta.stderr_log_path))
+        if meta.log_dedup:
+            rows.append(("LOG DEDUP", meta.log_dedup))
+        if meta.log_rate_limit:
+            limits = []
+            if "lines" in meta.log_rate_limit:
+                limits.append(f"{meta.log_rate_limit['lines']:g} lines/s")
+            if "bytes" in meta.log_rate_limit:
+                limits.append(f"{format_size(meta.log_rate_limit['bytes'])}/s")
+            rows.append(("LOG RATE LIMIT", ", ".join(limits)))
+        if meta.log_queue_size > 0:
+            rows.append(("LOG QUEUE", f"{meta.log_queue_size} MB, {meta.log_overflow}"))
+        if meta.log_flush != "always" or meta.log_fsync != "never":
+            rows.append(("LOG FLUSH / FSYNC", f"{meta.log_flush} / {meta.log_fsync}"))
+        for sink in meta.log_sinks:
+            target = sink.get("address") or sink.get("path")
+            rows.append(
+                (
+                    "LOG SINK",
+                    f"{sink['type']}:{target} ({sink.get('format', 'rfc5424')})",
+                )
+            )
+        if meta.sock_path:
+            rows.append(("SOCKET PATH", meta.sock_path))
+        if meta.stats_path:
+            rows.append(("STATS PATH", meta.stats_path))
+        # read from the stats page, without a request to the runner
+        counters = read_stats(meta.stats_path) if meta.stats_path else None
+        if counters:
+            rows.extend(get_page_rows(counters))
+        stats = get_runner_stats(meta) if runner_stats and running else None
+        if stats:
+            rows.extend(get_stats_rows(stats))
 
     # calculate the max width of the keys
     key_width = max(len(key) for key, _ in rows)
@@ -495,58 +919,66 @@ def print_process_table(metas: List[DmonMeta], full_width: bool = False):
     rows.append(headers)
 
     processes = []
-    for meta in metas:
-        proc = get_unique_process(meta.pid, meta.create_time)
-        if proc:
-            status = colored("Running", on_color="on_green")
-            ppid = proc.ppid()
-            processes.append(proc)
-        else:
-            status = colored("Exited", on_color="on_light_red")
-            ppid = "N/A"
-        rows.append(
-            (
-                colored(meta.task, "cyan", attrs=["bold"]),
-                colored(meta.pid, "cyan", attrs=["bold"]),
-                ppid,
-                status,
-                meta.cmd,
-                meta.create_time_human,
-                meta.log_path,
+    with phase("process snapshot"):
+        for meta in metas:
+            proc = get_unique_process(meta.pid, meta.create_time)
+            if proc:
+                status = colored("Running", on_color="on_green")
+                ppid = proc.ppid()
+                processes.append(proc)
+            else:
+                status = colored("Exited", on_color="on_light_red")
+                ppid = "N/A"
+            rows.append(
+                (
+                    colored(meta.task, "cyan", attrs=["bold"]),
+                    colored(meta.pid, "cyan", attrs=["bold"]),
+                    ppid,
+                    status,
+                    meta.cmd,
+                    meta.create_time_human,
+                    meta.log_path,
+                )
             )
-        )
-        # add child processes indented
-        if proc:
-            children = proc.children(recursive=True)
-            for idx, child in enumerate(children):
-                prefix = "├ " if idx < len(children) - 1 else "└ "
-                rows.append(get_table_row(child, target_ppid=proc.pid, prefix=prefix))
-                processes.append(child)
-
-    # calculate column widths
-    widths = [max(len_ansi(str(row[i])) for row in rows) for i in range(len(headers))]
-
-    term_width = shutil.get_terminal_size().columns
-    diff = sum(widths) + 2 * (len(headers) - 1) - term_width
-    if diff > 0 and not full_width:
-        # truncate CMD column
-        cmd_idx = headers.index("CMD")
-        widths[cmd_idx] = max(widths[cmd_idx] - diff, 10)  # at least 10 chars
-
-    # print the table with proper padding
-    lines = []
-    for row in rows:
-        line = "  ".join(
-            # pad the cell except the last one if left-aligned (no need for extra spaces)
-            (
-                pad_ansi(str(cell), widths[i], align[i])
-                if i < len(align) - 1 or align[i] != "<"
-                else str(cell)
+            # add child processes indented
+            if proc:
+                children = proc.children(recursive=True)
+                for idx, child in enumerate(children):
+                    prefix = "├ " if idx < len(children) - 1 else "└ "
+                    rows.append(
+                        get_table_row(child, target_ppid=proc.pid, prefix=prefix)
+                    )
+                    processes.append(child)
+
+    with phase("render"):
+        import shutil
+
+        # calculate column widths
+        widths = [
+            max(len_ansi(str(row[i])) for row in rows) for i in range(len(headers))
+        ]
+
+        term_width = shutil.get_terminal_size().columns
+        diff = sum(widths) + 2 * (len(headers) - 1) - term_width
+        if diff > 0 and not full_width:
+            # truncate CMD column
+            cmd_idx = headers.index("CMD")
+            widths[cmd_idx] = max(widths[cmd_idx] - diff, 10)  # at least 10 chars
+
+        # print the table with proper padding
+        lines = []
+        for row in rows:
+            line = "  ".join(
+                # pad the cell except the last one if left-aligned (no need for extra spaces)
+                (
+                    pad_ansi(str(cell), widths[i], align[i])
+                    if i < len(align) - 1 or align[i] != "<"
+                    else str(cell)
+                )
+                for i, cell in enumerate(row)
             )
-            for i, cell in enumerate(row)
-        )
-        lines.append(line)
-    print("\n".join(lines), file=sys.stderr)
+            lines.append(line)
+        print("\n".join(lines), file=sys.stderr)
 
     return processes
 
@@ -562,12 +994,17 @@ def get_meta_paths(dir: PathType) -> List[Path]:
 
 def list_processes(dir: PathType, full_width: bool):
     target_dmon_dir = Path(dir).resolve()
-    meta_paths = get_meta_paths(target_dmon_dir)
-    metas = []
-    for meta_path in meta_paths:
-        meta = DmonMeta.load(meta_path)
-        if meta is not None:
-            metas.append(meta)
+    with phase("meta load"):
+        meta_paths = get_meta_paths(target_dmon_dir)
+        metas = []
+        for meta_path in meta_paths:
+            try:
+                meta = DmonMeta.load(meta_path)
+            except ValueError as e:
+                print(colored(f"Skipped: {e}", color="yellow"), file=sys.stderr)
+                continue
+            if meta is not None:
+                metas.append(meta)
     # sort by name (case-insensitive)
     metas.sort(key=lambda m: m.task.lower())
     n_task = len(metas)
@@ -580,11 +1017,76 @@ def list_processes(dir: PathType, full_width: bool):
     return 0
 
 
-def execute(cfg: DmonTaskConfig):
+def list_global_processes(full_width: bool):
+    """
+    List live tasks of all projects from the global registry.
+    Liveness is checked against a single process snapshot; entries of exited
+    processes are pruned from the registry.
+    """
+    from .registry import (
+        get_registry_path,
+        load_registry,
+        prune_registry,
+        registry_enabled,
+    )
+
+    if not registry_enabled():
+        print(
+            colored(
+                f"Task registration is disabled; set {REGISTRY_ENV}=1 when starting tasks to list them here",
+                color="yellow",
+            ),
+            file=sys.stderr,
+        )
+    with phase("meta load"):
+        entries = load_registry()
+    with phase("process snapshot"):
+        snapshot = {
+            p.pid: p.info["create_time"] for p in psutil.process_iter(["create_time"])
+        }
+
+    metas = []
+    stale = []
+    for meta in entries.values():
+        create_time = snapshot.get(meta.pid)
+        if (
+            create_time is not None
+            and meta.create_time >= 0
+            and abs(create_time - meta.create_time) < 1e-3
+        ):
+            metas.append(meta)
+        else:
+            stale.append(meta)
+    if stale:
+        try:
+            prune_registry(stale)
+        except OSError:
+            pass
+
+    # group by project directory, then sort by name (case-insensitive)
+    metas.sort(key=lambda m: (str(Path(m.meta_path).parent), m.task.lower()))
+    n_task = len(metas)
+    n_dir = len({Path(m.meta_path).parent for m in metas})
+    processes = print_process_table(metas, full_width)
+    n_proc = len(processes)
+    print(
+        f"\nFound {n_task} task{'s' if n_task > 1 else ''} ({n_proc} process{'es' if n_proc > 1 else ''}) in {n_dir} director{'ies' if n_dir > 1 else 'y'} (registry: {get_registry_path()})",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def execute(cfg: DmonTaskConfig, tee=False):
     """
     Execute the command in the foreground.
     This is used for the 'dmon exec' command.
+    With tee, the command is run by the runner as by 'dmon start' (writing the
+    same log files), which also copies the output to the console.
     """
+    import shutil
+    import signal
+    import subprocess
+
     cwd = Path(cfg.cwd).resolve()
 
     env = None  # default behavior of Popen
@@ -593,10 +1095,39 @@ def execute(cfg: DmonTaskConfig):
     elif cfg.env:
         env = {**os.environ, **cfg.env}
 
-    shell = isinstance(cfg.cmd, str)
     if ON_WINDOWS and isinstance(cfg.cmd, list) and len(cfg.cmd) > 0:
         # On Windows, use full path for the executable when shell=False
         cfg.cmd[0] = shutil.which(cfg.cmd[0]) or cfg.cmd[0]
+    # exec simple commands directly, without an intermediate shell
+    cmd = resolve_command(
+        cfg.cmd, cwd, (os.environ if env is None else env).get("PATH")
+    )
+
+    if tee:
+        log_path = Path(cfg.log_path).resolve()
+        ensure_log_dir(log_path)
+        meta = DmonMeta(
+            task=cfg.task,
+            log_path=str(log_path),
+            log_rotate=cfg.log_rotate,
+            cmd=cfg.cmd,
+            cwd=str(cwd),
+        )
+        # the same options as launch_task()
+        if uses_runner(cfg):
+            set_runner_options(meta, cfg)
+        else:
+            # 'dmon start' appends to the log file without the runner, i.e.
+            # without a runner log or an index
+            meta.log_index = False
+        options = get_options(asdict(meta))
+        options["cmd"] = cmd
+        options["tee"] = True
+        env = {
+            **(os.environ if env is None else env),
+            CONFIG_ENV: encode_options(options),
+        }
+        cmd = get_runner_command()
 
     def signal_handler(signum: int, frame) -> None:
         if ON_WINDOWS and signum == signal.SIGINT:
@@ -607,10 +1138,10 @@ def execute(cfg: DmonTaskConfig):
     prev_handle_term = signal.signal(signal.SIGTERM, signal_handler)
 
     proc = subprocess.Popen(
-        cfg.cmd,
+        cmd,
         cwd=cwd,
         env=env,
-        shell=shell,
+        shell=isinstance(cmd, str),
         bufsize=0,  # unbuffered
         close_fds=False,
     )
@@ -0,0 +1,356 @@
+"""
+Fork server of the 'forkserver' launcher (POSIX only).
+
+A fork server imports the modules listed in a task's `preload` once, then
+forks Python tasks from itself, so they start with those modules already
+imported and share their memory copy-on-write. It is shared by the tasks
+with the same interpreter, cwd, preload list and environment (PYTHON*
+variables and the task's `env`), listening on a Unix socket in the meta
+directory (`forkserver-<digest>.sock`, with its output in
+`forkserver-<digest>.log`), and exits after IDLE_TIMEOUT seconds without
+running tasks.
+
+A client (`dmon start`) sends one JSON request line:
+
+    {"argv": [...], "cwd": "...", "env": {...}, "log_path": "..."}
+
+and gets back {"pid": <pid>} or {"error": "<message>"}. The task is forked
+into its own session, with the given cwd and environment, stdin from
+/dev/null and stdout/stderr appended to the log file.
+
+NOTE: the server runs on the task's interpreter; only import the standard
+library (and dmon modules that do) here.
+"""
+
+import json
+import os
+import re
+import socket
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from .ipc import SOCK_PATH_MAX, SOCK_SUFFIX, remove_sock, request
+from .utils import file_lock, split_simple_command
+
+
+SERVER_PREFIX = "forkserver-"
+IDLE_TIMEOUT = 600.0
+"""Seconds a fork server keeps running without tasks"""
+START_TIMEOUT = 120.0
+"""Seconds to wait for a new fork server to import the preloaded modules"""
+LAUNCH_TIMEOUT = 10.0
+REQUEST_MAX = 16 * 1024 * 1024
+PYTHON_RE = re.compile(r"python[0-9.]*$")
+
+
+def split_python_command(cmd: Union[str, List[str]]) -> Optional[List[str]]:
+    """
+    Split a task command if it can be run by a fork server, i.e. a Python
+    interpreter running a script, a module (-m) or code (-c), optionally
+    with -u; return None otherwise.
+    """
+    argv = split_simple_command(cmd) if isinstance(cmd, str) else list(cmd)
+    if argv is None or parse_python_args(argv) is None:
+        return None
+    return argv
+
+
+def parse_python_args(
+    argv: Sequence[str],
+) -> Optional[Tuple[str, str, List[str], bool]]:
+    """
+    Parse a Python command into (kind, target, args, unbuffered), where kind
+    is 'script', 'module' or 'code'; return None if not supported.
+    """
+    if not argv or not PYTHON_RE.match(os.path.basename(argv[0])):
+        return None
+    unbuffered = False
+    i = 1
+    while i < len(argv) and argv[i] == "-u":
+        unbuffered = True
+        i += 1
+    if i >= len(argv):
+        return None
+    if argv[i] in ("-m", "-c"):
+        if i + 1 >= len(argv):
+            return None
+        kind = "module" if argv[i] == "-m" else "code"
+        return kind, argv[i + 1], list(argv[i + 2 :]), unbuffered
+    if argv[i].startswith("-"):
+        return None  # other interpreter options cannot be applied after startup
+    return "script", argv[i], list(argv[i + 1 :]), unbuffered
+
+
+def get_server_env(env: Dict[str, str], task_env: Dict[str, str]) -> Dict[str, str]:
+    """
+    The part of a task's environment that a fork server is keyed on, as the
+    preloaded modules are imported under it: the interpreter's PYTHON*
+    variables (e.g. PYTHONPATH) and the variables set by the task's config.
+    """
+    server_env = {k: v for k, v in env.items() if k.startswith("PYTHON")}
+    server_env.update(task_env)
+    return server_env
+
+
+def get_server_path(
+    meta_dir: str,
+    python: str,
+    cwd: str,
+    preload: Sequence[str],
+    server_env: Dict[str, str],
+):
+    """
+    Get the socket path of the fork server for the given interpreter, cwd,
+    preloaded modules and environment (see get_server_env()).
+    Raise RuntimeError if the path is too long for a Unix socket: unlike a
+    task's control socket, it never falls back to the shared temp directory,
+    where another user could listen on it and receive the tasks' environment.
+    """
+    import hashlib
+
+    key = json.dumps([python, cwd, list(preload), sorted(server_env.items())])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+    sock_path = os.path.join(meta_dir, f"{SERVER_PREFIX}{digest}{SOCK_SUFFIX}")
+    if len(os.fsencode(sock_path)) > SOCK_PATH_MAX:
+        raise RuntimeError(
+            f"meta directory path too long for the fork server socket: {sock_path}"
+        )
+    return sock_path
+
+
+def get_server_command(python: str, sock_path: str, preload: Sequence[str]):
+    """
+    Command to start a fork server on the given interpreter. dmon's parent
+    directory is only in sys.path while importing this module, so that the
+    preloaded modules and tasks see the interpreter's own sys.path.
+    """
+    pkg_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    bootstrap = (
+        f"import sys; sys.path.insert(0, {pkg_parent!r}); "
+        f"from dmon.forkserver import main; sys.path.remove({pkg_parent!r}); main()"
+    )
+    return [python, "-c", bootstrap, sock_path, *preload]
+
+
+def start_server(python: str, sock_path: str, preload: Sequence[str], cwd: str, env):
+    """
+    Start a fork server in the background and wait until it serves,
+    or raise RuntimeError.
+    """
+    import subprocess
+
+    log_path = sock_path[: -len(SOCK_SUFFIX)] + ".log"
+    with open(log_path, "ab", buffering=0) as lof:
+        proc = subprocess.Popen(
+            get_server_command(python, sock_path, preload),
+            stdin=subprocess.DEVNULL,
+            stdout=lof,
+            stderr=subprocess.STDOUT,
+            cwd=cwd,
+            env=env,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(
+                f"fork server exited with code {proc.returncode}; see {log_path}"
+            )
+        if request(sock_path, json.dumps({"ping": True})) is not None:
+            return
+        time.sleep(0.05)
+    raise RuntimeError(f"fork server did not start in {START_TIMEOUT}s; see {log_path}")
+
+
+def launch(
+    meta_dir: str,
+    argv: Sequence[str],
+    cwd: str,
+    env,
+    log_path: str,
+    preload: Sequence[str],
+    task_env: Optional[Dict[str, str]] = None,
+) -> int:
+    """
+    Start a Python task from the fork server for its interpreter, cwd,
+    preloaded modules and environment (starting the server if needed), and
+    return its PID. task_env is the environment set by the task's config.
+    Raise RuntimeError if it fails.
+    """
+    import shutil
+
+    exe = argv[0]
+    if "/" in exe:
+        python = os.path.abspath(os.path.join(cwd, exe))
+    else:
+        python = shutil.which(exe, path=env.get("PATH")) or exe
+    server_env = get_server_env(env, task_env or {})
+    sock_path = get_server_path(meta_dir, python, cwd, preload, server_env)
+    line = json.dumps(
+        {"argv": list(argv), "cwd": cwd, "env": env, "log_path": log_path}
+    )
+
+    response = request(sock_path, line, timeout=LAUNCH_TIMEOUT)
+    if response is None:
+        # one server per socket, even if tasks are started concurrently
+        with file_lock(sock_path[: -len(SOCK_SUFFIX)] + ".lock"):
+            response = request(sock_path, line, timeout=LAUNCH_TIMEOUT)
+            if response is None:
+                start_server(python, sock_path, preload, cwd, env)
+                response = request(sock_path, line, timeout=LAUNCH_TIMEOUT)
+    if not response:
+        raise RuntimeError(f"no response from fork server {sock_path}")
+    result = json.loads(response)
+    if "error" in result:
+        raise RuntimeError(f"fork server failed to start the task: {result['error']}")
+    return result["pid"]
+
+
+def alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def read_request(conn: socket.socket) -> dict:
+    conn.settimeout(LAUNCH_TIMEOUT)
+    data = b""
+    while b"\n" not in data and len(data) < REQUEST_MAX:
+        chunk = conn.recv(1024 * 1024)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data.split(b"\n", 1)[0])
+
+
+def serve(sock_path: str, preload: Sequence[str]) -> dict:
+    """
+    Preload modules, then serve requests until idle for IDLE_TIMEOUT.
+    Only returns in forked children: the request of the task to run.
+    """
+    import importlib
+    import signal
+
+    for module in preload:
+        t0 = time.perf_counter()
+        importlib.import_module(module)
+        print(f"Preloaded {module} in {time.perf_counter() - t0:.3f}s", flush=True)
+
+    # tasks are reaped automatically
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+    try:
+        os.unlink(sock_path)  # stale socket of a killed server
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    server.listen(64)
+    server.settimeout(1.0)
+    print(f"Serving on {sock_path} (pid {os.getpid()})", flush=True)
+
+    pids = set()
+    last_active = time.monotonic()
+    while True:
+        pids = {pid for pid in pids if alive(pid)}
+        if pids:
+            last_active = time.monotonic()
+        elif time.monotonic() - last_active > IDLE_TIMEOUT:
+            print(f"Idle for {IDLE_TIMEOUT:.0f}s, exiting", flush=True)
+            server.close()
+            remove_sock(sock_path)
+            sys.exit(0)
+        try:
+            conn, _ = server.accept()
+        except socket.timeout:
+            continue
+        with conn:
+            try:
+                req = read_request(conn)
+                if req.get("ping"):
+                    conn.sendall(b'{"pong": true}\n')
+                    continue
+                if parse_python_args(req["argv"]) is None:
+                    raise ValueError(f"not a supported Python command: {req['argv']}")
+                if not os.path.isdir(req["cwd"]):
+                    raise ValueError(f"cwd does not exist: {req['cwd']}")
+                log_fd = os.open(
+                    req["log_path"], os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644
+                )
+            except Exception as e:
+                try:
+                    conn.sendall(json.dumps({"error": str(e)}).encode("utf-8") + b"\n")
+                except OSError:
+                    pass
+                continue
+            sys.stdout.flush()
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                # the task
+                signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                server.close()
+                conn.close()
+                req["log_fd"] = log_fd
+                return req
+            os.close(log_fd)
+            pids.add(pid)
+            last_active = time.monotonic()
+            print(f"Started task {pid}: {req['argv']}", flush=True)
+            try:
+                conn.sendall(json.dumps({"pid": pid}).encode("utf-8") + b"\n")
+            except OSError:
+                pass
+
+
+def run_task(req: dict):
+    """
+    Run the requested task in the forked child, like the interpreter would
+    run the command.
+    """
+    import runpy
+
+    os.setsid()
+    null_fd = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_fd, 0)
+    os.close(null_fd)
+    os.dup2(req["log_fd"], 1)
+    os.dup2(req["log_fd"], 2)
+    os.close(req["log_fd"])
+    os.chdir(req["cwd"])
+    os.environ.clear()
+    os.environ.update(req["env"])
+
+    kind, target, args, unbuffered = parse_python_args(req["argv"])
+    if unbuffered:
+        sys.stdout.reconfigure(write_through=True)
+        sys.stderr.reconfigure(write_through=True)
+    if kind == "module":
+        sys.argv = [target, *args]  # replaced with the module path by runpy
+        sys.path[0] = os.getcwd()
+        runpy.run_module(target, run_name="__main__", alter_sys=True)
+    elif kind == "code":
+        sys.argv = ["-c", *args]
+        sys.path[0] = ""
+        exec(compile(target, "<string>", "exec"), {"__name__": "__main__"})
+    else:
+        sys.argv = [target, *args]
+        sys.path[0] = os.path.dirname(os.path.abspath(target))
+        runpy.run_path(target, run_name="__main__")
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m dmon.forkserver <sock_path> [module ...]")
+    req = serve(sys.argv[1], sys.argv[2:])
+    # only in the forked task; exits like a regular interpreter
+    run_task(req)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+Search a task's whole log history (the live log and rotated, possibly
+compressed, segments) with a compiled bytes regex.
+
+Log ranges are split into jobs of about JOB_SIZE bytes at line boundaries
+(plain files) or index block boundaries (compressed files), searched across a
+process pool (plain files are memory-mapped, compressed ones decompressed in a
+stream), and the results are written in chronological order.
+"""
+
+import mmap
+import os
+from pathlib import Path
+import re
+import sys
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from .logs import (
+    LogRange,
+    LogSegment,
+    get_index,
+    iter_range,
+    select_ranges,
+    warn_unindexed,
+)
+from .types import PathType
+
+
+JOB_SIZE = 32 * 1024 * 1024
+"""Approximate (uncompressed) bytes searched by a job"""
+
+_regex: Optional["re.Pattern[bytes]"] = None
+
+
+class GrepJob(NamedTuple):
+    path: str
+    compressed: bool
+    start: int
+    end: Optional[int]
+
+
+def compile_pattern(
+    pattern: str, ignore_case=False, fixed=False
+) -> "re.Pattern[bytes]":
+    raw = pattern.encode("utf-8", "surrogateescape")
+    if fixed:
+        raw = re.escape(raw)
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile(raw, flags)
+
+
+def split_plain(r: LogRange, job_size: int) -> List[GrepJob]:
+    """
+    Split a plain log range into jobs at line boundaries.
+    """
+    path = str(r.segment.path)
+    size = os.path.getsize(path)
+    end = size if r.end is None else min(r.end, size)
+    if end - r.start <= job_size:
+        return [GrepJob(path, False, r.start, end)]
+    jobs = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = r.start
+        while start < end:
+            cut = mm.find(b"\n", min(start + job_size, end) - 1, end) + 1
+            if cut == 0 or end - cut < job_size // 4:
+                # avoid a tiny trailing job
+                cut = end
+            jobs.append(GrepJob(path, False, start, cut))
+            start = cut
+    return jobs
+
+
+def split_compressed(r: LogRange, job_size: int) -> List[GrepJob]:
+    """
+    Split a compressed log range into jobs at index block boundaries,
+    so that each job only decompresses its own blocks.
+    """
+    path = str(r.segment.path)
+    jobs = []
+    start = r.start
+    for entry in get_index(r.segment):
+        if r.end is not None and entry.offset >= r.end:
+            break
+        if entry.offset - start >= job_size:
+            jobs.append(GrepJob(path, True, start, entry.offset))
+            start = entry.offset
+    jobs.append(GrepJob(path, True, start, r.end))
+    return jobs
+
+
+def make_jobs(ranges: Iterable[LogRange], job_size: int = JOB_SIZE) -> List[GrepJob]:
+    jobs = []
+    for r in ranges:
+        try:
+            if r.segment.compressed:
+                jobs.extend(split_compressed(r, job_size))
+            else:
+                jobs.extend(split_plain(r, job_size))
+        except (OSError, ValueError):
+            # missing (rotated away) or empty file
+            continue
+    return jobs
+
+
+def search_buffer(
+    regex: "re.Pattern[bytes]", buf, pos: int, endpos: int, out: List[bytes]
+):
+    """
+    Append the lines of buf[pos:endpos] (starting at line boundaries) matching regex.
+    """
+    while True:
+        m = regex.search(buf, pos, endpos)
+        if m is None:
+            return
+        line_start = buf.rfind(b"\n", pos, m.start()) + 1 or pos
+        line_end = buf.find(b"\n", m.start(), endpos)
+        line_end = endpos if line_end < 0 else line_end + 1
+        out.append(bytes(buf[line_start:line_end]))
+        if line_end >= endpos:
+            return
+        pos = line_end
+
+
+def search_job(job: GrepJob, regex: "re.Pattern[bytes]") -> List[bytes]:
+    """
+    Return the matching lines of a job, in order.
+    """
+    matches: List[bytes] = []
+    try:
+        if not job.compressed:
+            if job.end is not None and job.end <= job.start:
+                return matches
+            with open(job.path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    end = len(mm) if job.end is None else min(job.end, len(mm))
+                    search_buffer(regex, mm, job.start, end, matches)
+            return matches
+        segment = LogSegment(Path(job.path), None, True)
+        pending = b""
+        for block in iter_range(LogRange(segment, job.start, job.end)):
+            block = pending + block
+            cut = block.rfind(b"\n") + 1
+            pending = block[cut:]
+            if cut:
+                search_buffer(regex, block, 0, cut, matches)
+        if pending:
+            search_buffer(regex, pending, 0, len(pending), matches)
+    except (OSError, ValueError):
+        # rotated, compressed or truncated in the meantime
+        pass
+    return matches
+
+
+def init_worker(regex: "re.Pattern[bytes]"):
+    global _regex
+    _regex = regex
+
+
+def run_job(job: GrepJob) -> List[bytes]:
+    return search_job(job, _regex)
+
+
+def iter_matches(
+    jobs: List[GrepJob], regex: "re.Pattern[bytes]", workers: Optional[int] = None
+) -> Iterator[List[bytes]]:
+    """
+    Yield matching lines of each job, in job order.
+    A process pool is only used if there is more than one job.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for job in jobs:
+            yield search_job(job, regex)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_worker, initargs=(regex,)
+    ) as executor:
+        # map() yields results in submission (chronological) order
+        yield from executor.map(run_job, jobs)
+
+
+def grep_logs(
+    log_path: PathType,
+    pattern: str,
+    ignore_case: bool = False,
+    fixed: bool = False,
+    count: bool = False,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    workers: Optional[int] = None,
+):
+    """
+    Print lines of a task's logs (live and rotated) matching pattern, in chronological order.
+    Return 0 if any line matched, otherwise 1 (like grep).
+    """
+    regex = compile_pattern(pattern, ignore_case=ignore_case, fixed=fixed)
+    unindexed: List[Path] = []
+    jobs = make_jobs(select_ranges(log_path, since, until, unindexed=unindexed))
+    warn_unindexed(unindexed)
+    out = sys.stdout.buffer
+    n_matches = 0
+    try:
+        for lines in iter_matches(jobs, regex, workers):
+            n_matches += len(lines)
+            if count:
+                continue
+            for line in lines:
+                out.write(line if line.endswith(b"\n") else line + b"\n")
+        if count:
+            out.write(f"{n_matches}\n".encode())
+        out.flush()
+    except BrokenPipeError:
+        # e.g. piped to `head`; avoid another error when flushing at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0 if n_matches else 1
@@ -0,0 +1,114 @@
+"""
+Per-task control socket of the runner.
+
+The runner listens on a Unix stream socket next to the meta file. A client
+sends one request line (e.g. b"tail 200\\n"), and the runner writes its
+response and closes the connection.
+
+NOTE: this module is imported by the runner; keep its imports minimal.
+"""
+
+import os
+import socket
+import threading
+from typing import Callable, Optional
+
+from .constants import META_SUFFIX
+
+
+SOCK_SUFFIX = ".sock"
+SOCK_PATH_MAX = 100
+"""Conservative max length of a Unix socket path (the limit is 104~108 bytes)"""
+REQUEST_MAX = 4096
+CLIENT_TIMEOUT = 2.0
+
+
+def sockets_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+def get_sock_path(meta_path: str) -> str:
+    """
+    Get the control socket path of a task: next to its meta file, or '' (no
+    socket) if that path is too long for a Unix socket. There is no fallback
+    to the shared temp directory, where another user could take the
+    predictable path first and serve forged output or block the runner.
+    """
+    if meta_path.endswith(META_SUFFIX):
+        sock_path = meta_path[: -len(META_SUFFIX)] + SOCK_SUFFIX
+    else:
+        sock_path = meta_path + SOCK_SUFFIX
+    if len(os.fsencode(sock_path)) <= SOCK_PATH_MAX:
+        return sock_path
+    return ""
+
+
+def serve(sock_path: str, handler: Callable[[str], bytes]) -> threading.Thread:
+    """
+    Serve requests on the socket in a daemon thread.
+    handler maps a request line (without newline) to the response.
+    """
+    try:
+        os.unlink(sock_path)  # stale socket of a killed runner
+    except FileNotFoundError:
+        pass
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(sock_path)
+    server.listen(8)
+
+    def loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(CLIENT_TIMEOUT)
+                    request = b""
+                    while b"\n" not in request and len(request) < REQUEST_MAX:
+                        data = conn.recv(REQUEST_MAX)
+                        if not data:
+                            break
+                        request += data
+                    line = request.split(b"\n", 1)[0].decode("utf-8", "replace")
+                    conn.sendall(handler(line.strip()))
+                except Exception:
+                    # never let a bad client kill the server
+                    continue
+
+    thread = threading.Thread(target=loop, name="dmon-ipc", daemon=True)
+    thread.start()
+    return thread
+
+
+def request(
+    sock_path: str, line: str, timeout: float = CLIENT_TIMEOUT
+) -> Optional[bytes]:
+    """
+    Send a request line and return the whole response,
+    or None if the runner cannot be reached.
+    """
+    if not sock_path or not sockets_supported():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(timeout)
+            client.connect(sock_path)
+            client.sendall(line.encode("utf-8") + b"\n")
+            chunks = []
+            while True:
+                data = client.recv(64 * 1024)
+                if not data:
+                    break
+                chunks.append(data)
+    except OSError:
+        return None
+    return b"".join(chunks)
+
+
+def remove_sock(sock_path: str):
+    try:
+        os.unlink(sock_path)
+    except OSError:
+        pass
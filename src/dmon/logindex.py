@@ -0,0 +1,192 @@
+"""
+Sparse timestamp index of log segments.
+
+Next to each log segment (the live log or a rotated one), the runner keeps a
+sidecar index file ('<segment>.idx') with fixed-size entries of
+(wall-clock time, byte offset, line number, compressed offset).
+
+An entry is appended at a line boundary every INDEX_EVERY_BYTES bytes or
+INDEX_EVERY_SECONDS seconds of output, so that all data before the offset was
+written no later than the entry's time, and all data after it no earlier.
+
+Compressed segments ('<segment>.gz') are a concatenation of independent gzip
+members, one per index block, and their index carries the offset of each
+member, so that a time window can be decompressed without the rest.
+
+NOTE: this module is imported by the runner; keep its imports minimal.
+"""
+
+import os
+import struct
+import time
+from typing import List, NamedTuple
+
+
+INDEX_SUFFIX = ".idx"
+COMPRESSED_SUFFIX = ".gz"
+INDEX_MAGIC = b"DMONIDX1"
+INDEX_EVERY_BYTES = 256 * 1024
+INDEX_EVERY_SECONDS = 1.0
+
+ENTRY = struct.Struct("<dqqq")
+
+
+class IndexEntry(NamedTuple):
+    time: float
+    """Wall-clock time when the data before offset was written"""
+    offset: int
+    """Byte offset in the (uncompressed) segment, at a line boundary"""
+    lineno: int
+    """Number of lines before offset"""
+    zoffset: int
+    """Offset of the gzip member starting at offset in the compressed segment, or -1"""
+
+
+def read_index(path) -> List[IndexEntry]:
+    """
+    Read all entries of an index file; return an empty list if missing or invalid.
+    A trailing partial entry (from an interrupted write) is ignored.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return []
+    if not data.startswith(INDEX_MAGIC):
+        return []
+    start = len(INDEX_MAGIC)
+    n = (len(data) - start) // ENTRY.size
+    return [
+        IndexEntry(*ENTRY.unpack_from(data, start + i * ENTRY.size)) for i in range(n)
+    ]
+
+
+def write_index(path, entries: List[IndexEntry]):
+    with open(path, "wb") as f:
+        f.write(INDEX_MAGIC)
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+
+
+def count_lines(path, start: int, end: int) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(1024 * 1024, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            count += chunk.count(b"\n")
+    return count
+
+
+class IndexWriter:
+    """
+    Append index entries for the live log segment as output is written.
+    """
+
+    def __init__(
+        self,
+        path,
+        log_path,
+        every_bytes: int = INDEX_EVERY_BYTES,
+        every_seconds: float = INDEX_EVERY_SECONDS,
+    ):
+        self.path = path
+        self.every_bytes = every_bytes
+        self.every_seconds = every_seconds
+
+        # continue an existing index if it matches the log file
+        size = os.path.getsize(log_path) if os.path.exists(log_path) else 0
+        entries = read_index(path)
+        if entries and entries[-1].offset <= size:
+            last = entries[-1]
+            lineno = last.lineno + count_lines(log_path, last.offset, size)
+            self.file = open(path, "ab")
+            # drop a trailing partial entry
+            valid_size = len(INDEX_MAGIC) + len(entries) * ENTRY.size
+            if self.file.tell() != valid_size:
+                self.file.truncate(valid_size)
+                self.file.seek(valid_size)
+        else:
+            lineno = count_lines(log_path, 0, size) if size else 0
+            self.file = open(path, "wb")
+            self.file.write(INDEX_MAGIC)
+            entries = []
+        self.lineno = lineno
+        """Number of lines in the log file when opened"""
+        self.last_offset = entries[-1].offset if entries else -1
+        self.last_time = entries[-1].time if entries else 0.0
+        self.seen = (size, lineno)
+        self.add(size, lineno, time.time(), force=True)
+
+    def add(self, offset: int, lineno: int, now: float, force=False):
+        """
+        Record that everything before offset (at a line boundary) has been written,
+        if enough bytes or time have passed since the last entry.
+        """
+        self.seen = (offset, lineno)
+        if (
+            force
+            or offset - self.last_offset >= self.every_bytes
+            or now - self.last_time >= self.every_seconds
+        ) and offset != self.last_offset:
+            self.file.write(ENTRY.pack(now, offset, lineno, -1))
+            self.file.flush()
+            self.last_offset = offset
+            self.last_time = now
+
+    def close(self):
+        """
+        Record the last line boundary seen, and close the index file.
+        """
+        offset, lineno = self.seen
+        self.add(offset, lineno, time.time(), force=True)
+        self.file.close()
+
+
+def compress_segment(path, level: int = 6):
+    """
+    Compress a rotated segment into '<path>.gz', as one gzip member per index block,
+    with its index at '<path>.gz.idx'. The plain segment and its index are removed.
+    """
+    import zlib
+
+    index_path = str(path) + INDEX_SUFFIX
+    gz_path = str(path) + COMPRESSED_SUFFIX
+    gz_index_path = gz_path + INDEX_SUFFIX
+    tmp_path = gz_path + ".tmp"
+
+    size = os.path.getsize(path)
+    entries = [e for e in read_index(index_path) if e.offset <= size]
+    if not entries or entries[0].offset != 0:
+        # no usable index: a single member for the whole segment
+        entries = [IndexEntry(os.path.getmtime(path), 0, 0, -1)]
+
+    new_entries = []
+    with open(path, "rb") as src, open(tmp_path, "wb") as dst:
+        for i, entry in enumerate(entries):
+            end = entries[i + 1].offset if i + 1 < len(entries) else size
+            new_entries.append(entry._replace(zoffset=dst.tell()))
+            if end <= entry.offset:
+                continue
+            src.seek(entry.offset)
+            comp = zlib.compressobj(level, zlib.DEFLATED, 31)  # gzip member
+            remaining = end - entry.offset
+            while remaining > 0:
+                chunk = src.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                dst.write(comp.compress(chunk))
+            dst.write(comp.flush())
+
+    write_index(gz_index_path, new_entries)
+    os.replace(tmp_path, gz_path)
+    os.unlink(path)
+    try:
+        os.unlink(index_path)
+    except OSError:
+        pass
@@ -0,0 +1,591 @@
+from bisect import bisect_left, bisect_right
+from math import inf
+import os
+from pathlib import Path
+import re
+import sys
+import time
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from termcolor import colored
+
+from .constants import LOG_PATH_TEMPLATE, META_PATH_TEMPLATE
+from .logindex import INDEX_SUFFIX, IndexEntry, read_index
+from .types import DmonMeta, PathType
+
+
+BLOCK_SIZE = 64 * 1024
+"""Block size for reading log files"""
+FOLLOW_MIN_INTERVAL = 0.05
+"""Polling interval in seconds right after new data arrives when following logs"""
+FOLLOW_MAX_INTERVAL = 1.0
+"""Max polling interval in seconds when following idle logs"""
+
+# suffix appended by the runner when rotating a log file
+SEGMENT_SUFFIX_RE = re.compile(r"\.(\d{8}-\d{6})(\.gz)?$")
+SEGMENT_TIME_FORMAT = "%Y%m%d-%H%M%S"
+
+PREFIX_COLORS = ["cyan", "green", "yellow", "magenta", "blue", "red"]
+
+
+def split_lines(data: bytes) -> List[bytes]:
+    """
+    Split data into lines at b"\n" only, keeping line ends. Unlike
+    bytes.splitlines(), '\r' (e.g. of progress bars) stays inside the line,
+    as lines are counted by b"\n" everywhere.
+    """
+    lines = [line + b"\n" for line in data.split(b"\n")]
+    last = lines.pop()[:-1]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def get_log_path(task: str, cfg_path: Optional[str] = None) -> Path:
+    """
+    Get the log path of a task: from its meta file if it is started,
+    otherwise from its config, otherwise the default path.
+    """
+    try:
+        meta = DmonMeta.load(META_PATH_TEMPLATE.format(task=task))
+    except (OSError, ValueError, TypeError):
+        meta = None
+    if meta is not None and meta.log_path:
+        return Path(meta.log_path)
+
+    from .config import get_task_config
+
+    try:
+        _, task_cfgs = get_task_config([task], cfg_path)
+        if task_cfgs[0].log_path:
+            return Path(task_cfgs[0].log_path).resolve()
+    except (FileNotFoundError, ValueError, TypeError):
+        pass
+    return Path(LOG_PATH_TEMPLATE.format(task=task)).resolve()
+
+
+def get_task_sock_path(task: str) -> str:
+    """
+    Get the control socket path of a started task from its meta file ('' if none).
+    """
+    try:
+        meta = DmonMeta.load(META_PATH_TEMPLATE.format(task=task))
+    except (OSError, ValueError, TypeError):
+        meta = None
+    return meta.sock_path if meta is not None else ""
+
+
+def parse_time(value: str) -> float:
+    """
+    Parse a point in time to epoch seconds. Accepted forms:
+    - relative: '30s', '10m', '2h', '1d' (ago)
+    - absolute (local time): 'YYYY-mm-dd', 'YYYY-mm-dd HH:MM[:SS]', 'YYYY-mm-ddTHH:MM[:SS]'
+    - time of today: 'HH:MM[:SS]'
+    """
+    value = value.strip()
+    m = re.fullmatch(r"(\d+(?:\.\d+)?)([smhd])", value)
+    if m:
+        unit = {"s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+        return time.time() - float(m.group(1)) * unit
+    for fmt in (
+        "%Y-%m-%d %H:%M:%S",
+        "%Y-%m-%dT%H:%M:%S",
+        "%Y-%m-%d %H:%M",
+        "%Y-%m-%dT%H:%M",
+        "%Y-%m-%d",
+    ):
+        try:
+            return time.mktime(time.strptime(value, fmt))
+        except ValueError:
+            pass
+    for fmt in ("%H:%M:%S", "%H:%M"):
+        try:
+            t = time.strptime(value, fmt)
+        except ValueError:
+            continue
+        today = time.localtime()
+        return time.mktime(
+            (today.tm_year, today.tm_mon, today.tm_mday)
+            + (t.tm_hour, t.tm_min, t.tm_sec, 0, 0, -1)
+        )
+    raise ValueError(
+        f"Invalid time '{value}'; use e.g. '10m', '2h', 'HH:MM[:SS]' or 'YYYY-mm-dd HH:MM[:SS]'"
+    )
+
+
+class LogSegment(NamedTuple):
+    path: Path
+    rotated_at: Optional[float]
+    """Rotation time parsed from the file name, or None for the live log"""
+    compressed: bool
+
+
+class LogRange(NamedTuple):
+    segment: LogSegment
+    start: int
+    """Start offset (uncompressed)"""
+    end: Optional[int]
+    """End offset (uncompressed), or None for the end of the segment"""
+
+
+def list_segments(log_path: PathType) -> List[LogSegment]:
+    """
+    List rotated segments of the given log file, sorted by rotation time.
+    Rotated segments are named '<log_path>.<YYYYmmdd-HHMMSS>[.gz]' by the runner.
+    If both the plain and the compressed segment exist (compression in progress),
+    the plain one is used.
+    """
+    log_path = Path(log_path)
+    segments: Dict[str, LogSegment] = {}
+    try:
+        candidates = list(log_path.parent.glob(log_path.name + ".*"))
+    except OSError:
+        return []
+    for path in candidates:
+        m = SEGMENT_SUFFIX_RE.fullmatch(path.name[len(log_path.name) :])
+        if not m:
+            continue
+        try:
+            rotated_at = time.mktime(time.strptime(m.group(1), SEGMENT_TIME_FORMAT))
+        except ValueError:
+            continue
+        compressed = bool(m.group(2))
+        if m.group(1) in segments and compressed:
+            continue
+        segments[m.group(1)] = LogSegment(path, rotated_at, compressed)
+    return sorted(segments.values(), key=lambda seg: seg.rotated_at or 0)
+
+
+def get_index(segment: LogSegment) -> List[IndexEntry]:
+    return read_index(str(segment.path) + INDEX_SUFFIX)
+
+
+def get_mtime(path: Path) -> float:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return inf
+
+
+def warn_unindexed(paths: Sequence[Path]):
+    for path in paths:
+        print(
+            colored(
+                f"Warning: no time index for {path}; it is not narrowed down by --since / --until",
+                color="yellow",
+            ),
+            file=sys.stderr,
+        )
+
+
+def select_ranges(
+    log_path: PathType,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    live_end: Optional[int] = None,
+    unindexed: Optional[List[Path]] = None,
+) -> List[LogRange]:
+    """
+    Get the ranges of log segments (rotated segments and the live log) in chronological order,
+    covering the time window [since, until].
+
+    Segments are selected by binary search over their rotation times (from file names),
+    and the first and last segments are narrowed down by their timestamp indexes
+    (to index granularity), so that only the needed window is read.
+    Without an index (e.g. tasks not started by the runner), a segment last
+    written before 'since' is skipped, and one that cannot be narrowed down
+    is read whole and appended to 'unindexed' if given.
+    'live_end' optionally limits how far the live log is read.
+    """
+    segments = list_segments(log_path)
+    live = Path(log_path)
+    if live.exists():
+        segments.append(LogSegment(live, None, False))
+    # the live log is "rotated" in the future
+    times = [seg.rotated_at if seg.rotated_at is not None else inf for seg in segments]
+
+    # segment i covers the time between the rotation of segment i-1 and its own rotation
+    first = bisect_left(times, since) if since is not None else 0
+    last = bisect_left(times, until) if until is not None else len(segments) - 1
+    last = min(last, len(segments) - 1)
+
+    ranges = []
+    for i in range(first, last + 1):
+        segment = segments[i]
+        start, end = 0, None
+        if (i == first and since is not None) or (i == last and until is not None):
+            entries = get_index(segment)
+            if not entries:
+                # fall back to the segment's time bounds: the previous rotation,
+                # and its own rotation (or last modification for the live log)
+                seg_start = times[i - 1] if i > 0 else None
+                seg_end = segment.rotated_at
+                if seg_end is None:
+                    seg_end = get_mtime(segment.path)
+                cut_since = (
+                    i == first
+                    and since is not None
+                    and (seg_start is None or seg_start < since)
+                )
+                if cut_since and seg_end < since:
+                    continue  # written before the window
+                cut_until = i == last and until is not None and seg_end > until
+                if (cut_since or cut_until) and unindexed is not None:
+                    unindexed.append(segment.path)
+            entry_times = [e.time for e in entries]
+            if i == first and since is not None:
+                # data after an entry's offset was written no earlier than its time
+                j = bisect_right(entry_times, since) - 1
+                if j >= 0:
+                    start = entries[j].offset
+            if i == last and until is not None:
+                # data before an entry's offset was written no later than its time
+                j = bisect_right(entry_times, until)
+                if j < len(entries):
+                    end = entries[j].offset
+        if segment.rotated_at is None and live_end is not None:
+            end = live_end if end is None else min(end, live_end)
+        ranges.append(LogRange(segment, start, end))
+    return ranges
+
+
+def iter_plain(path: Path, start: int, end: Optional[int]) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start
+        while remaining is None or remaining > 0:
+            size = BLOCK_SIZE if remaining is None else min(BLOCK_SIZE, remaining)
+            block = f.read(size)
+            if not block:
+                break
+            if remaining is not None:
+                remaining -= len(block)
+            yield block
+
+
+def iter_compressed(
+    path: Path, start: int, end: Optional[int], entries: Sequence[IndexEntry]
+) -> Iterator[bytes]:
+    """
+    Stream-decompress a gzip segment between uncompressed offsets.
+    With an index, decompression starts at the gzip member containing 'start';
+    without one, from the beginning.
+    """
+    import zlib
+
+    pos = 0  # uncompressed position
+    zpos = 0
+    j = bisect_right([e.offset for e in entries], start) - 1
+    if j >= 0 and entries[j].zoffset >= 0:
+        pos, zpos = entries[j].offset, entries[j].zoffset
+
+    with open(path, "rb") as f:
+        f.seek(zpos)
+        decomp = zlib.decompressobj(31)
+        while end is None or pos < end:
+            zblock = f.read(BLOCK_SIZE)
+            if not zblock:
+                break
+            outputs = []
+            while zblock:
+                outputs.append(decomp.decompress(zblock))
+                if not decomp.eof:
+                    break
+                # next gzip member
+                zblock = decomp.unused_data
+                decomp = zlib.decompressobj(31)
+            block = b"".join(outputs)
+            block_start, pos = pos, pos + len(block)
+            if pos <= start:
+                continue
+            lo = max(start - block_start, 0)
+            hi = len(block) if end is None else min(end - block_start, len(block))
+            if hi > lo:
+                yield block[lo:hi]
+
+
+def iter_range(r: LogRange) -> Iterator[bytes]:
+    try:
+        if r.segment.compressed:
+            yield from iter_compressed(
+                r.segment.path, r.start, r.end, get_index(r.segment)
+            )
+        else:
+            yield from iter_plain(r.segment.path, r.start, r.end)
+    except OSError:
+        # e.g. rotated or compressed away in the meantime
+        return
+
+
+def iter_ranges(ranges: Sequence[LogRange]) -> Iterator[bytes]:
+    """
+    Stream log ranges in chronological order, in blocks.
+    """
+    for r in ranges:
+        yield from iter_range(r)
+
+
+def tail_lines(
+    path: PathType,
+    n: int,
+    start: int = 0,
+    end: Optional[int] = None,
+    block_size: int = BLOCK_SIZE,
+) -> List[bytes]:
+    """
+    Read the last n lines of a file (between offsets 'start' and 'end' if given)
+    by seeking backwards in blocks from its end.
+    """
+    if n <= 0:
+        return []
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        if end is not None:
+            pos = min(pos, end)
+        chunks = []
+        count = 0
+        # read until n+1 newlines are seen, so that the n-th last line is complete
+        while pos > start and count <= n:
+            size = min(block_size, pos - start)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size)
+            chunks.append(chunk)
+            count += chunk.count(b"\n")
+    lines = split_lines(b"".join(reversed(chunks)))
+    return lines[-n:]
+
+
+def tail_compressed(r: LogRange, n: int) -> List[bytes]:
+    """
+    Read the last n lines of a compressed range, decompressing index blocks
+    backwards from its end until enough lines are found.
+    """
+    entries = get_index(r.segment)
+    bounds = [
+        e.offset
+        for e in entries
+        if r.start < e.offset and (r.end is None or e.offset < r.end)
+    ]
+    starts = [r.start, *bounds]
+    ends = [*bounds, r.end]
+    lines: List[bytes] = []
+    for block_start, block_end in zip(reversed(starts), reversed(ends)):
+        block = b"".join(iter_range(LogRange(r.segment, block_start, block_end)))
+        lines = split_lines(block) + lines
+        if len(lines) >= n:
+            break
+    return lines[-n:]
+
+
+def tail_ranges(ranges: Sequence[LogRange], n: int) -> List[bytes]:
+    """
+    Read the last n lines across log ranges in chronological order,
+    going back to older segments only if needed.
+    """
+    lines: List[bytes] = []
+    for r in reversed(ranges):
+        if len(lines) >= n:
+            break
+        try:
+            if r.segment.compressed:
+                older = tail_compressed(r, n - len(lines))
+            else:
+                older = tail_lines(r.segment.path, n - len(lines), r.start, r.end)
+        except OSError:
+            continue
+        if older and lines and not older[-1].endswith(b"\n"):
+            older[-1] += b"\n"
+        lines = older + lines
+    return lines
+
+
+class LogFollower:
+    """
+    Follow a log file by polling, across rotations.
+
+    The file is tracked by inode: when the path is replaced (rotated) or truncated,
+    the rest of the old file is drained before switching to the new one.
+    Only complete lines are returned; a partial last line is kept until completed.
+    """
+
+    def __init__(self, log_path: PathType, from_end: bool = True):
+        self.log_path = Path(log_path)
+        self.file: Optional[BinaryIO] = None
+        self.ino: Optional[int] = None
+        self.pending = b""
+        self.open(seek_end=from_end)
+
+    def open(self, seek_end: bool):
+        try:
+            f = open(self.log_path, "rb")
+        except OSError:
+            self.file = None
+            self.ino = None
+            return
+        self.file = f
+        self.ino = os.fstat(f.fileno()).st_ino
+        if seek_end:
+            f.seek(0, os.SEEK_END)
+
+    def read_available(self) -> bytes:
+        assert self.file is not None
+        chunks = []
+        while True:
+            chunk = self.file.read(BLOCK_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def poll(self) -> List[bytes]:
+        data = b""
+        if self.file is not None:
+            data = self.read_available()
+        try:
+            st = os.stat(self.log_path)
+        except OSError:
+            st = None
+        if self.file is None:
+            if st is not None:
+                self.open(seek_end=False)
+                data += self.read_available()
+        elif st is None or st.st_ino != self.ino:
+            # rotated: drain what was written to the old file since the read above,
+            # then switch to the new one (if any)
+            data += self.read_available()
+            self.file.close()
+            self.open(seek_end=False)
+            if self.file is not None:
+                data += self.read_available()
+        elif st.st_size < self.file.tell():
+            # truncated in place
+            self.file.seek(0)
+            data += self.read_available()
+        if not data:
+            return []
+        data = self.pending + data
+        end = data.rfind(b"\n") + 1
+        self.pending = data[end:]
+        return split_lines(data[:end])
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def get_prefixes(tasks: Sequence[str]) -> List[bytes]:
+    if len(tasks) <= 1:
+        return [b"" for _ in tasks]
+    width = max(len(task) for task in tasks)
+    return [
+        colored(f"{task:<{width}} | ", PREFIX_COLORS[idx % len(PREFIX_COLORS)]).encode()
+        for idx, task in enumerate(tasks)
+    ]
+
+
+def show_recent(targets: Sequence[Tuple[str, Path]], lines: Optional[int] = None):
+    """
+    Print the last 'lines' lines (default: 10) of each task from the runner's
+    in-memory buffer of recent output, without reading log files.
+    Fall back to log files for tasks whose runner cannot be reached.
+    """
+    from .ipc import request
+
+    out = sys.stdout.buffer
+    prefixes = get_prefixes([task for task, _ in targets])
+    if lines is None:
+        lines = 10
+    for prefix, (task, log_path) in zip(prefixes, targets):
+        data = request(get_task_sock_path(task), f"tail {lines}")
+        if data is None:
+            print(
+                colored(
+                    f"No in-memory buffer of task '{task}', reading log files",
+                    "yellow",
+                ),
+                file=sys.stderr,
+            )
+            recent = tail_ranges(select_ranges(log_path), lines)
+        else:
+            recent = split_lines(data)
+        for line in recent:
+            out.write(prefix + (line if line.endswith(b"\n") else line + b"\n"))
+    out.flush()
+    return 0
+
+
+def show_logs(
+    targets: Sequence[Tuple[str, Path]],
+    lines: Optional[int] = None,
+    follow: bool = False,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+):
+    """
+    Print logs of the given (task, log path) targets to stdout.
+    Output of multiple tasks is prefixed by the task name.
+
+    Without 'since' and 'until', print the last 'lines' lines (default: 10) of each task.
+    Otherwise print lines within the time window (the last 'lines' if given),
+    located via the timestamp indexes of log segments (to index granularity).
+    If 'follow' is set, keep printing new lines (merged across tasks) until interrupted.
+    """
+    out = sys.stdout.buffer
+    prefixes = get_prefixes([task for task, _ in targets])
+    if lines is None and since is None and until is None:
+        lines = 10
+
+    # start following before reading existing logs, so that no line is missed in between
+    followers = [LogFollower(log_path) for _, log_path in targets] if follow else []
+
+    for idx, (prefix, (_, log_path)) in enumerate(zip(prefixes, targets)):
+        live_end = None
+        if follow and followers[idx].file is not None:
+            live_end = followers[idx].file.tell()
+        unindexed: List[Path] = []
+        ranges = select_ranges(log_path, since, until, live_end, unindexed)
+        warn_unindexed(unindexed)
+        if lines is not None:
+            for line in tail_ranges(ranges, lines):
+                out.write(prefix + line)
+        elif prefix:
+            pending = b""
+            for block in iter_ranges(ranges):
+                block = pending + block
+                end = block.rfind(b"\n") + 1
+                pending = block[end:]
+                for line in split_lines(block[:end]):
+                    out.write(prefix + line)
+            if pending:
+                out.write(prefix + pending + b"\n")
+        else:
+            for block in iter_ranges(ranges):
+                out.write(block)
+    out.flush()
+
+    if not follow:
+        return 0
+
+    interval = FOLLOW_MIN_INTERVAL
+    try:
+        while True:
+            got = False
+            for prefix, follower in zip(prefixes, followers):
+                for line in follower.poll():
+                    out.write(prefix + line)
+                    got = True
+            if got:
+                out.flush()
+                interval = FOLLOW_MIN_INTERVAL
+            else:
+                # back off while idle to avoid burning CPU
+                interval = min(interval * 2, FOLLOW_MAX_INTERVAL)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for follower in followers:
+            follower.close()
+    return 0
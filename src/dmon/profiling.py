@@ -0,0 +1,151 @@
+"""
+Phase timing of a CLI invocation, enabled by `--profile` or DMON_PROFILE=1.
+
+Code paths are marked with `with phase("name"):`, or functions with
+`@timed("name")`. Timings of phases with the same name add up, and nested
+phases are shown indented under the enclosing one; the report is printed to
+stderr when the command finishes. With
+`--profile-out FILE` (or DMON_PROFILE_OUT=FILE), the command also runs under
+cProfile and the stats are dumped to FILE (e.g. `python -m pstats FILE`).
+
+When disabled, phase() returns a shared no-op context manager.
+"""
+
+import functools
+import sys
+import time
+from typing import Dict, List, Optional
+
+
+class NullPhase:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_PHASE = NullPhase()
+
+
+class Profiler:
+    def __init__(self, start: float, pstats_path: Optional[str] = None):
+        self.start = start
+        self.phases: Dict[str, List] = {}
+        """Phase name to [seconds, count, depth], in order of first use"""
+        self.depth = 0
+        self.pstats_path = None
+        self.cprofile = None
+        if pstats_path:
+            self.set_pstats_path(pstats_path)
+
+    def set_pstats_path(self, pstats_path: str):
+        """
+        Dump cProfile stats to the given path, starting cProfile now if not yet.
+        """
+        self.pstats_path = pstats_path
+        if self.cprofile is None:
+            import cProfile
+
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def add(self, name: str, seconds: float, depth: int = 0):
+        entry = self.phases.setdefault(name, [0.0, 0, depth])
+        entry[0] += seconds
+        entry[1] += 1
+
+    def enter(self, name: str) -> int:
+        """
+        Start a phase: list it (before its nested phases) and return its depth.
+        """
+        self.phases.setdefault(name, [0.0, 0, self.depth])
+        self.depth += 1
+        return self.depth - 1
+
+    def report(self):
+        total = time.perf_counter() - self.start
+        if self.cprofile is not None:
+            self.cprofile.disable()
+        lines = [f"[dmon profile] total {total * 1000:.1f} ms"]
+        width = max(
+            [len(name) + 2 * depth for name, (_, _, depth) in self.phases.items()]
+            + [20]
+        )
+        accounted = 0.0
+        for name, (seconds, count, depth) in self.phases.items():
+            if depth == 0:
+                accounted += seconds
+            label = "  " * depth + name
+            line = f"  {label:<{width}} {seconds * 1000:9.1f} ms"
+            if count > 1:
+                line += f" ({count}x)"
+            lines.append(line)
+        other = f"{'(other: imports, ...)':<{width}}"
+        lines.append(f"  {other} {(total - accounted) * 1000:9.1f} ms")
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(self.pstats_path)
+            lines.append(f"  cProfile stats written to {self.pstats_path}")
+        print("\n".join(lines), file=sys.stderr)
+
+
+class Phase:
+    __slots__ = ("profiler", "name", "depth", "t0")
+
+    def __init__(self, profiler: Profiler, name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.depth = self.profiler.enter(self.name)
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.depth -= 1
+        self.profiler.add(self.name, time.perf_counter() - self.t0, self.depth)
+        return False
+
+
+profiler: Optional[Profiler] = None
+
+
+def enable(start: float, pstats_path: Optional[str] = None):
+    """
+    Start profiling (if not yet), counting the total from `start` (perf_counter).
+    If already started, a given pstats_path (e.g. `--profile-out` after
+    DMON_PROFILE=1) replaces the previous one, starting cProfile if needed.
+    """
+    global profiler
+    if profiler is None:
+        profiler = Profiler(start, pstats_path)
+    elif pstats_path:
+        profiler.set_pstats_path(pstats_path)
+    return profiler
+
+
+def phase(name: str):
+    if profiler is None:
+        return NULL_PHASE
+    return Phase(profiler, name)
+
+
+def timed(name: str):
+    """
+    Decorator to time every call of a function as a phase.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def report():
+    if profiler is not None:
+        profiler.report()
@@ -0,0 +1,1138 @@
+"""
+The output pump of the runner: read the child's output streams, filter and
+format them line by line, and write them to log files (with rotation, index
+and compression), network sinks and an in-memory ring buffer.
+"""
+
+from collections import deque
+import os
+import sys
+import threading
+import time
+
+from .logindex import COMPRESSED_SUFFIX, INDEX_SUFFIX, IndexWriter, compress_segment
+from .runlog import logger
+
+
+READ_SIZE = 64 * 1024
+"""Max bytes read from the child's output at once"""
+BACKLOG_INTERVAL = 0.5
+"""Seconds between samples of the pipe backlog for the stats page"""
+ROTATE_TIMEOUT = 1.0
+"""Seconds to wait for a requested rotation to reach a line boundary"""
+
+
+class RingBuffer:
+    """
+    Bounded in-memory buffer of the most recent output,
+    keeping at most max_bytes bytes and max_lines complete lines.
+    Thread-safe: written by the pump, read by the control socket.
+    """
+
+    def __init__(self, max_bytes, max_lines):
+        self.max_bytes = max_bytes
+        self.max_lines = max_lines
+        self.chunks = deque()
+        self.size = 0
+        self.lines = 0
+        self.lock = threading.Lock()
+
+    def append(self, data):
+        if not data:
+            return
+        with self.lock:
+            self.chunks.append(data)
+            self.size += len(data)
+            self.lines += data.count(b"\n")
+            self._trim()
+
+    def _trim(self):
+        while self.chunks and (
+            self.size > self.max_bytes or self.lines > self.max_lines
+        ):
+            first = self.chunks[0]
+            # bytes to drop from the first chunk
+            cut = max(self.size - self.max_bytes, 0)
+            excess_lines = self.lines - self.max_lines
+            if excess_lines > 0:
+                pos = -1
+                for _ in range(excess_lines):
+                    pos = first.find(b"\n", pos + 1)
+                    if pos < 0:
+                        break
+                cut = max(cut, len(first) if pos < 0 else pos + 1)
+            if cut < len(first) and first[cut - 1] != ord("\n"):
+                # keep the buffer starting at a line boundary
+                cut = first.find(b"\n", cut) + 1 or len(first)
+            if cut >= len(first):
+                self.chunks.popleft()
+                dropped = first
+            else:
+                self.chunks[0] = first[cut:]
+                dropped = first[:cut]
+            self.size -= len(dropped)
+            self.lines -= dropped.count(b"\n")
+
+    def tail(self, n=None):
+        """
+        Return the last n lines (all if None) in the buffer.
+        """
+        with self.lock:
+            data = b"".join(self.chunks)
+            self.chunks = deque([data]) if data else deque()
+        if n is None:
+            return data
+        if n <= 0:
+            return b""
+        # find the start of the n-th last line (a trailing partial line counts as one)
+        pos = len(data) - 1 if data.endswith(b"\n") else len(data)
+        for _ in range(n):
+            pos = data.rfind(b"\n", 0, pos)
+            if pos < 0:
+                return data
+        return data[pos + 1 :]
+
+
+class LineFormatter:
+    """
+    Format output lines in batches:
+    - timestamps: prefix each line with the local time it was read
+    - tag: prefix each line with the stream name, e.g. '[stderr] '
+    - json: wrap each line as {"ts", "task", "stream", "line"}; invalid UTF-8
+      bytes are escaped as '\\xNN' so that no data is lost
+    With tag or json, only complete lines are emitted (the rest is kept until
+    its newline arrives), so that lines of different streams never mix.
+    The timestamp string is only re-formatted once per second.
+    """
+
+    def __init__(
+        self, task="", stream="stdout", timestamps=False, json_format=False, tag=False
+    ):
+        self.task = task
+        self.stream = stream
+        self.timestamps = timestamps
+        self.json_format = json_format
+        self.tag = f"[{stream}] ".encode() if tag else b""
+        self.at_line_start = True
+        self.partial = b""  # incomplete line (tag / json)
+        self.cached_sec = None
+        self.cached_str = ""
+
+    def now(self):
+        t = time.time()
+        sec = int(t)
+        if sec != self.cached_sec:
+            self.cached_sec = sec
+            self.cached_str = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+        return f"{self.cached_str}.{int((t - sec) * 1000):03d}"
+
+    def get_prefix(self):
+        if self.timestamps:
+            return (self.now() + " ").encode() + self.tag
+        return self.tag
+
+    def format(self, data):
+        if self.json_format or self.tag:
+            data = self.partial + data
+            end = data.rfind(b"\n") + 1
+            self.partial = data[end:]
+            return self.format_lines(data[:end]) if end else b""
+        if self.timestamps:
+            if not data:
+                return b""
+            prefix = self.get_prefix()
+            ends = data.endswith(b"\n")
+            body = data[:-1] if ends else data
+            out = body.replace(b"\n", b"\n" + prefix)
+            if self.at_line_start:
+                out = prefix + out
+            self.at_line_start = ends
+            return out + b"\n" if ends else out
+        return data
+
+    def format_lines(self, data):
+        """
+        Format complete lines (data ends with a newline).
+        """
+        if self.json_format:
+            # split at newlines only: '\r' (e.g. of progress bars) stays in the line
+            return self.format_json(data[:-1].split(b"\n"))
+        prefix = self.get_prefix()
+        return prefix + data[:-1].replace(b"\n", b"\n" + prefix) + b"\n"
+
+    def format_json(self, lines):
+        import json
+
+        ts = self.now()
+        return b"".join(
+            json.dumps(
+                {
+                    "ts": ts,
+                    "task": self.task,
+                    "stream": self.stream,
+                    "line": line.decode("utf-8", "backslashreplace"),
+                },
+                ensure_ascii=False,
+            ).encode("utf-8")
+            + b"\n"
+            for line in lines
+        )
+
+    def finish(self):
+        """
+        Format the remaining incomplete line (at EOF).
+        """
+        if self.partial:
+            data, self.partial = self.partial + b"\n", b""
+            return self.format_lines(data)
+        return b""
+
+
+class LineFilter:
+    """
+    Suppress noisy output line by line (only complete lines pass; the rest is
+    kept until its newline arrives):
+    - dedup: collapse consecutive identical lines into one, followed by a
+      'last line repeated N times' marker
+    - rate limit: token buckets of lines/s and bytes/s (each holding up to one
+      second worth); lines over the limit are dropped and counted in a
+      'N lines dropped' marker once output is let through again
+    Chunks without repeated lines and within the limits pass as a whole.
+    """
+
+    def __init__(self, dedup=False, max_lines_per_sec=0, max_bytes_per_sec=0):
+        self.dedup = dedup
+        self.max_lines_per_sec = max_lines_per_sec
+        self.max_bytes_per_sec = max_bytes_per_sec
+        self.line_tokens = float(max_lines_per_sec)
+        self.byte_tokens = float(max_bytes_per_sec)
+        self.last_refill = time.monotonic()
+        self.partial = b""
+        self.last_line = None
+        self.repeats = 0
+        self.dropped_since_marker = 0
+        self.repeated_lines = 0
+        """Total lines collapsed by dedup"""
+        self.dropped_lines = 0
+        """Total lines dropped by the rate limit"""
+        self.dropped_bytes = 0
+        """Total bytes dropped by the rate limit"""
+
+    def filter(self, data):
+        data = self.partial + data
+        end = data.rfind(b"\n") + 1
+        self.partial = data[end:]
+        if not end:
+            return b""
+        data = data[:end]
+        if self.dedup:
+            data = self.collapse(data)
+        if self.max_lines_per_sec or self.max_bytes_per_sec:
+            data = self.limit(data)
+        return data
+
+    def collapse(self, data):
+        lines = data.split(b"\n")
+        lines.pop()  # empty string after the last newline
+        if lines[0] != self.last_line and len(set(lines)) == len(lines):
+            # no repeated lines at all
+            out = data
+            if self.repeats:
+                out = self.repeat_marker() + out
+        else:
+            parts = []
+            for line in lines:
+                if line == self.last_line:
+                    self.repeats += 1
+                    self.repeated_lines += 1
+                    continue
+                if self.repeats:
+                    parts.append(self.repeat_marker())
+                parts.append(line + b"\n")
+                self.last_line = line
+            out = b"".join(parts)
+        self.last_line = lines[-1]
+        return out
+
+    def repeat_marker(self):
+        times = "time" if self.repeats == 1 else "times"
+        marker = f"[dmon] last line repeated {self.repeats} {times}\n".encode()
+        self.repeats = 0
+        return marker
+
+    def drop_marker(self):
+        marker = f"[dmon] {self.dropped_since_marker} lines dropped (rate limit)\n"
+        self.dropped_since_marker = 0
+        return marker.encode()
+
+    def limit(self, data):
+        if not data:
+            return data
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.last_refill = now
+        if self.max_lines_per_sec:
+            self.line_tokens = min(
+                self.line_tokens + elapsed * self.max_lines_per_sec,
+                self.max_lines_per_sec,
+            )
+        if self.max_bytes_per_sec:
+            self.byte_tokens = min(
+                self.byte_tokens + elapsed * self.max_bytes_per_sec,
+                self.max_bytes_per_sec,
+            )
+
+        n_lines = data.count(b"\n")
+        lines_ok = not self.max_lines_per_sec or n_lines <= self.line_tokens
+        bytes_ok = not self.max_bytes_per_sec or len(data) <= self.byte_tokens
+        if lines_ok and bytes_ok:
+            cut = len(data)
+        else:
+            # let through as many whole lines as the tokens allow
+            cut = len(data)
+            if not lines_ok:
+                pos = -1
+                for _ in range(int(self.line_tokens)):
+                    pos = data.find(b"\n", pos + 1)
+                cut = pos + 1
+            if not bytes_ok:
+                cut = min(cut, int(self.byte_tokens))
+            cut = data.rfind(b"\n", 0, cut) + 1
+        out = data[:cut]
+        dropped = data[cut:]
+        if out:
+            if self.max_lines_per_sec:
+                self.line_tokens -= n_lines - dropped.count(b"\n")
+            if self.max_bytes_per_sec:
+                self.byte_tokens -= len(out)
+            if self.dropped_since_marker:
+                out = self.drop_marker() + out
+        if dropped:
+            n_dropped = dropped.count(b"\n")
+            self.dropped_lines += n_dropped
+            self.dropped_bytes += len(dropped)
+            self.dropped_since_marker += n_dropped
+        return out
+
+    def finish(self):
+        """
+        Emit pending markers and the remaining incomplete line (at EOF).
+        """
+        out = b""
+        if self.repeats:
+            out += self.repeat_marker()
+        if self.dropped_since_marker:
+            out += self.drop_marker()
+        out += self.partial
+        self.partial = b""
+        return out
+
+    def stats(self):
+        return {
+            "repeated_lines": self.repeated_lines,
+            "dropped_lines": self.dropped_lines,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+
+def get_file_dir(file_path):
+    return os.path.dirname(file_path)
+
+
+def make_dir(dir):
+    dir = os.path.abspath(dir)
+    if not os.path.exists(dir):
+        os.makedirs(dir, exist_ok=True)
+
+
+def make_file_dir(file_path):
+    par_dir = get_file_dir(file_path)
+    make_dir(par_dir)
+
+
+def rotate_log(log_path):
+    """
+    Rename the log file (and its index) with a timestamp suffix.
+    Return the new name, or None if not renamed.
+    """
+    current_time = time.strftime(".%Y%m%d-%H%M%S")
+    new_name = log_path + current_time
+    logger.info(f"Rotating {log_path} to {new_name}")
+    if os.path.exists(new_name) or os.path.exists(new_name + COMPRESSED_SUFFIX):
+        logger.warning(f"{new_name} already exists, skip renaming")
+        return None
+    make_file_dir(new_name)
+    os.rename(log_path, new_name)
+    if os.path.exists(log_path + INDEX_SUFFIX):
+        os.rename(log_path + INDEX_SUFFIX, new_name + INDEX_SUFFIX)
+    return new_name
+
+
+def compress_in_background(segment_path):
+    def compress():
+        try:
+            compress_segment(segment_path)
+            logger.info(f"Compressed {segment_path} to {segment_path}.gz")
+        except Exception as e:
+            logger.exception(f"Failed to compress {segment_path}: {e}")
+
+    # non-daemon: the interpreter waits for it on exit
+    thread = threading.Thread(target=compress, name="dmon-compress")
+    thread.start()
+    return thread
+
+
+class IOLatency:
+    """
+    Latency counters of an I/O operation (write / fsync).
+    """
+
+    SLOW_SECONDS = 1.0
+    """Operations slower than this are logged"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds, log_path):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if seconds >= self.SLOW_SECONDS:
+            logger.warning(f"Slow {self.name} to {log_path}: {seconds * 1000:.0f} ms")
+
+    def summary(self):
+        if not self.count:
+            return f"no {self.name}"
+        avg = self.total / self.count * 1000
+        return (
+            f"{self.count} {self.name}, avg {avg:.3f} ms, max {self.max * 1000:.3f} ms"
+        )
+
+    def stats(self):
+        return {
+            "count": self.count,
+            "avg_ms": self.total / self.count * 1000 if self.count else 0,
+            "max_ms": self.max * 1000,
+        }
+
+
+class LogWriter:
+    """
+    Write output to a log file, rotating it at a line boundary once it exceeds
+    max_log_size (0 for no rotation).
+    If index is True, keep a sparse timestamp index next to the log file.
+    If compress is True, compress rotated segments in the background.
+
+    flush decides when output is written to the file: 'always' (immediately),
+    'line' (complete lines), 'interval:<ms>' (buffered for at most ms) or
+    'size:<bytes>' (once that much is buffered); buffered output is always
+    written before rotating and closing.
+    fsync decides when the file is fsynced: 'never', 'on_rotate' (before
+    rotating and closing) or 'interval:<ms>' (also at most ms after a write).
+    Write and fsync latencies are logged at each rotation and at close.
+
+    request_rotation() rotates on demand, at the next line boundary;
+    reopen() reopens the log file (e.g. after it was renamed by logrotate).
+
+    On a write error, the OSError raised carries the data not written yet
+    (including buffered output) in its 'unwritten' attribute, so that the
+    caller can retry it.
+    """
+
+    def __init__(
+        self,
+        log_path,
+        max_log_size,
+        index=True,
+        compress=False,
+        flush="always",
+        fsync="never",
+    ):
+        self.log_path = log_path
+        self.max_log_size = max_log_size
+        self.index = index
+        self.compress = compress
+        self.flush_mode, flush_param = "always", 0
+        self.fsync_mode, fsync_param = "never", 0
+        if flush != "always" or fsync != "never":
+            # parsed only if set, to keep the runner's imports minimal
+            from .constants import FLUSH_POLICIES, FSYNC_POLICIES
+            from .utils import parse_policy
+
+            self.flush_mode, flush_param = parse_policy(flush, FLUSH_POLICIES)
+            self.fsync_mode, fsync_param = parse_policy(fsync, FSYNC_POLICIES)
+        self.flush_size = flush_param if self.flush_mode == "size" else 0
+        self.flush_interval = flush_param / 1000 if self.flush_mode == "interval" else 0
+        self.fsync_interval = fsync_param / 1000 if self.fsync_mode == "interval" else 0
+        self.buffer = bytearray()
+        self.buffered_at = 0.0
+        self.unsynced_at = 0.0  # time of the first write not fsynced yet (0 if none)
+        self.write_latency = IOLatency("writes")
+        self.fsync_latency = IOLatency("fsyncs")
+        self.lock = threading.RLock()  # the timer flushes from another thread
+        self.bytes_written = 0
+        self.rotations = 0
+        self.partial = False  # whether the output so far ends in a partial line
+        self.rotate_pending = False  # rotate at the next line boundary
+        self.rotated_name = None  # new name of the last rotated file
+        self.fd = -1
+        self.idx = None
+        make_file_dir(log_path)
+        self.open()
+        if self.flush_interval or self.fsync_interval:
+            period = min(t for t in (self.flush_interval, self.fsync_interval) if t)
+            threading.Thread(
+                target=self.run_timer, args=(period,), name="dmon-flush", daemon=True
+            ).start()
+
+    def open(self):
+        self.fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.offset = os.fstat(self.fd).st_size
+        self.idx = None
+        if self.index:
+            self.idx = IndexWriter(self.log_path + INDEX_SUFFIX, self.log_path)
+        self.lineno = self.idx.lineno if self.idx else 0
+
+    def close(self):
+        with self.lock:
+            try:
+                if self.fd >= 0:
+                    self.flush()
+                    if self.fsync_mode != "never":
+                        self.sync()
+            finally:
+                try:
+                    if self.idx:
+                        self.idx.close()
+                        self.idx = None
+                finally:
+                    if self.fd >= 0:
+                        os.close(self.fd)
+                        self.fd = -1
+                        self.log_latency()
+
+    def reopen(self):
+        """
+        Reopen the log file after an error (e.g. once the disk is back).
+        """
+        with self.lock:
+            try:
+                self.close()
+            except OSError:
+                pass
+            self.open()
+
+    def write(self, data):
+        with self.lock:
+            if data:
+                self.partial = not data.endswith(b"\n")
+            while data:
+                cut = len(data)
+                rotate = False
+                size = self.offset + len(self.buffer) + len(data)
+                if self.rotate_pending or (
+                    self.max_log_size > 0 and size >= self.max_log_size
+                ):
+                    # rotate at the last line boundary of the data (if any)
+                    boundary = data.rfind(b"\n") + 1
+                    if boundary:
+                        cut = boundary
+                        rotate = True
+                start = self.offset
+                try:
+                    if self.flush_mode == "always":
+                        self.write_segment(data[:cut])
+                    else:
+                        self.buffer_segment(data[:cut])
+                    if rotate:
+                        self.rotate()
+                except OSError as e:
+                    if self.flush_mode == "always" and self.offset - start < cut:
+                        e.unwritten = data[self.offset - start :]
+                    else:
+                        e.unwritten = bytes(self.buffer) + data[cut:]
+                        self.buffer.clear()
+                    raise
+                data = data[cut:]
+            if self.fsync_interval and self.sync_due():
+                self.sync()
+
+    def buffer_segment(self, data):
+        if not self.buffer:
+            self.buffered_at = time.monotonic()
+        self.buffer += data
+        if self.flush_mode == "line":
+            self.flush(self.buffer.rfind(b"\n") + 1)
+        elif self.flush_mode == "size":
+            if len(self.buffer) >= self.flush_size:
+                self.flush()
+        elif self.flush_due():
+            self.flush()
+
+    def flush_due(self):
+        return (
+            bool(self.buffer)
+            and time.monotonic() - self.buffered_at >= self.flush_interval
+        )
+
+    def sync_due(self):
+        return (
+            bool(self.unsynced_at)
+            and time.monotonic() - self.unsynced_at >= self.fsync_interval
+        )
+
+    def flush(self, n=None):
+        """
+        Write the first n (default: all) buffered bytes to the file.
+        """
+        if n is None:
+            n = len(self.buffer)
+        if not n:
+            return
+        start = self.offset
+        try:
+            self.write_segment(bytes(self.buffer[:n]))
+        finally:
+            del self.buffer[: self.offset - start]
+            self.buffered_at = time.monotonic()
+
+    def write_segment(self, data):
+        # write immediately (unbuffered), retrying short writes
+        view = memoryview(data)
+        written = 0
+        t0 = time.perf_counter()
+        try:
+            while written < len(data):
+                written += os.write(self.fd, view[written:])
+        finally:
+            self.offset += written
+            self.bytes_written += written
+            if written and not self.unsynced_at:
+                self.unsynced_at = time.monotonic()
+        self.write_latency.add(time.perf_counter() - t0, self.log_path)
+        if self.idx:
+            n_lines = data.count(b"\n")
+            if n_lines:
+                boundary = self.offset - len(data) + data.rfind(b"\n") + 1
+                self.lineno += n_lines
+                self.idx.add(boundary, self.lineno, time.time())
+
+    def sync(self):
+        if self.fd < 0 or not self.unsynced_at:
+            return
+        t0 = time.perf_counter()
+        os.fsync(self.fd)
+        self.fsync_latency.add(time.perf_counter() - t0, self.log_path)
+        self.unsynced_at = 0.0
+
+    def run_timer(self, period):
+        # flush / fsync on time even if no more output comes
+        while True:
+            time.sleep(period)
+            try:
+                with self.lock:
+                    if self.fd < 0:
+                        continue
+                    if self.flush_interval and self.flush_due():
+                        self.flush()
+                    if self.fsync_interval and self.sync_due():
+                        self.sync()
+            except OSError as e:
+                # keep the buffer; the next write raises and hands it back
+                logger.warning(f"Failed to flush {self.log_path}: {e}")
+
+    def log_latency(self):
+        logger.info(
+            f"I/O latency of {self.log_path}: {self.write_latency.summary()}; "
+            f"{self.fsync_latency.summary()}"
+        )
+
+    def rotate(self):
+        with self.lock:
+            self.rotate_pending = False
+            self.close()
+            new_name = rotate_log(self.log_path)  # rotate log file
+            if new_name:
+                self.rotations += 1
+                self.rotated_name = new_name
+                if self.compress:
+                    compress_in_background(new_name)
+            self.open()
+
+    def request_rotation(self):
+        """
+        Rotate the log file at the next line boundary: now if the output so
+        far ends with a complete line, otherwise in the write completing it.
+        An empty log file is not rotated.
+        """
+        with self.lock:
+            self.rotated_name = None
+            if self.partial:
+                self.rotate_pending = True
+            elif self.offset or self.buffer:
+                self.rotate()
+
+    def stats(self):
+        return {
+            "path": self.log_path,
+            "size": self.offset + len(self.buffer),
+            "bytes": self.bytes_written,
+            "rotations": self.rotations,
+            "buffered": len(self.buffer),
+            "write_latency": self.write_latency.stats(),
+            "fsync_latency": self.fsync_latency.stats(),
+        }
+
+
+class QueuedWriter:
+    """
+    Hand output over to a LogWriter on a background thread through a bounded
+    in-memory queue, so that a stalled log disk does not stop draining the
+    child's output (and freeze the child).
+
+    When the queue is full (max_bytes), the overflow policy applies:
+    - 'block': wait for space, i.e. backpressure on the child (no loss)
+    - 'drop_oldest': drop the oldest queued output
+    - 'drop_newest': drop the incoming output
+    Lost output is counted and marked in the log once writing catches up.
+    Write errors (e.g. disk full) are retried with backoff, so that writing
+    recovers automatically once the disk is back.
+    """
+
+    RETRY_MIN_INTERVAL = 0.1
+    RETRY_MAX_INTERVAL = 5.0
+    CLOSE_TIMEOUT = 10.0
+    """Max seconds to wait for queued output to be written at exit"""
+
+    def __init__(self, writer: LogWriter, max_bytes, policy="block"):
+        self.writer = writer
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.queue = deque()
+        self.size = 0  # queued and in-flight bytes
+        self.cond = threading.Condition()
+        self.closing = False
+        self.closed = threading.Event()  # to stop backing off on close
+        self.close_deadline = 0.0
+        self.at_line_start = True  # whether the written output ends with a newline
+        self.lost_bytes = 0
+        self.lost_lines = 0
+        self.lost_since_marker = 0
+        self.write_errors = 0
+        self.thread = threading.Thread(target=self.run, name="dmon-writer", daemon=True)
+        self.thread.start()
+
+    def write(self, data):
+        with self.cond:
+            if self.size + len(data) > self.max_bytes:
+                if self.policy == "block":
+                    while self.size and self.size + len(data) > self.max_bytes:
+                        self.cond.wait()
+                elif self.policy == "drop_newest":
+                    self.lose(data)
+                    return
+                else:  # drop_oldest
+                    while self.queue and self.size + len(data) > self.max_bytes:
+                        old = self.queue.popleft()
+                        self.size -= len(old)
+                        self.lose(old)
+            self.queue.append(data)
+            self.size += len(data)
+            self.cond.notify_all()
+
+    def lose(self, data):
+        self.lost_bytes += len(data)
+        self.lost_lines += data.count(b"\n")
+        self.lost_since_marker += len(data)
+
+    def run(self):
+        interval = self.RETRY_MIN_INTERVAL
+        failing = False
+        while True:
+            with self.cond:
+                while (
+                    not self.queue and not self.lost_since_marker and not self.closing
+                ):
+                    self.cond.wait()
+                if not self.queue and not self.lost_since_marker:
+                    return
+                payload = b"".join(self.queue)
+                self.queue.clear()
+                lost = self.lost_since_marker
+            marker = b""
+            if lost:
+                marker = f"[dmon] {lost} bytes lost (log queue full)\n".encode()
+                if not self.at_line_start:
+                    marker = b"\n" + marker
+            data = marker + payload
+            try:
+                self.writer.write(data)
+                unwritten = b""
+                if data:
+                    self.at_line_start = data.endswith(b"\n")
+                interval = self.RETRY_MIN_INTERVAL
+                if failing:
+                    failing = False
+                    logger.info(f"Writing to {self.writer.log_path} recovered")
+            except OSError as e:
+                unwritten = getattr(e, "unwritten", data)
+                self.write_errors += 1
+                if not failing:
+                    failing = True
+                    logger.error(
+                        f"Failed to write to {self.writer.log_path}: {e}; will retry"
+                    )
+            with self.cond:
+                if len(unwritten) <= len(payload):
+                    # the marker is written
+                    self.lost_since_marker -= lost
+                else:
+                    unwritten = unwritten[len(unwritten) - len(payload) :]
+                # in-flight data is done, except for the unwritten part
+                self.size -= len(payload) - len(unwritten)
+                if unwritten:
+                    self.queue.appendleft(unwritten)
+                self.cond.notify_all()
+                if (
+                    (unwritten or self.lost_since_marker)
+                    and self.closing
+                    and time.monotonic() > self.close_deadline
+                ):
+                    self.lose(b"".join(self.queue))
+                    self.queue.clear()
+                    return
+            if failing:
+                # back off (new output keeps being queued meanwhile); after a
+                # successful write, go straight on with the next chunk / marker
+                self.closed.wait(interval)
+                interval = min(interval * 2, self.RETRY_MAX_INTERVAL)
+                try:
+                    self.writer.reopen()
+                except OSError:
+                    pass
+
+    def close(self):
+        """
+        Write the queued output (giving up after CLOSE_TIMEOUT on errors) and close.
+        """
+        with self.cond:
+            self.closing = True
+            self.close_deadline = time.monotonic() + self.CLOSE_TIMEOUT
+            self.cond.notify_all()
+        self.closed.set()
+        self.thread.join()
+        if self.lost_bytes:
+            logger.warning(
+                f"Lost {self.lost_bytes} bytes ({self.lost_lines} lines) of output for {self.writer.log_path}"
+            )
+        self.writer.close()
+
+    def stats(self):
+        return {
+            **self.writer.stats(),
+            "queued": self.size,
+            "lost_bytes": self.lost_bytes,
+            "lost_lines": self.lost_lines,
+            "write_errors": self.write_errors,
+        }
+
+
+class OutputStream:
+    """
+    An output stream (stdout / stderr) of the child process,
+    with its formatter, log writer, network sinks and counters.
+    If tee_fd is given, the output written to the log is also copied to it
+    (e.g. the console, for 'dmon exec --tee').
+    """
+
+    def __init__(
+        self,
+        name,
+        fd,
+        writer,
+        formatter=None,
+        line_filter=None,
+        sinks=(),
+        tee_fd=None,
+    ):
+        self.name = name
+        self.fd = fd
+        self.writer = writer
+        self.sinks = sinks
+        self.tee_fd = tee_fd
+        self.formatter = formatter
+        self.line_filter = line_filter
+        self.bytes_read = 0
+        self.lines_read = 0
+        self.write_seconds = 0.0
+        """Time spent in writer.write(), i.e. blocked on the log file or queue"""
+
+    def process(self, chunk):
+        """
+        Filter and format a chunk of output.
+        """
+        if self.line_filter:
+            chunk = self.line_filter.filter(chunk)
+        if self.formatter and chunk:
+            chunk = self.formatter.format(chunk)
+        return chunk
+
+    def finish(self):
+        """
+        Filter and format the remaining output (at EOF).
+        """
+        data = self.line_filter.finish() if self.line_filter else b""
+        if self.formatter:
+            data = self.formatter.format(data) + self.formatter.finish()
+        return data
+
+    def stats(self):
+        stats = {"bytes": self.bytes_read, "lines": self.lines_read}
+        if self.line_filter:
+            stats.update(self.line_filter.stats())
+        return stats
+
+
+def get_counters(streams):
+    """
+    Totals of the pump counters of all streams, as the counters of a stats page.
+    """
+    counters = {
+        "bytes_read": 0,
+        "lines_read": 0,
+        "write_blocked_ns": 0,
+        "repeated_lines": 0,
+        "dropped_lines": 0,
+        "bytes_written": 0,
+        "rotations": 0,
+        "queued_bytes": 0,
+        "lost_bytes": 0,
+    }
+    for stream in streams:
+        counters["bytes_read"] += stream.bytes_read
+        counters["lines_read"] += stream.lines_read
+        counters["write_blocked_ns"] += int(stream.write_seconds * 1e9)
+        if stream.line_filter:
+            counters["repeated_lines"] += stream.line_filter.repeated_lines
+            counters["dropped_lines"] += stream.line_filter.dropped_lines
+    # writers may be shared by streams
+    for w in {id(stream.writer): stream.writer for stream in streams}.values():
+        if isinstance(w, QueuedWriter):
+            counters["queued_bytes"] += w.size
+            counters["lost_bytes"] += w.lost_bytes
+            w = w.writer
+        counters["bytes_written"] += w.bytes_written
+        counters["rotations"] += w.rotations
+    return counters
+
+
+def loop_to_log(streams, buffer=None, page=None):
+    """
+    Pump the child's output streams to their log writers in batches until EOF.
+    Multiple streams are multiplexed with selectors (threads on Windows),
+    in the order their data arrives.
+    If buffer (RingBuffer) is given, also keep recent output in it.
+    If page (StatsPage) is given, update its counters after every chunk;
+    the pipe backlog (a syscall) is only sampled every BACKLOG_INTERVAL.
+    """
+    if page is not None:
+        from .statspage import pipe_backlog
+
+    lock = threading.Lock()
+    backlog = 0
+    next_sample = 0.0
+
+    def output(stream, data):
+        # sinks and the console first: they only queue / copy, while the log
+        # file may fail
+        for sink in stream.sinks:
+            sink.write(data, stream.name)
+        if stream.tee_fd is not None:
+            tee(stream, data)
+        t0 = time.perf_counter()
+        try:
+            stream.writer.write(data)
+        finally:
+            stream.write_seconds += time.perf_counter() - t0
+        if buffer is not None:
+            buffer.append(data)
+
+    def tee(stream, data):
+        view = memoryview(data)
+        written = 0
+        try:
+            while written < len(data):
+                written += os.write(stream.tee_fd, view[written:])
+        except OSError as e:
+            # e.g. the console pipe is closed; keep logging
+            logger.warning(f"Stopped copying {stream.name} to fd {stream.tee_fd}: {e}")
+            stream.tee_fd = None
+
+    def publish():
+        nonlocal backlog, next_sample
+        now = time.monotonic()
+        if now >= next_sample:
+            backlog = sum(pipe_backlog(stream.fd) for stream in streams)
+            next_sample = now + BACKLOG_INTERVAL
+        page.update(pipe_backlog=backlog, **get_counters(streams))
+
+    def handle(stream, chunk):
+        stream.bytes_read += len(chunk)
+        stream.lines_read += chunk.count(b"\n")
+        data = stream.process(chunk)
+        if data:
+            output(stream, data)
+
+    def finish(stream):
+        data = stream.finish()
+        if data:
+            output(stream, data)
+        logger.info(f"Read EOF of {stream.name}")
+
+    def read(stream):
+        # read whatever is available (up to READ_SIZE) in one go;
+        # bytes are written as-is, so utf8 characters split
+        # across reads are not a problem
+        try:
+            return os.read(stream.fd, READ_SIZE)
+        except OSError as e:
+            logger.exception(f"Failed to read {stream.name}: {e}")
+            return b""
+
+    def process(stream, chunk):
+        try:
+            with lock:
+                if chunk:
+                    handle(stream, chunk)
+                else:
+                    finish(stream)
+                if page is not None:
+                    publish()
+        except Exception as e:
+            logger.exception(f"Exception in while loop: {e}")
+
+    def read_all(stream):
+        while True:
+            chunk = read(stream)
+            process(stream, chunk)
+            if not chunk:
+                return
+
+    if len(streams) == 1 or sys.platform.startswith("win"):
+        threads = [
+            threading.Thread(target=read_all, args=(stream,), name="dmon-pump")
+            for stream in streams[1:]
+        ]
+        for thread in threads:
+            thread.start()
+        read_all(streams[0])
+        for thread in threads:
+            thread.join()
+    else:
+        import selectors
+
+        with selectors.DefaultSelector() as sel:
+            for stream in streams:
+                sel.register(stream.fd, selectors.EVENT_READ, stream)
+            while sel.get_map():
+                for key, _ in sel.select():
+                    chunk = read(key.data)
+                    process(key.data, chunk)
+                    if not chunk:
+                        sel.unregister(key.fd)
+    logger.info("Read EOF, now closing...")
+
+
+def get_log_writers(streams):
+    """
+    The LogWriters of the streams (without queues), each once.
+    """
+    writers = {}
+    for stream in streams:
+        w = stream.writer
+        if isinstance(w, QueuedWriter):
+            w = w.writer
+        writers.setdefault(id(w), w)
+    return list(writers.values())
+
+
+def reopen_logs(streams):
+    """
+    Reopen the log files, e.g. after they were renamed by logrotate.
+    Return the paths of the reopened files.
+    """
+    paths = []
+    for w in get_log_writers(streams):
+        try:
+            w.reopen()
+            paths.append(w.log_path)
+            logger.info(f"Reopened {w.log_path}")
+        except OSError as e:
+            logger.error(f"Failed to reopen {w.log_path}: {e}")
+    return paths
+
+
+def rotate_logs(streams, timeout=ROTATE_TIMEOUT):
+    """
+    Rotate the log files at their next line boundary, waiting up to timeout
+    for rotations pending on a partial line.
+    Return {log path: {"rotated": new name or None, "pending": bool}}.
+    """
+    writers = get_log_writers(streams)
+    for w in writers:
+        try:
+            w.request_rotation()
+        except OSError as e:
+            logger.error(f"Failed to rotate {w.log_path}: {e}")
+    deadline = time.monotonic() + timeout
+    while any(w.rotate_pending for w in writers) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return {
+        w.log_path: {"rotated": w.rotated_name, "pending": w.rotate_pending}
+        for w in writers
+    }
+
+
+def handle_request(request: str, buffer=None, streams=()) -> bytes:
+    """
+    Control socket requests:
+    - 'tail [N]': the last N lines (default: all) of recent output
+    - 'stats': JSON of byte/line counters of each stream and its log file
+    - 'rotate': rotate the log files now (JSON of the results, see rotate_logs())
+    - 'reopen': reopen the log files (JSON list of their paths)
+    """
+    cmd, _, arg = request.partition(" ")
+    if cmd == "tail":
+        if buffer is None:
+            return b""
+        return buffer.tail(int(arg) if arg.strip() else None)
+    if cmd == "stats":
+        import json
+
+        stats = {
+            "streams": {stream.name: stream.stats() for stream in streams},
+            "logs": {stream.name: stream.writer.stats() for stream in streams},
+        }
+        sinks = streams[0].sinks if streams else ()
+        if sinks:
+            stats["sinks"] = [sink.stats() for sink in sinks]
+        return json.dumps(stats).encode()
+    if cmd in ("rotate", "reopen"):
+        import json
+
+        if cmd == "rotate":
+            return json.dumps(rotate_logs(streams)).encode()
+        return json.dumps(reopen_logs(streams)).encode()
+    return b""
+
+
+def dump_buffer(buffer: RingBuffer):
+    data = buffer.tail()
+    n_lines = data.count(b"\n")
+    logger.warning(
+        f"Child process exited abnormally, last {n_lines} lines of output:\n"
+        + data.decode("utf-8", "replace").rstrip("\n")
+    )
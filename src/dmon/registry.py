@@ -0,0 +1,158 @@
+"""
+Per-user global registry of started tasks, so that `dmon list --global`
+can find tasks of every project on this host.
+
+Registration is opt-in (set DMON_REGISTRY=1). The registry is a single JSON
+file mapping meta file paths to the few meta fields listing needs
+(REGISTRY_FIELDS; not the task env, which may hold secrets), stored in the
+dmon state directory (see `get_state_dir`). It is updated under an advisory
+lock, and stale entries are pruned lazily on listing.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable
+
+from .constants import (
+    ON_WINDOWS,
+    REGISTRY_ENV,
+    REGISTRY_FILENAME,
+    STATE_DIR_ENV,
+)
+from .types import DmonMeta, PathType
+from .utils import file_lock, get_tmp_path
+
+
+REGISTRY_FIELDS = (
+    "meta_path",
+    "task",
+    "pid",
+    "create_time",
+    "create_time_human",
+    "cwd",
+    "cmd",
+    "log_path",
+)
+"""Meta fields stored in the registry (those shown by `dmon list --global`)"""
+
+
+def get_state_dir() -> Path:
+    """
+    Get the per-user dmon state directory:
+    $DMON_STATE_DIR, or $XDG_STATE_HOME/dmon (default ~/.local/state/dmon),
+    or %LOCALAPPDATA%/dmon on Windows.
+    """
+    custom = os.environ.get(STATE_DIR_ENV)
+    if custom:
+        return Path(custom)
+    if ON_WINDOWS:
+        base = os.environ.get("LOCALAPPDATA") or str(Path.home() / "AppData/Local")
+    else:
+        base = os.environ.get("XDG_STATE_HOME") or str(Path.home() / ".local/state")
+    return Path(base) / "dmon"
+
+
+def registry_enabled() -> bool:
+    return os.environ.get(REGISTRY_ENV, "") not in ("", "0")
+
+
+def get_registry_path() -> Path:
+    return get_state_dir() / REGISTRY_FILENAME
+
+
+def read_registry(path: Path) -> Dict[str, dict]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def write_registry(path: Path, entries: Dict[str, dict]):
+    tmp_path = get_tmp_path(path)
+    try:
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+def update_registry(add: Iterable[DmonMeta] = (), remove: Iterable[PathType] = ()):
+    """
+    Add and/or remove entries (keyed by meta path) in the registry.
+    """
+    path = get_registry_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with file_lock(path.with_name(path.name + ".lock")):
+        entries = read_registry(path)
+        for meta_path in remove:
+            entries.pop(str(meta_path), None)
+        for meta in add:
+            entries[meta.meta_path] = {
+                name: getattr(meta, name) for name in REGISTRY_FIELDS
+            }
+        write_registry(path, entries)
+
+
+def prune_registry(stale: Iterable[DmonMeta]):
+    """
+    Remove entries of exited tasks, unless they were re-registered
+    (by another start of the same task) in the meantime.
+    """
+    path = get_registry_path()
+    with file_lock(path.with_name(path.name + ".lock")):
+        entries = read_registry(path)
+        n_entries = len(entries)
+        for meta in stale:
+            entry = entries.get(meta.meta_path)
+            if (
+                entry is not None
+                and entry.get("pid") == meta.pid
+                and entry.get("create_time") == meta.create_time
+            ):
+                del entries[meta.meta_path]
+        if len(entries) != n_entries:
+            write_registry(path, entries)
+
+
+def register(meta: DmonMeta):
+    """
+    Register a started task. Never fails the caller.
+    """
+    if not registry_enabled():
+        return
+    try:
+        update_registry(add=[meta])
+    except OSError:
+        pass
+
+
+def unregister(meta_path: PathType):
+    """
+    Remove a stopped task from the registry (also if registration has been
+    disabled since it was started). Never fails the caller.
+    """
+    if not get_registry_path().exists():
+        return
+    try:
+        update_registry(remove=[meta_path])
+    except OSError:
+        pass
+
+
+def load_registry() -> Dict[str, DmonMeta]:
+    """
+    Read all registered tasks, keyed by meta path (without locking).
+    """
+    metas = {}
+    for meta_path, data in read_registry(get_registry_path()).items():
+        try:
+            metas[meta_path] = DmonMeta(**data)
+        except TypeError:
+            # written by an incompatible version
+            continue
+    return metas
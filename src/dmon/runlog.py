@@ -0,0 +1,93 @@
+"""
+Minimal logger of the runner (the 'rotation log').
+
+It replaces the logging module, which is costly to import for a process
+started for every task. Records are formatted like
+'2024-01-01 12:00:00.000 - <pid> - INFO - message', and the file is renamed
+with a timestamp suffix once it exceeds max_bytes.
+
+NOTE: this module is imported by the runner before the child is started;
+only import built-in modules here.
+"""
+
+import _thread
+import os
+import time
+
+
+class RunLog:
+    def __init__(self):
+        self.path = None
+        self.max_bytes = 0
+        self.fd = 2  # stderr until configured
+        self.size = 0
+        self.lock = _thread.allocate_lock()
+
+    def configure(self, path=None, max_bytes=0):
+        """
+        Log to the file at path (rotated at max_bytes; 0 for no rotation),
+        or to stderr if path is None.
+        """
+        if path:
+            self.path = path
+            self.max_bytes = max_bytes
+            self.open()
+
+    def disable(self):
+        """
+        Drop all records (e.g. with tee and no path, to keep the console clean).
+        """
+        self.fd = -1
+
+    def open(self):
+        self.fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self.size = os.fstat(self.fd).st_size
+
+    def rotate(self):
+        os.close(self.fd)
+        suffix = time.strftime(".%Y%m%d-%H:%M:%S")
+        try:
+            os.replace(self.path, self.path + suffix)
+        except OSError:
+            pass
+        self.open()
+
+    def log(self, level, msg):
+        now = time.time()
+        stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        line = f"{stamp}.{int(now % 1 * 1000):03d} - {os.getpid()} - {level} - {msg}\n"
+        data = line.encode("utf-8", "backslashreplace")
+        if self.fd < 0:
+            return
+        with self.lock:
+            try:
+                if (
+                    self.path
+                    and self.max_bytes
+                    and self.size + len(data) > self.max_bytes
+                ):
+                    self.rotate()
+                os.write(self.fd, data)
+                self.size += len(data)
+            except OSError:
+                pass  # nowhere to report it
+
+    def info(self, msg):
+        self.log("INFO", msg)
+
+    def warning(self, msg):
+        self.log("WARNING", msg)
+
+    def error(self, msg):
+        self.log("ERROR", msg)
+
+    def exception(self, msg):
+        """
+        Log an error with the traceback of the exception being handled.
+        """
+        import traceback
+
+        self.log("ERROR", msg + "\n" + traceback.format_exc().rstrip("\n"))
+
+
+logger = RunLog()
@@ -1,85 +1,171 @@
-import argparse
-from datetime import datetime
-import logging
-from logging.handlers import RotatingFileHandler
+"""
+Dmon task runner: start the task's command and pump its output (see pump.py)
+to the log file, with rotation and the other log features.
+
+A runner is started for every task using them, so its startup is kept cheap:
+the child is spawned with built-in modules only, and the pump is imported
+afterwards. The options are read from the DMON_RUNNER_CONFIG environment
+variable (set by `dmon start`), or from a task's meta file:
+
+    python -m dmon.runner --meta .dmon/<task>.meta.json
+
+NOTE: only import built-in modules at the top of this module.
+"""
+
+import _signal  # 'signal' imports enum, which is costly
+import marshal
 import os
-import signal
-import subprocess
 import sys
 
+from .runlog import logger
+
 
-logger = logging.getLogger("dmon.runner")
+CONFIG_ENV = "DMON_RUNNER_CONFIG"
+"""Environment variable with the options of the runner (marshal-encoded, in hex)"""
+MB = 1024 * 1024
 
 
-class FixedSizeRotatingFileHandler(RotatingFileHandler):
+def get_options(meta: dict) -> dict:
     """
-    Custom RotatingFileHandler that renames the old log file with a timestamp suffix
-    instead of deleting it.
+    Get the keyword arguments of main() from the fields of a task's meta
+    (DmonMeta as a dict).
     """
+    rate_limit = meta["log_rate_limit"]
+    return {
+        "cmd": meta["cmd"],
+        "log_path": meta["log_path"],
+        "max_log_size": int(meta["log_max_size"] * MB) if meta["log_rotate"] else 0,
+        "rotate_log_path": meta["rotate_log_path"] or None,
+        "max_rotate_log_size": int(meta["rotate_log_max_size"] * MB),
+        "index": meta["log_index"],
+        "compress": meta["log_compress"],
+        "sock_path": meta["sock_path"] or None,
+        "stats_path": meta["stats_path"] or None,
+        "buffer_size": int(meta["log_buffer_size"] * MB),
+        "buffer_lines": meta["log_buffer_lines"],
+        "task": meta["task"],
+        "timestamps": meta["log_timestamps"],
+        "log_format": meta["log_format"],
+        "stderr": meta["log_stderr"],
+        "stderr_log_path": meta["stderr_log_path"] or None,
+        "dedup": meta["log_dedup"],
+        "max_lines_per_sec": rate_limit.get("lines", 0),
+        "max_bytes_per_sec": rate_limit.get("bytes", 0),
+        "queue_size": int(meta["log_queue_size"] * MB),
+        "overflow": meta["log_overflow"],
+        "flush": meta["log_flush"],
+        "fsync": meta["log_fsync"],
+        "sinks": meta["log_sinks"],
+    }
+
+
+def encode_options(options: dict) -> str:
+    """
+    Encode options for CONFIG_ENV.
+    The runner must run on the same interpreter (marshal is version-specific).
+    """
+    return marshal.dumps(options).hex()
 
-    def __init__(self, filename, maxBytes):
-        super().__init__(filename, maxBytes=maxBytes)
 
-    def doRollover(self):
-        if self.stream:
-            self.stream.close()
-        # Create timestamped filename for the rollover logs
-        current_time = datetime.now().strftime(".%Y%m%d-%H:%M:%S")
-        self.rotate(self.baseFilename, self.baseFilename + current_time)
-        self.stream = self._open()
+def load_options(argv) -> dict:
+    value = os.environ.pop(CONFIG_ENV, None)  # not passed on to the child
+    if value:
+        return marshal.loads(bytes.fromhex(value))
+    if len(argv) == 2 and argv[0] == "--meta":
+        import json
 
+        from .utils import resolve_command
 
-def get_file_dir(file_path):
-    return os.path.dirname(file_path)
+        with open(argv[1], encoding="utf-8") as f:
+            meta = json.load(f)
+        options = get_options(meta)
+        options["cmd"] = resolve_command(meta["cmd"], meta["cwd"])
+        return options
+    sys.exit(f"usage: python -m dmon.runner --meta <meta_path> (or set {CONFIG_ENV})")
 
 
-def make_dir(dir):
-    dir = os.path.abspath(dir)
-    if not os.path.exists(dir):
-        os.makedirs(dir, exist_ok=True)
+def get_returncode(status: int) -> int:
+    # like Popen.returncode: negative signal number if killed by a signal
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
 
 
-def make_file_dir(file_path):
-    par_dir = get_file_dir(file_path)
-    make_dir(par_dir)
+class Child:
+    """
+    The child process started by posix_spawn, with the subset of the Popen
+    interface used by the runner.
+    """
 
+    def __init__(self, pid):
+        self.pid = pid
+        self.returncode = None
 
-def need_rotate(log_path, max_log_size):
-    return os.path.getsize(log_path) >= max_log_size and max_log_size > 0
+    def wait(self):
+        if self.returncode is None:
+            _, status = os.waitpid(self.pid, 0)
+            self.returncode = get_returncode(status)
+        return self.returncode
 
+    def send_signal(self, signum):
+        if self.returncode is None:
+            os.kill(self.pid, signum)
 
-def rotate_log(log_path):
-    current_time = datetime.now().strftime(".%Y%m%d-%H%M%S")
-    new_name = log_path + current_time
-    logger.info(f"Rotating {log_path} to {new_name}")
-    if os.path.exists(new_name):
-        logger.warning(f"{new_name} already exists, skip renaming")
-    else:
-        make_file_dir(new_name)
-        os.rename(log_path, new_name)
-
-
-def loop_to_log(bin_fd, log_path, max_log_size):
-    while True:  # loop once whenever need to rotate
-        with open(log_path, "ab") as log_file:
-            while True:
-                try:
-                    # read byte by byte in binary mode to avoid decoding
-                    # error caused by utf8 character truncation
-                    byte = bin_fd.read(1)
-                    if byte:
-                        log_file.write(byte)
-                        log_file.flush()  # immediately write the content to the file
-                        # When a newline character is read, check if
-                        # rotation is needed; if so, break the loop
-                        if byte == b"\n" and need_rotate(log_path, max_log_size):
-                            break
-                    else:
-                        logger.info("Read EOF, now closing...")
-                        return
-                except Exception as e:
-                    logger.exception(f"Exception in while loop: {e}")
-        rotate_log(log_path)  # rotate log file
+
+def spawn(cmd, merge_stderr=True):
+    """
+    Start cmd (a string is run by the shell) with its stdout and stderr piped.
+    Return (process, stdout fd, stderr fd or None if merged into stdout).
+    """
+    shell = isinstance(cmd, str)
+    if not hasattr(os, "posix_spawnp"):
+        # e.g. Windows
+        import subprocess
+
+        proc = subprocess.Popen(
+            cmd,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+            shell=shell,
+            bufsize=0,  # unbuffered
+        )
+        return (
+            proc,
+            proc.stdout.fileno(),
+            None if merge_stderr else proc.stderr.fileno(),
+        )
+
+    argv = ["/bin/sh", "-c", cmd] if shell else list(cmd)
+    out_r, out_w = os.pipe()
+    err_r, err_w = (None, out_w) if merge_stderr else os.pipe()
+    # restore what Python ignores (like Popen's restore_signals)
+    setsigdef = [
+        getattr(_signal, name)
+        for name in ("SIGPIPE", "SIGXFZ", "SIGXFSZ")
+        if hasattr(_signal, name)
+    ]
+    try:
+        # env and cwd are inherited from the runner
+        pid = os.posix_spawnp(
+            argv[0],
+            argv,
+            os.environ,
+            file_actions=[
+                (os.POSIX_SPAWN_DUP2, out_w, 1),
+                (os.POSIX_SPAWN_DUP2, err_w, 2),
+            ],
+            setsigdef=setsigdef,
+        )
+    except OSError:
+        os.close(out_r)
+        if err_r is not None:
+            os.close(err_r)
+        raise
+    finally:
+        os.close(out_w)
+        if err_w != out_w:
+            os.close(err_w)
+    return Child(pid), out_r, err_r
 
 
 def catch_exception(func):
@@ -99,94 +185,219 @@ def main(
     max_log_size,
     rotate_log_path,
     max_rotate_log_size,
+    index=True,
+    compress=False,
+    sock_path=None,
+    stats_path=None,
+    buffer_size=0,
+    buffer_lines=0,
+    task="",
+    timestamps=False,
+    log_format="text",
+    stderr="merge",
+    stderr_log_path=None,
+    dedup=False,
+    max_lines_per_sec=0,
+    max_bytes_per_sec=0,
+    queue_size=0,
+    overflow="block",
+    flush="always",
+    fsync="never",
+    sinks=(),
+    tee=False,
 ):
-    # Configure logging
-    rh = None
-    if rotate_log_path:
-        rh = FixedSizeRotatingFileHandler(rotate_log_path, maxBytes=max_rotate_log_size)
-    logging.basicConfig(
-        format="%(asctime)s.%(msecs)03d - %(process)d - %(levelname)s - %(message)s",
-        level=logging.INFO,
-        datefmt="%Y-%m-%d %H:%M:%S",
-        handlers=[rh] if rh else None,
-    )
-
-    logger.info(
-        f"Prepare for rotating logs: {log_path=} {max_log_size=} {rotate_log_path=} {max_rotate_log_size=}"
-    )
+    """
+    Run cmd and pump its output to the log file(s); return its exit code.
+    With tee, the output is also copied to the runner's own stdout / stderr.
+    """
+    if rotate_log_path or not tee:
+        logger.configure(rotate_log_path, max_rotate_log_size)
+    else:
+        # the console only gets the task's output
+        logger.disable()
 
     shell = isinstance(cmd, str)
+    proc = None
+    streams = None
 
     # register signal handler to terminate the child process
     def signal_handler(signum: int, frame):
         logger.info(f"Received signal {signum}, forwarding to child process...")
-        if sys.platform.startswith("win") and signum == signal.SIGINT:
-            signum = signal.SIGTERM
+        if proc is None:
+            sys.exit(128 + signum)  # not started yet
+        if sys.platform.startswith("win") and signum == _signal.SIGINT:
+            signum = _signal.SIGTERM
             logger.info(f"On Windows, convert SIGINT to SIGTERM ({signum})")
         # proc.terminate()
         proc.send_signal(signum)
         logger.info("Waiting for child process to exit...")
-        proc.wait()
-        logger.info("Child process exited, all done.")
-        sys.exit(0)
+        returncode = proc.wait()
+        logger.info(f"Child process exited with code {returncode}, all done.")
+        sys.exit(get_exit_code(returncode))
+
+    # SIGHUP reopens the log files (e.g. after logrotate renamed them),
+    # and is not forwarded to the child process
+    def reopen_handler(signum: int, frame):
+        if streams is None:
+            return  # the log files are not open yet
+        import threading
+
+        logger.info(f"Received signal {signum}, reopening log files...")
+        # in a thread: this (main) thread may be in the middle of a write
+        threading.Thread(
+            target=reopen_logs, args=(streams,), name="dmon-reopen"
+        ).start()
 
     # Set up signal handlers
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
-
-    # Start the child process with stdout/stderr redirected to the log
-    # env will be inherited from parent process
-    # cwd will be inherited from parent process
-    proc = subprocess.Popen(
-        cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT,
-        shell=shell,
-        text=False,  # binary mode
-        bufsize=0,  # unbuffered
-    )
+    _signal.signal(_signal.SIGINT, signal_handler)
+    _signal.signal(_signal.SIGTERM, signal_handler)
+    if hasattr(_signal, "SIGHUP"):
+        _signal.signal(_signal.SIGHUP, reopen_handler)
+
+    # Start the child process first, with stdout/stderr piped to the runner;
+    # the pump is only imported afterwards
+    proc, stdout_fd, stderr_fd = spawn(cmd, merge_stderr=stderr == "merge")
 
     logger.info(f"Started process {proc.pid} with command: {cmd} (shell={shell})")
+    logger.info(
+        f"Prepare for rotating logs: {log_path=} {max_log_size=} {rotate_log_path=} {max_rotate_log_size=} {index=} {compress=} {timestamps=} {log_format=} {stderr=} {stderr_log_path=} {dedup=} {max_lines_per_sec=} {max_bytes_per_sec=} {queue_size=} {overflow=} {flush=} {fsync=} {sinks=}"
+    )
 
-    make_file_dir(log_path)
-    loop_to_log(proc.stdout, log_path, max_log_size)
+    from .pump import (
+        LineFilter,
+        LineFormatter,
+        LogWriter,
+        OutputStream,
+        QueuedWriter,
+        RingBuffer,
+        dump_buffer,
+        get_counters,
+        handle_request,
+        loop_to_log,
+        reopen_logs,
+    )
 
+    def make_formatter(stream):
+        if timestamps or log_format == "json" or stderr == "tag":
+            return LineFormatter(
+                task=task,
+                stream=stream,
+                timestamps=timestamps,
+                json_format=log_format == "json",
+                tag=stderr == "tag" and log_format != "json",
+            )
+        return None
+
+    def make_filter():
+        if dedup or max_lines_per_sec or max_bytes_per_sec:
+            return LineFilter(dedup, max_lines_per_sec, max_bytes_per_sec)
+        return None
+
+    def make_writer(path):
+        writer = LogWriter(
+            path, max_log_size, index=index, compress=compress, flush=flush, fsync=fsync
+        )
+        if queue_size > 0:
+            return QueuedWriter(writer, queue_size, overflow)
+        return writer
+
+    sink_list = []
+    if sinks:
+        from .sinks import make_sink
+
+        for spec in sinks:
+            try:
+                sink_list.append(make_sink(spec, task=task, pid=proc.pid))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Failed to set up sink {spec}: {e}")
+
+    writer = make_writer(log_path)
+    streams = [
+        OutputStream(
+            "stdout",
+            stdout_fd,
+            writer,
+            make_formatter("stdout"),
+            make_filter(),
+            sink_list,
+            tee_fd=1 if tee else None,
+        )
+    ]
+    if stderr_fd is not None:
+        if stderr == "file":
+            stderr_writer = make_writer(stderr_log_path)
+        else:
+            stderr_writer = writer
+        streams.append(
+            OutputStream(
+                "stderr",
+                stderr_fd,
+                stderr_writer,
+                make_formatter("stderr"),
+                make_filter(),
+                sink_list,
+                tee_fd=2 if tee else None,
+            )
+        )
+
+    buffer = None
+    if buffer_size > 0 and buffer_lines > 0:
+        buffer = RingBuffer(buffer_size, buffer_lines)
+    if sock_path:
+        from .ipc import serve
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser(
-        description="Dmon task runner with log rotation utility",
-        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
-    )
-    parser.add_argument(
-        "command",
-        nargs=argparse.ONE_OR_MORE,
-        help="Command with arguments to run",
-    )
-    parser.add_argument("--shell", action="store_true", help="Run command in shell")
-    parser.add_argument("--log-path", help="Log file path", required=True)
-    parser.add_argument(
-        "--max-log-size",
-        help="Max log file size (MB); 0 for no rotation",
-        type=float,
-        default=5,
-    )
-    parser.add_argument(
-        "--rotate-log-path",
-        help="Path of the log output of this rotation process; if not provided, output to stdout",
-        default=None,
-    )
-    parser.add_argument(
-        "--max-rotate-log-size",
-        help="Max file size (MB) for this rotation log; 0 for no rotation",
-        type=float,
-        default=5,
-    )
-    args = parser.parse_args()
-    main(
-        " ".join(args.command) if args.shell else args.command,
-        args.log_path,
-        int(args.max_log_size * 1024 * 1024),
-        args.rotate_log_path,
-        int(args.max_rotate_log_size * 1024 * 1024),
-    )
+        try:
+            serve(
+                sock_path,
+                lambda request: handle_request(request, buffer, streams),
+            )
+            logger.info(f"Serving control socket on {sock_path}")
+        except OSError as e:
+            logger.warning(f"Failed to serve on {sock_path}: {e}")
+            sock_path = None
+
+    page = None
+    if stats_path:
+        from .statspage import StatsPage
+
+        try:
+            page = StatsPage(stats_path, os.getpid(), proc.pid)
+        except OSError as e:
+            logger.warning(f"Failed to create stats page {stats_path}: {e}")
+
+    try:
+        loop_to_log(streams, buffer=buffer, page=page)
+        returncode = proc.wait()
+        logger.info(f"Child process exited with code {returncode}")
+        if returncode != 0 and buffer is not None:
+            dump_buffer(buffer)
+        return returncode
+    finally:
+        for sink in sink_list:
+            sink.close()
+        for w in {id(stream.writer): stream.writer for stream in streams}.values():
+            w.close()
+        if page is not None:
+            page.update(pipe_backlog=0, **get_counters(streams))
+            page.close()
+        if sock_path:
+            from .ipc import remove_sock
+
+            remove_sock(sock_path)
+
+
+def get_exit_code(returncode):
+    # like a shell: 128 + N if the child was killed by signal N
+    if returncode is not None and returncode < 0:
+        return 128 - returncode
+    return returncode
+
+
+def run():
+    returncode = main(**load_options(sys.argv[1:]))
     logger.info("Process finished.")
+    sys.exit(get_exit_code(returncode))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,306 @@
+"""
+Network log sinks of the runner: besides the log file, output lines can be
+fanned out to a local collector over a Unix datagram / stream socket or TCP.
+
+Each sink has its own bounded queue and sender thread, so a slow or
+unreachable collector never blocks the log file: lines queued while the
+sender is busy are sent in one batch, and when the queue is full the oldest
+lines are dropped (and counted). A broken connection is re-established with
+backoff.
+
+Lines are sent either raw (as written to the log file) or as RFC 5424 syslog
+messages; on stream sockets, syslog messages are framed by octet counting
+(RFC 6587).
+
+NOTE: this module is imported by the runner; keep its imports minimal.
+"""
+
+from collections import deque
+import errno
+import os
+import socket
+import threading
+import time
+
+from .runlog import logger
+
+
+SINK_QUEUE_SIZE = 1.0
+"""Default size in MB of lines queued for a sink"""
+BATCH_MAX_BYTES = 256 * 1024
+"""Max bytes sent to a stream socket at once"""
+RETRY_MIN_INTERVAL = 0.1
+RETRY_MAX_INTERVAL = 5.0
+CLOSE_TIMEOUT = 2.0
+"""Max seconds to wait for queued lines to be sent at exit"""
+
+FACILITY_USER = 1
+SEVERITY = {"stdout": 6, "stderr": 3}  # informational / error
+
+
+class SocketSink:
+    """
+    Send output lines to a collector in a background thread.
+
+    kind: 'unix_dgram', 'unix_stream' or 'tcp'
+    target: socket path (Unix) or 'host:port' (TCP)
+    format: 'rfc5424' or 'raw'
+    """
+
+    def __init__(
+        self,
+        kind,
+        target,
+        format="rfc5424",
+        task="",
+        pid=0,
+        max_bytes=int(SINK_QUEUE_SIZE * 1024 * 1024),
+    ):
+        self.kind = kind
+        self.target = target
+        self.format = format
+        self.app_name = task or "dmon"
+        self.pid = pid
+        self.hostname = socket.gethostname() or "-"
+        self.max_bytes = max_bytes
+        self.partial = {}  # stream -> incomplete last line
+        self.queue = deque()
+        self.size = 0
+        self.cond = threading.Condition()
+        self.closing = False
+        self.closed = threading.Event()
+        self.cached_sec = None
+        self.cached_parts = ("", "")  # date and time, UTC offset of cached_sec
+        self.sock = None
+        self.sent_lines = 0
+        self.sent_bytes = 0
+        self.dropped_lines = 0
+        self.errors = 0
+        self.thread = threading.Thread(target=self.run, name="dmon-sink", daemon=True)
+        self.thread.start()
+
+    @property
+    def name(self):
+        return f"{self.kind}:{self.target}"
+
+    def write(self, data, stream="stdout"):
+        """
+        Queue the complete lines of data (called by the pump; never blocks on I/O).
+        """
+        data = self.partial.pop(stream, b"") + data
+        cut = data.rfind(b"\n") + 1
+        if cut < len(data):
+            self.partial[stream] = data[cut:]
+        if cut:
+            header = self.get_header(stream)
+            # split at newlines only, as lines are counted everywhere else
+            lines = data[: cut - 1].split(b"\n")
+            self.put([self.encode(line, header) for line in lines])
+
+    def finish(self):
+        """
+        Queue the incomplete last lines (at EOF).
+        """
+        for stream, data in self.partial.items():
+            header = self.get_header(stream)
+            self.put([self.encode(line, header) for line in data.split(b"\n")])
+        self.partial.clear()
+
+    def rfc3339_now(self) -> str:
+        """
+        The current time in RFC 3339, e.g. '2026-01-01T03:10:00.123456+08:00'.
+        The date, time and offset are only re-formatted once per second.
+        """
+        now = time.time()
+        sec = int(now)
+        if sec != self.cached_sec:
+            local = time.localtime(sec)
+            offset = time.strftime("%z", local)  # e.g. +0800
+            self.cached_sec = sec
+            self.cached_parts = (
+                time.strftime("%Y-%m-%dT%H:%M:%S", local),
+                f"{offset[:3]}:{offset[3:]}",
+            )
+        date_time, offset = self.cached_parts
+        return f"{date_time}.{int((now - sec) * 1_000_000):06d}{offset}"
+
+    def get_header(self, stream: str) -> bytes:
+        """
+        The syslog header of the lines of a chunk read at once (they share
+        the timestamp), or b"" for raw lines.
+        """
+        if self.format == "raw":
+            return b""
+        pri = FACILITY_USER * 8 + SEVERITY.get(stream, 6)
+        return f"<{pri}>1 {self.rfc3339_now()} {self.hostname} {self.app_name} {self.pid} {stream} - ".encode()
+
+    def encode(self, line: bytes, header: bytes) -> bytes:
+        if self.format == "raw":
+            return line + b"\n"
+        msg = header + line
+        if self.kind != "unix_dgram":
+            # octet-counting framing on streams
+            msg = f"{len(msg)} ".encode() + msg
+        return msg
+
+    def put(self, msgs):
+        with self.cond:
+            for msg in msgs:
+                self.queue.append(msg)
+                self.size += len(msg)
+            while self.size > self.max_bytes and self.queue:
+                # never block the pump: drop the oldest lines
+                self.size -= len(self.queue.popleft())
+                self.dropped_lines += 1
+            self.cond.notify()
+
+    def connect(self):
+        if self.kind == "tcp":
+            host, _, port = self.target.rpartition(":")
+            sock = socket.create_connection((host.strip("[]"), int(port)), timeout=5)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        else:
+            sock_type = (
+                socket.SOCK_DGRAM if self.kind == "unix_dgram" else socket.SOCK_STREAM
+            )
+            sock = socket.socket(socket.AF_UNIX, sock_type)
+            try:
+                sock.settimeout(5)
+                sock.connect(self.target)
+            except OSError:
+                sock.close()
+                raise
+        self.sock = sock
+        logger.info(f"Connected to sink {self.name}")
+
+    def disconnect(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+    def take_batch(self):
+        """
+        Take queued messages: all of them for datagrams (sent one by one),
+        up to BATCH_MAX_BYTES for streams.
+        """
+        batch = []
+        n_bytes = 0
+        while self.queue and (
+            self.kind == "unix_dgram" or not batch or n_bytes < BATCH_MAX_BYTES
+        ):
+            msg = self.queue.popleft()
+            batch.append(msg)
+            n_bytes += len(msg)
+        return batch
+
+    def send(self, batch):
+        """
+        Send a batch; return the number of messages done (sent or dropped)
+        before an error.
+        """
+        if self.kind == "unix_dgram":
+            for i, msg in enumerate(batch):
+                try:
+                    self.sock.send(msg)
+                    self.sent_lines += 1
+                except OSError as e:
+                    if e.errno == errno.EMSGSIZE:
+                        self.dropped_lines += 1  # too long for a datagram
+                        continue
+                    e.sent = i
+                    raise
+            return len(batch)
+        # a partially sent batch is resent; the collector may see duplicates
+        self.sock.sendall(b"".join(batch))
+        self.sent_lines += len(batch)
+        return len(batch)
+
+    def run(self):
+        interval = RETRY_MIN_INTERVAL
+        deadline = None
+        while True:
+            with self.cond:
+                while not self.queue and not self.closing:
+                    self.cond.wait()
+                if not self.queue:
+                    break
+                batch = self.take_batch()
+            sent = 0
+            try:
+                if self.sock is None:
+                    self.connect()
+                sent = self.send(batch)
+                interval = RETRY_MIN_INTERVAL
+            except (OSError, ValueError) as e:
+                sent = getattr(e, "sent", 0)
+                self.errors += 1
+                self.disconnect()
+                if interval == RETRY_MIN_INTERVAL:  # not while backing off
+                    logger.warning(f"Failed to send to sink {self.name}: {e}")
+            n_bytes = sum(len(msg) for msg in batch[:sent])
+            with self.cond:
+                self.sent_bytes += n_bytes
+                self.size -= n_bytes
+                # put back unsent messages, dropping the oldest if out of space
+                unsent = deque(batch[sent:])
+                while unsent and self.size > self.max_bytes:
+                    self.size -= len(unsent.popleft())
+                    self.dropped_lines += 1
+                self.queue.extendleft(reversed(unsent))
+                if sent < len(batch) and self.closing:
+                    if deadline is None:
+                        deadline = time.monotonic() + CLOSE_TIMEOUT
+                    if time.monotonic() > deadline:
+                        self.dropped_lines += len(self.queue)
+                        self.queue.clear()
+                        self.size = 0
+                        break
+            if sent < len(batch):
+                self.closed.wait(interval)
+                interval = min(interval * 2, RETRY_MAX_INTERVAL)
+        self.disconnect()
+
+    def close(self):
+        """
+        Send the remaining lines (giving up after CLOSE_TIMEOUT) and stop.
+        """
+        self.finish()
+        with self.cond:
+            self.closing = True
+            self.cond.notify()
+        self.closed.set()
+        self.thread.join()
+        logger.info(
+            f"Sink {self.name}: {self.sent_lines} lines sent, {self.dropped_lines} dropped"
+        )
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "connected": self.sock is not None,
+            "queued": self.size,
+            "sent_lines": self.sent_lines,
+            "sent_bytes": self.sent_bytes,
+            "dropped_lines": self.dropped_lines,
+            "errors": self.errors,
+        }
+
+
+def make_sink(spec: dict, task="", pid=0) -> SocketSink:
+    """
+    Make a sink from its config, e.g.
+    {'type': 'tcp', 'address': '127.0.0.1:5140', 'format': 'raw', 'queue_size': 1}
+    """
+    kind = spec["type"]
+    target = spec["address"] if kind == "tcp" else os.fspath(spec["path"])
+    return SocketSink(
+        kind,
+        target,
+        format=spec.get("format", "rfc5424"),
+        task=task,
+        pid=pid,
+        max_bytes=int(spec.get("queue_size", SINK_QUEUE_SIZE) * 1024 * 1024),
+    )
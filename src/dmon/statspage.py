@@ -0,0 +1,173 @@
+"""
+Stats page of the runner: a small fixed-layout file next to the meta file
+(`.dmon/<task>.stats`), memory-mapped by the runner and updated in place with
+its pump counters, so that `dmon status` and external scrapers can read them
+without a request to the runner.
+
+Layout (little-endian):
+
+    offset  size  field
+    0       8     magic b"DMONSTAT"
+    8       4     layout version
+    12      4     number of counters (N)
+    16      8     sequence number, odd while the counters are being updated
+    24      8*N   counters (unsigned 64-bit, see FIELDS)
+
+Readers retry until they see the same even sequence number before and after
+reading the counters (a seqlock). New counters are only appended, so readers
+of an older version can still read the ones they know.
+
+    python -m dmon.statspage .dmon/*.stats
+
+prints the counters of the given stats files as JSON.
+
+NOTE: this module is imported by the runner; keep its imports minimal.
+"""
+
+import os
+import struct
+import sys
+import time
+from typing import Dict, Optional
+
+from .constants import META_SUFFIX
+
+
+STATS_SUFFIX = ".stats"
+MAGIC = b"DMONSTAT"
+VERSION = 1
+PAGE_SIZE = 4096
+"""Size of the stats file, leaving room for more counters"""
+HEADER = struct.Struct("<8sIIQ")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 16
+FIELDS = (
+    "runner_pid",
+    "child_pid",
+    "started_ns",
+    "updated_ns",
+    "bytes_read",
+    "lines_read",
+    "bytes_written",
+    "rotations",
+    "write_blocked_ns",
+    "pipe_backlog",
+    "repeated_lines",
+    "dropped_lines",
+    "queued_bytes",
+    "lost_bytes",
+)
+"""
+Counters of the page, in layout order: timestamps in ns since the epoch,
+bytes / lines read from the child and written to the log files, log rotations,
+time the pump was blocked on writing output, bytes waiting in the child's
+output pipes (sampled), lines deduplicated / dropped by the rate limit, and
+bytes queued / lost by the log queue
+"""
+COUNTERS = struct.Struct(f"<{len(FIELDS)}Q")
+READ_RETRIES = 100
+
+
+def get_stats_path(meta_path: str) -> str:
+    """
+    Get the stats page path of a task: next to its meta file.
+    """
+    if meta_path.endswith(META_SUFFIX):
+        return meta_path[: -len(META_SUFFIX)] + STATS_SUFFIX
+    return meta_path + STATS_SUFFIX
+
+
+class StatsPage:
+    """
+    The writer side of a stats page. Only one thread may call update().
+    """
+
+    def __init__(self, path: str, runner_pid: int, child_pid: int):
+        import mmap
+
+        self.path = path
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, PAGE_SIZE)
+            self.mm = mmap.mmap(fd, PAGE_SIZE)
+        finally:
+            os.close(fd)
+        self.seq = 0
+        self.counters = dict.fromkeys(FIELDS, 0)
+        self.counters["runner_pid"] = runner_pid
+        self.counters["child_pid"] = child_pid
+        self.counters["started_ns"] = time.time_ns()
+        self.update()
+        # the magic goes last, so readers never see a half-initialized page
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, len(FIELDS), self.seq)
+
+    def update(self, **counters):
+        """
+        Set the given counters, with the update time, in place.
+        """
+        self.counters.update(counters)
+        self.counters["updated_ns"] = time.time_ns()
+        self.seq += 1
+        SEQ.pack_into(self.mm, SEQ_OFFSET, self.seq)
+        COUNTERS.pack_into(self.mm, HEADER.size, *self.counters.values())
+        self.seq += 1
+        SEQ.pack_into(self.mm, SEQ_OFFSET, self.seq)
+
+    def close(self):
+        # the file is kept with the final counters, until the meta file is removed
+        self.mm.close()
+
+
+def pipe_backlog(fd: int) -> int:
+    """
+    Bytes waiting to be read from a pipe (0 if unknown, e.g. on Windows).
+    """
+    try:
+        import fcntl
+        import termios
+    except ImportError:
+        return 0
+    buf = bytearray(4)
+    try:
+        fcntl.ioctl(fd, termios.FIONREAD, buf)
+    except OSError:
+        return 0
+    return int.from_bytes(buf, sys.byteorder)
+
+
+def read_stats(path: str) -> Optional[Dict[str, int]]:
+    """
+    Read the counters of a stats page; None if missing, invalid or
+    not readable consistently.
+    """
+    try:
+        with open(path, "rb") as f:
+            for _ in range(READ_RETRIES):
+                f.seek(0)
+                data = f.read(PAGE_SIZE)
+                if len(data) < HEADER.size:
+                    return None
+                magic, version, n_fields, seq = HEADER.unpack_from(data)
+                if magic != MAGIC or HEADER.size + 8 * n_fields > len(data):
+                    return None
+                f.seek(SEQ_OFFSET)
+                if seq % 2 == 0 and SEQ.unpack(f.read(SEQ.size))[0] == seq:
+                    n = min(n_fields, len(FIELDS))
+                    values = struct.unpack_from(f"<{n}Q", data, HEADER.size)
+                    return dict(zip(FIELDS, values))
+                time.sleep(0.001)
+    except (OSError, struct.error):
+        pass
+    return None
+
+
+def main():
+    import json
+
+    if len(sys.argv) < 2:
+        sys.exit("usage: python -m dmon.statspage <stats_path> [...]")
+    print(json.dumps({path: read_stats(path) for path in sys.argv[1:]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
-from dataclasses import asdict, dataclass, field
+from dataclasses import asdict, dataclass, field, fields
 import json
+import os
 from os import PathLike
 from pathlib import Path
 import sys
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
+
+from .utils import get_tmp_path
 
 
 if sys.version_info >= (3, 9):
@@ -33,12 +36,66 @@ class DmonTaskConfig:
     """Whether to rotate log file"""
     log_max_size: float = 5
     """Size in MB to rotate log file"""
+    log_index: bool = True
+    """Whether to keep a timestamp index next to log files (with log rotation)"""
+    log_compress: bool = False
+    """Whether to compress rotated log files"""
+    log_timestamps: bool = False
+    """Whether to prefix each output line with a timestamp (by the runner)"""
+    log_format: str = "text"
+    """Format of the log file: 'text' or 'json' (one JSON object per line, by the runner)"""
+    log_stderr: str = "merge"
+    """How to capture stderr: 'merge' into stdout, 'tag' each line with its stream, or write to a separate 'file'"""
+    stderr_log_path: str = ""
+    """Path to stderr log file (with log_stderr 'file'; default: '<log_path stem>.err.log')"""
+    log_dedup: bool = False
+    """Whether to collapse consecutive identical lines (by the runner)"""
+    log_rate_limit: Dict[str, float] = field(default_factory=dict)
+    """Rate limit of each output stream (by the runner): {'lines': lines/s, 'bytes': bytes/s}"""
+    log_queue_size: float = 0
+    """Size in MB of output queued in memory for a writer thread of the runner (0 to write synchronously)"""
+    log_overflow: str = "block"
+    """What to do when the log queue is full: 'block', 'drop_oldest' or 'drop_newest'"""
+    log_flush: str = "always"
+    """When the runner writes output to the log file: 'always', 'line', 'interval:<ms>' or 'size:<bytes>'"""
+    log_fsync: str = "never"
+    """When the runner fsyncs the log file: 'never', 'on_rotate' or 'interval:<ms>'"""
+    log_sinks: List[Dict[str, Any]] = field(default_factory=list)
+    """Network sinks the runner also sends output lines to, e.g. {'type': 'tcp', 'address': '127.0.0.1:5140', 'format': 'raw'}"""
+    log_buffer_size: float = 0.25
+    """Size in MB of recent output kept in memory by the runner (0 to disable)"""
+    log_buffer_lines: int = 1000
+    """Max number of lines of recent output kept in memory by the runner"""
+    launcher: str = "exec"
+    """How to start the process: 'exec', or 'forkserver' to fork Python tasks from a server with preloaded modules"""
+    preload: List[str] = field(default_factory=list)
+    """Modules the fork server imports before forking tasks (with launcher 'forkserver')"""
     rotate_log_path: str = ""
     """Path to rotation log file"""
     rotate_log_max_size: float = 5
     """Size in MB to rotation log file"""
     meta_path: str = ""
     """Path to meta file"""
+    tags: List[str] = field(default_factory=list)
+    """Tags to select the task by"""
+
+
+@dataclass
+class DmonConfig:
+    path: str = ""
+    """Path to the config file"""
+    tasks: Dict[str, DmonTaskConfig] = field(default_factory=dict)
+    """Validated task configs by name"""
+    errors: Dict[str, str] = field(default_factory=dict)
+    """Validation error messages of invalid tasks by name"""
+    default_task: Any = None
+    """Raw 'default_task' value (validated on use)"""
+    groups: Dict[str, List[str]] = field(default_factory=dict)
+    """Task groups: group name to list of task names or glob patterns"""
+    sorted_names: List[str] = field(default_factory=list)
+    """Index: all task names in sorted order (for prefix lookup of patterns)"""
+    tag_index: Dict[str, List[str]] = field(default_factory=dict)
+    """Index: tag to task names (in config order)"""
 
 
 @dataclass
@@ -48,16 +105,104 @@ class DmonMeta(DmonTaskConfig):
     popen_kwargs: Dict = field(default_factory=dict)
     create_time: float = -1
     create_time_human: str = "N/A"
+    sock_path: str = ""
+    """Path of the runner's control socket"""
+    stats_path: str = ""
+    """Path of the runner's stats page (see statspage.py)"""
 
     def dump(self, path: PathType):
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(asdict(self), f, indent=2, ensure_ascii=False)
+        """
+        Write the meta file atomically (to a temp file renamed over it),
+        so that concurrent readers never see a partial file.
+        """
+        p = Path(path)
+        tmp_path = get_tmp_path(p)
+        try:
+            with tmp_path.open("w", encoding="utf-8") as f:
+                json.dump(asdict(self), f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, p)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
     @staticmethod
     def load(path: PathType) -> Optional["DmonMeta"]:
+        """
+        Load a meta file, or None if it does not exist. Fields unknown to this
+        version (e.g. written by a newer dmon) are ignored.
+        Raise ValueError if the file is not a valid meta file.
+        """
         p = Path(path)
-        if p.exists():
+        try:
             with p.open("r", encoding="utf-8") as f:
                 data = json.load(f)
-                return DmonMeta(**data)
-        return None
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise ValueError(f"Invalid meta file {p}: {e}") from e
+        if not isinstance(data, dict):
+            raise ValueError(f"Invalid meta file {p}: not a JSON object")
+        names = {fld.name for fld in fields(DmonMeta)}
+        return DmonMeta(**{k: v for k, v in data.items() if k in names})
+
+
+@dataclass
+class TaskResult:
+    """Result of starting / stopping a task with dmon.api"""
+
+    task: str
+    """Name of the task"""
+    ok: bool
+    """Whether the operation succeeded"""
+    message: str = ""
+    """What happened (or why it failed), as the CLI would report it"""
+    meta: Optional[DmonMeta] = None
+    """Meta of the task's process, if known"""
+
+
+@dataclass
+class TaskStatus:
+    """Status of a task as seen by dmon.api"""
+
+    task: str
+    """Name of the task"""
+    meta_path: str
+    """Path of the task's meta file"""
+    running: bool = False
+    """Whether the process recorded in the meta file is still running"""
+    meta: Optional[DmonMeta] = None
+    """Meta of the task, or None if not started (or the meta file is invalid)"""
+    stats: Optional[Dict[str, int]] = None
+    """Pump counters of the runner's stats page, if any (see statspage.py)"""
+    error: str = ""
+    """Why the meta file could not be read, if invalid"""
+
+
+@dataclass
+class DmonAdmission:
+    """Admission control of bulk starts (see admission.py)"""
+
+    max_parallel: int = 0
+    """Max tasks initializing at the same time (0: unlimited)"""
+    init_time: float = 10.0
+    """Seconds a started task counts as initializing unless it exits earlier (> 0 with max_parallel)"""
+    stagger: float = 0.0
+    """Min seconds between two launches"""
+    jitter: float = 0.0
+    """Max random seconds added to each stagger"""
+    max_load: float = 0.0
+    """Hold launches while the 1-minute load average is above this (0: no gate)"""
+    min_available_mb: float = 0.0
+    """Hold launches while available memory (MB) is below this (0: no gate)"""
+    gate_timeout: float = 300.0
+    """Max seconds to hold a launch at the load / memory gate (0: no limit)"""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(
+            self.max_parallel
+            or self.stagger
+            or self.jitter
+            or self.max_load
+            or self.min_available_mb
+        )
@@ -1,8 +1,28 @@
+from contextlib import contextmanager
+import os
+from pathlib import Path
 import re
-from typing import Literal
+from typing import List, Literal, Optional, Sequence, Tuple, Union
+
+from .constants import ON_WINDOWS, PARAM_POLICIES
 
 
 ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+# quoted strings (in which most shell characters are literal)
+SHELL_QUOTED_RE = re.compile(r"'[^']*'|\"(?:[^\"\\]|\\.)*\"")
+# characters asking for shell features (expansion, redirection, control, ...)
+SHELL_META_RE = re.compile(r"[|&;<>()$`\\*?\[\]{}#~!\n]")
+# lists, pipelines and groups (but not redirections like '2>&1')
+SHELL_CONTROL_RE = re.compile(r"(?<![<>])[;&|]|\n|^\s*[({]")
+# words that must be run by the shell itself, even if an executable of the
+# same name exists (e.g. /usr/bin/cd, /usr/bin/read)
+SHELL_WORDS = {
+    "!", ".", ":", "[[", "alias", "bg", "break", "case", "cd", "command",
+    "continue", "declare", "eval", "exec", "exit", "export", "fc", "fg", "for",
+    "function", "getopts", "hash", "if", "jobs", "local", "read", "readonly",
+    "return", "select", "set", "shift", "source", "time", "trap", "type",
+    "typeset", "ulimit", "umask", "unalias", "unset", "until", "wait", "while",
+}  # fmt: skip
 
 
 def len_ansi(s: str) -> int:
@@ -30,3 +50,150 @@ def pad_ansi(
         return fill * left + s + fill * right
     else:
         raise ValueError(f"Invalid align: {align}")
+
+
+def format_size(n: float) -> str:
+    """
+    Human readable size, e.g. 1536 -> '1.5 KB'.
+    """
+    for unit in ["B", "KB", "MB"]:
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+
+def parse_policy(value: str, modes: Sequence[str]) -> Tuple[str, int]:
+    """
+    Parse a policy like 'always' or 'interval:100' into (mode, parameter),
+    where the parameter (0 if none) is a positive integer.
+    Raise ValueError if invalid.
+    """
+    mode, sep, param = value.partition(":")
+    if mode not in modes:
+        raise ValueError(f"unknown policy {value!r}")
+    if mode in PARAM_POLICIES:
+        if not param.isdigit() or int(param) <= 0:
+            raise ValueError(
+                f"policy {value!r} needs a positive integer, e.g. '{mode}:100'"
+            )
+        return mode, int(param)
+    if sep:
+        raise ValueError(f"policy {value!r} takes no parameter")
+    return mode, 0
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive advisory lock on the given lock file (created if missing)
+    for the duration of the context.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if ON_WINDOWS:
+            import msvcrt
+
+            # retries for ~10 seconds before raising OSError
+            msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            # released when the file descriptor is closed
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+    finally:
+        os.close(fd)
+
+
+def get_tmp_path(path: Path) -> Path:
+    """
+    Get a temp file path next to the given one, for an atomic write by
+    os.replace(). It is unique per thread, as threads of one process
+    (e.g. of dmon.api) may write the same file.
+    """
+    import threading
+
+    return path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def strip_quoted(cmd: str) -> str:
+    """
+    Remove quoted strings from a shell command, except for what is still
+    special in them ('$', '`' and '\\' in double quotes).
+    """
+    return SHELL_QUOTED_RE.sub(lambda m: re.sub(r"[^$`\\]", "", m[0][1:-1]), cmd)
+
+
+def split_simple_command(cmd: str) -> Optional[List[str]]:
+    """
+    Split a string command into words if it uses no shell features (outside
+    quotes), e.g. "python -c 'print(1)'"; return None otherwise.
+    The first word may still be a shell builtin.
+    """
+    import shlex
+
+    try:
+        words = shlex.split(cmd)
+    except ValueError:
+        return None  # e.g. unbalanced quotes
+    if not words or SHELL_META_RE.search(strip_quoted(cmd)) or "=" in words[0]:
+        return None
+    return words
+
+
+def is_executable(name: str, cwd: Optional[str] = None, path: Optional[str] = None):
+    """
+    Whether the command name is an existing executable: relative to cwd if it
+    contains a '/', otherwise found in PATH (`path`).
+    """
+    if "/" in name:
+        exe = os.path.join(cwd or ".", name)
+        return os.path.isfile(exe) and os.access(exe, os.X_OK)
+    import shutil
+
+    return shutil.which(name, path=path) is not None
+
+
+def resolve_command(
+    cmd: Union[str, List[str]], cwd: Optional[str] = None, path: Optional[str] = None
+) -> Union[str, List[str]]:
+    """
+    Avoid an intermediate shell process for a string command (POSIX only).
+
+    Only a command whose first word is an existing executable (not a shell
+    builtin or keyword) is changed: a simple one (plain or quoted arguments)
+    is split into a list to be executed directly, and a single one using
+    shell features (e.g. '$VAR' or '> file') gets an 'exec ' prefix so that
+    the shell is replaced by it. Anything else (pipelines, lists, builtins,
+    functions, ...) is returned as is. `cwd` and `path` (PATH) are used to
+    look up the executable.
+    """
+    if not isinstance(cmd, str) or ON_WINDOWS:
+        return cmd
+    words = split_simple_command(cmd)
+    simple = words is not None
+    if words is None:
+        import shlex
+
+        try:
+            words = shlex.split(cmd)
+        except ValueError:
+            return cmd  # let the shell report it
+    if (
+        not words
+        or words[0] in SHELL_WORDS
+        or "=" in words[0]
+        or not is_executable(words[0], cwd, path)
+    ):
+        return cmd
+    if simple:
+        return words
+    if SHELL_CONTROL_RE.search(strip_quoted(cmd)):
+        return cmd
+    return "exec " + cmd.lstrip()
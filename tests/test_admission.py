@@ -0,0 +1,90 @@
+import io
+import sys
+import unittest
+from unittest import mock
+
+from dmon.admission import AdmissionQueue
+from dmon.types import DmonAdmission, DmonMeta
+
+
+class FakeClock:
+    """
+    Stand-in for the time module, where sleeping advances the clock at once.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestAdmissionQueue(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.alive = True
+        for target, new in (
+            ("dmon.admission.time", self.clock),
+            ("dmon.admission.get_live_process", lambda meta: self.alive or None),
+            ("sys.stderr", io.StringIO()),
+        ):
+            patcher = mock.patch(target, new)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def launch(self, queue, task, wait=True, ok=True):
+        record = queue.admit(task, wait=wait)
+        queue.launched(record, DmonMeta(task=task) if ok else None, 0.0)
+        return record.waits
+
+    def test_slot_waits_for_init_time(self):
+        queue = AdmissionQueue(DmonAdmission(max_parallel=1, init_time=5))
+        self.assertEqual(self.launch(queue, "a")["slot"], 0)
+        self.clock.sleep(1)
+        self.assertAlmostEqual(self.launch(queue, "b")["slot"], 4)
+
+    def test_exited_task_frees_its_slot(self):
+        queue = AdmissionQueue(DmonAdmission(max_parallel=1, init_time=5))
+        self.launch(queue, "a")
+        self.alive = False
+        self.assertEqual(self.launch(queue, "b")["slot"], 0)
+
+    def test_failed_launch_takes_no_slot(self):
+        queue = AdmissionQueue(DmonAdmission(max_parallel=1, init_time=5, stagger=2))
+        self.launch(queue, "a", ok=False)
+        waits = self.launch(queue, "b")
+        self.assertEqual((waits["slot"], waits["stagger"]), (0, 0))
+
+    def test_stagger_since_previous_launch(self):
+        queue = AdmissionQueue(DmonAdmission(stagger=2))
+        self.assertEqual(self.launch(queue, "a")["stagger"], 0)
+        self.clock.sleep(0.5)
+        self.assertAlmostEqual(self.launch(queue, "b")["stagger"], 1.5)
+        self.clock.sleep(3)
+        self.assertEqual(self.launch(queue, "c")["stagger"], 0)
+
+    def test_no_wait(self):
+        queue = AdmissionQueue(DmonAdmission(max_parallel=1, init_time=5, stagger=2))
+        self.launch(queue, "a")
+        self.assertEqual(sum(self.launch(queue, "a", wait=False).values()), 0)
+        self.assertEqual(len(queue.records), 2)
+
+    def test_gate_holds_while_load_is_high(self):
+        loads = iter([(3.0, 0, 0), (3.0, 0, 0), (0.5, 0, 0)])
+        with mock.patch("dmon.admission.psutil.getloadavg", lambda: next(loads)):
+            queue = AdmissionQueue(DmonAdmission(max_load=1))
+            self.assertEqual(self.launch(queue, "a")["gate"], 2)
+        self.assertIn("Holding 'a': load average 3.00 > 1", sys.stderr.getvalue())
+
+    def test_gate_timeout(self):
+        with mock.patch("dmon.admission.psutil.getloadavg", lambda: (3.0, 0, 0)):
+            queue = AdmissionQueue(DmonAdmission(max_load=1, gate_timeout=3))
+            self.assertEqual(self.launch(queue, "a")["gate"], 3)
+        self.assertIn("starting 'a' anyway", sys.stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from dmon.api import TaskManager
+from dmon.constants import ON_WINDOWS
+
+
+@unittest.skipIf(ON_WINDOWS, "POSIX only")
+class TestTaskManager(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name).resolve()
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        patcher = mock.patch.dict(
+            os.environ, {"DMON_NO_CONFIG_CACHE": "1", "DMON_REGISTRY": ""}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        (self.dir / "dmon.yaml").write_text(
+            "tasks:\n  sleeper: sleep 30\n  quick: 'true'\n"
+        )
+        self.manager = TaskManager("dmon.yaml", timeout=5)
+        # never leave a task behind
+        self.addCleanup(self.manager.stop, "sleeper")
+
+    def test_start_status_stop(self):
+        result = self.manager.start("sleeper")
+        self.assertTrue(result.ok, result.message)
+        self.assertTrue((self.dir / ".dmon" / "sleeper.meta.json").exists())
+        status = self.manager.status("sleeper")
+        self.assertTrue(status.running)
+        self.assertEqual(status.meta.pid, result.meta.pid)
+        self.assertEqual([s.task for s in self.manager.list()], ["sleeper"])
+
+        again = self.manager.start("sleeper")
+        self.assertFalse(again.ok)
+        self.assertIn("already running", again.message)
+
+        self.assertTrue(self.manager.stop("sleeper").ok)
+        self.assertFalse(self.manager.status("sleeper").running)
+        self.assertEqual(self.manager.list(), [])
+
+    def test_stop_not_started(self):
+        result = self.manager.stop("sleeper")
+        self.assertFalse(result.ok)
+        self.assertIn("not found", result.message)
+
+    def test_stale_meta_file(self):
+        self.assertTrue(self.manager.start("quick").ok)
+        self.assertTrue(self.manager.wait("quick", timeout=10))
+        result = self.manager.start("quick")
+        self.assertFalse(result.ok)
+        self.assertIn("stale meta file", result.message)
+        # stop removes it, so the task can be started again
+        self.assertFalse(self.manager.stop("quick").ok)
+        self.assertTrue(self.manager.restart("quick").ok)
+        self.assertTrue(self.manager.wait("quick", timeout=10))
+
+    def test_selects_one_task(self):
+        with self.assertRaises(ValueError):
+            self.manager.status("*")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from dmon.cli import is_selector, select_task_names
+from dmon.constants import META_PATH_TEMPLATE
+from dmon.types import DmonMeta
+
+
+class TestSelectTaskNames(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(tmp.name)
+        self.addCleanup(os.chdir, cwd)
+        patcher = mock.patch.dict(os.environ, {"DMON_NO_CONFIG_CACHE": "1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_config(self):
+        Path("dmon.yaml").write_text(
+            "tasks:\n"
+            "  worker-1: work 1\n"
+            "  worker-2:\n    cmd: work 2\n    tags: [batch]\n"
+            "  web: serve\n"
+            "groups:\n  workers: ['worker-*']\n"
+        )
+
+    def start_adhoc(self, task):
+        meta_path = Path(META_PATH_TEMPLATE.format(task=task))
+        meta_path.parent.mkdir(exist_ok=True)
+        DmonMeta(task=task).dump(meta_path)
+
+    def test_is_selector(self):
+        self.assertTrue(is_selector("worker-*"))
+        self.assertTrue(is_selector("@workers"))
+        self.assertFalse(is_selector("web"))
+
+    def test_pattern_matches_config_and_meta_files(self):
+        self.write_config()
+        self.start_adhoc("worker-9")
+        self.assertEqual(
+            select_task_names(["worker-*"], [], None),
+            ["worker-9", "worker-1", "worker-2"],
+        )
+
+    def test_group_and_tag(self):
+        self.write_config()
+        self.assertEqual(
+            select_task_names(["@workers"], ["batch"], None), ["worker-1", "worker-2"]
+        )
+        self.assertEqual(select_task_names([], ["batch"], None), ["worker-2"])
+
+    def test_pattern_without_config(self):
+        self.start_adhoc("job-a")
+        self.assertEqual(select_task_names(["job-*"], [], None), ["job-a"])
+        with self.assertRaisesRegex(ValueError, "No task matches 'cron-\\*'"):
+            select_task_names(["cron-*"], [], None)
+        with self.assertRaises(FileNotFoundError):
+            select_task_names(["@workers"], [], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
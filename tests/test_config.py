@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from dmon.config import get_task_config, load_compiled_config, select_tasks
+from dmon.constants import CONFIG_CACHE_PATH, DEFAULT_META_DIR
+
+
+class TestTaskValidation(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "dmon.yaml"
+        self.path.write_text(
+            "tasks:\n  good: sleep 1\n  bad:\n    cmd: sleep 1\n    log_format: xml\n"
+        )
+        patcher = mock.patch.dict(os.environ, {"DMON_NO_CONFIG_CACHE": "1"})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_bad_task_does_not_block_good_one(self):
+        names, cfgs = get_task_config(["good"], str(self.path))
+        self.assertEqual(list(names), ["good"])
+        self.assertEqual(cfgs[0].cmd, "sleep 1")
+
+    def test_bad_task_reports_its_error(self):
+        with self.assertRaisesRegex(TypeError, "'log_format' field must be one of"):
+            get_task_config(["bad"], str(self.path))
+
+    def test_non_string_task_name(self):
+        self.path.write_text("tasks:\n  good: sleep 1\n  1: sleep 2\n  yes: sleep 3\n")
+        names, cfgs = get_task_config(["good"], str(self.path))
+        self.assertEqual(list(names), ["good"])
+        with self.assertRaisesRegex(TypeError, "must be a string"):
+            get_task_config(["1"], str(self.path))
+        with self.assertRaisesRegex(TypeError, "must be a string"):
+            get_task_config(None, str(self.path), all=True)
+
+
+class InTempDir(unittest.TestCase):
+    """
+    Run each test in a new temp directory (the meta directory and the config
+    cache are relative to the current directory).
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name).resolve()
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        self.addCleanup(os.chdir, cwd)
+        patcher = mock.patch.dict(os.environ, {"DMON_NO_CONFIG_CACHE": ""})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestTaskSelection(InTempDir):
+    def setUp(self):
+        super().setUp()
+        (self.dir / "dmon.yaml").write_text(
+            "tasks:\n"
+            "  web:\n    cmd: serve\n    tags: [Frontend]\n"
+            "  worker-2: work 2\n"
+            "  worker-1:\n    cmd: work 1\n    tags: [backend]\n"
+            "  db:\n    cmd: db\n    tags: [backend]\n"
+            "groups:\n"
+            "  workers: ['worker-*']\n"
+            "  all: ['@workers', web, db]\n"
+            "  loop: ['@loop']\n"
+        )
+
+    def select(self, selectors, tags=None):
+        return select_tasks(load_compiled_config(), selectors, tags)
+
+    def test_glob_in_config_order(self):
+        self.assertEqual(self.select(["worker-*"]), ["worker-2", "worker-1"])
+        self.assertEqual(self.select(["w*"]), ["web", "worker-2", "worker-1"])
+        self.assertEqual(self.select(["worker-[1]"]), ["worker-1"])
+
+    def test_groups(self):
+        self.assertEqual(self.select(["@workers"]), ["worker-2", "worker-1"])
+        self.assertEqual(self.select(["@all"]), ["worker-2", "worker-1", "web", "db"])
+        with self.assertRaisesRegex(ValueError, "references itself"):
+            self.select(["@loop"])
+        with self.assertRaisesRegex(ValueError, "Group 'missing' not found"):
+            self.select(["@missing"])
+
+    def test_tags_without_duplicates(self):
+        self.assertEqual(self.select([], ["BACKEND"]), ["worker-1", "db"])
+        self.assertEqual(self.select(["db"], ["frontend"]), ["db", "web"])
+        self.assertEqual(self.select(["worker-1"], ["backend"]), ["worker-1", "db"])
+        with self.assertRaisesRegex(ValueError, "No task tagged"):
+            self.select([], ["nothing"])
+
+    def test_no_match(self):
+        with self.assertRaisesRegex(ValueError, "No task matches"):
+            self.select(["cron-*"])
+        with self.assertRaisesRegex(ValueError, "Task 'cron' not found"):
+            self.select(["cron"])
+
+
+class TestConfigCache(InTempDir):
+    def write(self, path: Path, cmd: str):
+        path.write_text(f"tasks:\n  app: {cmd}\n")
+
+    def load_cmd(self):
+        return load_compiled_config().tasks["app"].cmd
+
+    def test_hit_skips_parsing(self):
+        DEFAULT_META_DIR.mkdir()
+        self.write(self.dir / "dmon.yaml", "sleep 1")
+        self.assertEqual(self.load_cmd(), "sleep 1")
+        self.assertTrue(CONFIG_CACHE_PATH.is_file())
+        with mock.patch("dmon.config.parse_config", side_effect=AssertionError):
+            self.assertEqual(self.load_cmd(), "sleep 1")
+
+    def test_invalidated_by_mtime(self):
+        DEFAULT_META_DIR.mkdir()
+        path = self.dir / "dmon.yaml"
+        self.write(path, "sleep 1")
+        self.assertEqual(self.load_cmd(), "sleep 1")
+        # same size, only the modification time differs
+        st = path.stat()
+        self.write(path, "sleep 2")
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        self.assertEqual(self.load_cmd(), "sleep 2")
+
+    def test_invalidated_by_new_config_in_parent(self):
+        child = self.dir / "a" / "b"
+        child.mkdir(parents=True)
+        self.write(self.dir / "dmon.yaml", "sleep 1")
+        os.chdir(child)
+        DEFAULT_META_DIR.mkdir()
+        self.assertEqual(self.load_cmd(), "sleep 1")
+        self.write(self.dir / "a" / "dmon.yaml", "sleep 2")
+        self.assertEqual(self.load_cmd(), "sleep 2")
+        self.assertEqual(load_compiled_config().path, str(self.dir / "a" / "dmon.yaml"))
+
+    def test_not_written_without_meta_dir(self):
+        self.write(self.dir / "dmon.yaml", "sleep 1")
+        self.assertEqual(self.load_cmd(), "sleep 1")
+        self.assertFalse(DEFAULT_META_DIR.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
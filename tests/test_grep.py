@@ -0,0 +1,82 @@
+import io
+from pathlib import Path
+import tempfile
+import unittest
+from unittest import mock
+
+from dmon.grep import (
+    compile_pattern,
+    grep_logs,
+    iter_matches,
+    make_jobs,
+)
+from dmon.logindex import INDEX_SUFFIX, IndexEntry, compress_segment, write_index
+from dmon.logs import select_ranges
+
+
+def write_segment(path: Path, name: str, n=1000, every=100):
+    data = b""
+    entries = []
+    for i in range(n):
+        if i % every == 0:
+            entries.append(IndexEntry(float(i), len(data), i, -1))
+        data += f"{name} line {i} {'ERROR' if i % 250 == 0 else 'ok'}\n".encode()
+    path.write_bytes(data)
+    write_index(str(path) + INDEX_SUFFIX, entries)
+
+
+class TestGrep(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log_path = Path(tmp.name) / "task.log"
+        seg1 = self.log_path.with_name("task.log.20240101-100000")
+        write_segment(seg1, "seg1")
+        compress_segment(seg1)
+        write_segment(self.log_path.with_name("task.log.20240101-110000"), "seg2")
+        write_segment(self.log_path, "live")
+        self.expected = [
+            f"{name} line {i} ERROR\n".encode()
+            for name in ("seg1", "seg2", "live")
+            for i in range(0, 1000, 250)
+        ]
+
+    def search(self, pattern, job_size, workers, **kwargs):
+        regex = compile_pattern(pattern, **kwargs)
+        jobs = make_jobs(select_ranges(self.log_path), job_size)
+        return jobs, [
+            line for lines in iter_matches(jobs, regex, workers) for line in lines
+        ]
+
+    def test_search_in_order(self):
+        jobs, lines = self.search("ERROR", job_size=1 << 20, workers=1)
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual(lines, self.expected)
+
+    def test_compressed_segment_split_into_jobs(self):
+        jobs, lines = self.search("error", job_size=4096, workers=2, ignore_case=True)
+        compressed = [job for job in jobs if job.compressed]
+        self.assertGreater(len(compressed), 1)
+        # jobs of a compressed segment start at index block boundaries
+        self.assertEqual(compressed[0].start, 0)
+        self.assertEqual(compressed[-1].end, None)
+        self.assertEqual(lines, self.expected)
+
+    def test_fixed_string(self):
+        _, lines = self.search("line 1 ", job_size=1 << 20, workers=1, fixed=True)
+        self.assertEqual(
+            lines, [f"{name} line 1 ok\n".encode() for name in ("seg1", "seg2", "live")]
+        )
+
+    def test_grep_logs_count(self):
+        stdout = io.TextIOWrapper(io.BytesIO())
+        with mock.patch("sys.stdout", stdout):
+            ret = grep_logs(self.log_path, "ERROR", count=True, workers=1)
+        self.assertEqual(ret, 0)
+        self.assertEqual(stdout.buffer.getvalue(), b"12\n")
+        with mock.patch("sys.stdout", io.TextIOWrapper(io.BytesIO())):
+            self.assertEqual(grep_logs(self.log_path, "nothing", workers=1), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import os
+import tempfile
+import unittest
+
+from dmon.ipc import get_sock_path, request, serve, sockets_supported
+
+
+class TestSockPath(unittest.TestCase):
+    def test_next_to_meta_file(self):
+        self.assertEqual(
+            get_sock_path("/srv/.dmon/web.meta.json"), "/srv/.dmon/web.sock"
+        )
+
+    def test_too_long_disables_socket(self):
+        meta_path = "/srv/" + "x" * 200 + "/.dmon/web.meta.json"
+        self.assertEqual(get_sock_path(meta_path), "")
+        self.assertIsNone(request("", "tail 10"))
+
+
+@unittest.skipUnless(sockets_supported(), "Unix sockets not supported")
+class TestServe(unittest.TestCase):
+    def test_request_response(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        sock_path = get_sock_path(os.path.join(tmp.name, "task.meta.json"))
+        serve(sock_path, lambda line: line.upper().encode())
+        self.assertEqual(request(sock_path, "tail 10"), b"TAIL 10")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+from pathlib import Path
+import tempfile
+import time
+import unittest
+
+from dmon.logindex import INDEX_SUFFIX, IndexEntry, compress_segment, write_index
+from dmon.logs import (
+    LogFollower,
+    iter_ranges,
+    list_segments,
+    select_ranges,
+    split_lines,
+    tail_lines,
+    tail_ranges,
+)
+
+R1 = time.mktime(time.strptime("20240101-100000", "%Y%m%d-%H%M%S"))
+"""Rotation time of the first (compressed) segment"""
+R2 = R1 + 3600
+"""Rotation time of the second (plain) segment"""
+
+
+def write_segment(path: Path, name: str, start: float, n=60, every=10):
+    """
+    Write n lines '<name> line <i>', line i at start + 60 * i, with an index
+    entry before every `every` lines (30 s before the line is written).
+    """
+    data = b""
+    entries = []
+    for i in range(n):
+        if i % every == 0:
+            entries.append(IndexEntry(start + 60 * i - 30, len(data), i, -1))
+        data += f"{name} line {i}\n".encode()
+    path.write_bytes(data)
+    write_index(str(path) + INDEX_SUFFIX, entries)
+
+
+def make_history(log_path: Path):
+    """
+    A log history of a compressed segment (rotated at R1), a plain one
+    (rotated at R2) and the live log, of 60 lines each, one per minute.
+    """
+    seg1 = log_path.with_name(log_path.name + ".20240101-100000")
+    write_segment(seg1, "seg1", R1 - 3600)
+    compress_segment(seg1)
+    write_segment(
+        log_path.with_name(log_path.name + ".20240101-110000"), "seg2", R2 - 3600
+    )
+    write_segment(log_path, "live", R2)
+
+
+class TestLineSplitting(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log_path = Path(tmp.name) / "task.log"
+
+    def test_split_lines_only_at_newline(self):
+        self.assertEqual(
+            split_lines(b"a\rb\nc\x0cd\n\x85e"), [b"a\rb\n", b"c\x0cd\n", b"\x85e"]
+        )
+        self.assertEqual(split_lines(b""), [])
+        self.assertEqual(split_lines(b"\n\n"), [b"\n", b"\n"])
+
+    def test_tail_lines_keeps_carriage_returns(self):
+        self.log_path.write_bytes(b"first\n10%\r50%\r100%\ndone\n")
+        self.assertEqual(tail_lines(self.log_path, 2), [b"10%\r50%\r100%\n", b"done\n"])
+
+    def test_tail_lines_across_blocks(self):
+        self.log_path.write_bytes(b"".join(b"line %d\r\n" % i for i in range(100)))
+        lines = tail_lines(self.log_path, 3, block_size=7)
+        self.assertEqual(lines, [b"line 97\r\n", b"line 98\r\n", b"line 99\r\n"])
+
+    def test_follower_keeps_carriage_returns(self):
+        self.log_path.write_bytes(b"")
+        follower = LogFollower(self.log_path)
+        self.addCleanup(follower.close)
+        with self.log_path.open("ab") as f:
+            f.write(b"a\rb\nc\r")
+        self.assertEqual(follower.poll(), [b"a\rb\n"])
+        with self.log_path.open("ab") as f:
+            f.write(b"d\n")
+        self.assertEqual(follower.poll(), [b"c\rd\n"])
+
+
+class TestLogHistory(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.log_path = Path(tmp.name) / "task.log"
+        make_history(self.log_path)
+
+    def read(self, since=None, until=None):
+        ranges = select_ranges(self.log_path, since, until)
+        return split_lines(b"".join(iter_ranges(ranges)))
+
+    def test_segments(self):
+        segments = list_segments(self.log_path)
+        self.assertEqual([seg.rotated_at for seg in segments], [R1, R2])
+        self.assertEqual([seg.compressed for seg in segments], [True, False])
+
+    def test_whole_history(self):
+        lines = self.read()
+        self.assertEqual(len(lines), 180)
+        self.assertEqual((lines[0], lines[-1]), (b"seg1 line 0\n", b"live line 59\n"))
+
+    def test_since_seeks_compressed_segment(self):
+        # to index granularity: from the block containing line 25
+        lines = self.read(since=R1 - 3600 + 25 * 60 + 1)
+        self.assertEqual(lines[0], b"seg1 line 20\n")
+        self.assertEqual(len(lines), 40 + 60 + 60)
+
+    def test_until_seeks_plain_segment(self):
+        lines = self.read(since=R1 + 60, until=R1 + 35 * 60)
+        self.assertEqual(lines[0], b"seg2 line 0\n")
+        self.assertEqual(lines[-1], b"seg2 line 39\n")
+
+    def test_window_in_live_log(self):
+        lines = self.read(since=R2 + 5 * 60 + 10, until=R2 + 15 * 60 + 10)
+        self.assertEqual(lines[0], b"live line 0\n")
+        self.assertEqual(lines[-1], b"live line 19\n")
+
+    def test_tail_across_segments(self):
+        ranges = select_ranges(self.log_path)
+        self.assertEqual(tail_ranges(ranges, 2), [b"live line 58\n", b"live line 59\n"])
+        lines = tail_ranges(ranges, 70)
+        self.assertEqual((lines[0], lines[-1]), (b"seg2 line 50\n", b"live line 59\n"))
+
+    def test_tail_compressed_across_blocks(self):
+        lines = tail_ranges(select_ranges(self.log_path, until=R1 - 1), 15)
+        self.assertEqual(lines, [f"seg1 line {i}\n".encode() for i in range(45, 60)])
+
+    def test_unindexed_segment_before_since_is_skipped(self):
+        seg2 = self.log_path.with_name(self.log_path.name + ".20240101-110000")
+        Path(str(seg2) + INDEX_SUFFIX).unlink()
+        unindexed = []
+        ranges = select_ranges(self.log_path, since=R2 + 1, unindexed=unindexed)
+        self.assertEqual([r.segment.path for r in ranges], [self.log_path])
+        self.assertEqual(unindexed, [])
+        # not narrowed down: read whole, and reported
+        ranges = select_ranges(self.log_path, since=R2 - 600, unindexed=unindexed)
+        self.assertEqual(ranges[0].segment.path, seg2)
+        self.assertEqual((ranges[0].start, ranges[0].end), (0, None))
+        self.assertEqual(unindexed, [seg2])
+
+
+if __name__ == "__main__":
+    unittest.main()
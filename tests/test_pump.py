@@ -0,0 +1,207 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from dmon.pump import LineFilter, LineFormatter, LogWriter, QueuedWriter
+
+
+class TestLineFormatter(unittest.TestCase):
+    def test_json_keeps_carriage_returns(self):
+        formatter = LineFormatter(task="web", json_format=True)
+        out = formatter.format(b"10%\r100%\nnext\x0cpage\n\npartial\r")
+        records = [json.loads(line) for line in out.splitlines()]
+        self.assertEqual(
+            [r["line"] for r in records], ["10%\r100%", "next\x0cpage", ""]
+        )
+        self.assertEqual(records[0]["task"], "web")
+        self.assertEqual(json.loads(formatter.finish())["line"], "partial\r")
+
+
+class TestLineFilter(unittest.TestCase):
+    def test_passes_complete_lines_only(self):
+        line_filter = LineFilter(dedup=True)
+        self.assertEqual(line_filter.filter(b"a\nb"), b"a\n")
+        self.assertEqual(line_filter.filter(b"c\n"), b"bc\n")
+        self.assertEqual(line_filter.filter(b"tail"), b"")
+        self.assertEqual(line_filter.finish(), b"tail")
+
+    def test_dedup_markers(self):
+        line_filter = LineFilter(dedup=True)
+        out = line_filter.filter(b"a\na\na\nb\n")
+        out += line_filter.filter(b"b\n")
+        out += line_filter.filter(b"c\n")
+        self.assertEqual(
+            out,
+            b"a\n[dmon] last line repeated 2 times\n"
+            b"b\n[dmon] last line repeated 1 time\nc\n",
+        )
+        self.assertEqual(line_filter.repeated_lines, 3)
+
+    def test_dedup_marker_at_finish(self):
+        line_filter = LineFilter(dedup=True)
+        out = line_filter.filter(b"a\na\n") + line_filter.finish()
+        self.assertEqual(out, b"a\n[dmon] last line repeated 1 time\n")
+
+    def test_rate_limit_drops_and_marks(self):
+        now = [100.0]
+        with mock.patch("dmon.pump.time.monotonic", lambda: now[0]):
+            line_filter = LineFilter(max_lines_per_sec=2)
+            out = line_filter.filter(b"1\n2\n3\n4\n")
+            self.assertEqual(out, b"1\n2\n")
+            self.assertEqual(line_filter.filter(b"5\n"), b"")
+            now[0] += 1
+            out = line_filter.filter(b"6\n")
+        self.assertEqual(out, b"[dmon] 3 lines dropped (rate limit)\n6\n")
+        self.assertEqual((line_filter.dropped_lines, line_filter.dropped_bytes), (3, 6))
+
+    def test_byte_limit_cuts_at_line_boundary(self):
+        with mock.patch("dmon.pump.time.monotonic", lambda: 100.0):
+            line_filter = LineFilter(max_bytes_per_sec=10)
+            self.assertEqual(line_filter.filter(b"abcd\nefgh\nij\n"), b"abcd\nefgh\n")
+            self.assertEqual(
+                line_filter.finish(), b"[dmon] 1 lines dropped (rate limit)\n"
+            )
+
+
+class TestLogWriter(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.log_path = os.path.join(tmp.name, "task.log")
+
+    def read(self, path=None):
+        with open(path or self.log_path, "rb") as f:
+            return f.read()
+
+    def make_writer(self, *args, **kwargs):
+        writer = LogWriter(self.log_path, *args, index=False, **kwargs)
+        self.addCleanup(writer.close)
+        return writer
+
+    def test_flush_always(self):
+        writer = self.make_writer(0)
+        writer.write(b"a\nb")
+        self.assertEqual(self.read(), b"a\nb")
+
+    def test_flush_line(self):
+        writer = self.make_writer(0, flush="line")
+        writer.write(b"a\nb")
+        self.assertEqual(self.read(), b"a\n")
+        self.assertEqual(writer.stats()["buffered"], 1)
+        writer.write(b"\n")
+        self.assertEqual(self.read(), b"a\nb\n")
+
+    def test_flush_size(self):
+        writer = self.make_writer(0, flush="size:8")
+        writer.write(b"abc\n")
+        self.assertEqual(self.read(), b"")
+        writer.write(b"defg\n")
+        self.assertEqual(self.read(), b"abc\ndefg\n")
+        writer.write(b"tail")
+        writer.close()
+        self.assertEqual(self.read(), b"abc\ndefg\ntail")
+
+    def test_rotates_at_line_boundary(self):
+        writer = self.make_writer(10)
+        writer.write(b"0123\n4567\n89")
+        self.assertEqual(writer.rotations, 1)
+        self.assertEqual(self.read(writer.rotated_name), b"0123\n4567\n")
+        self.assertEqual(self.read(), b"89")
+
+    def test_requested_rotation_waits_for_line_end(self):
+        writer = self.make_writer(0, flush="line")
+        writer.write(b"abc")
+        writer.request_rotation()
+        self.assertEqual(writer.rotations, 0)
+        writer.write(b"def\nghi")
+        self.assertEqual(writer.rotations, 1)
+        self.assertEqual(self.read(writer.rotated_name), b"abcdef\n")
+        writer.close()
+        self.assertEqual(self.read(), b"ghi")
+
+    def test_empty_log_is_not_rotated(self):
+        writer = self.make_writer(0)
+        writer.request_rotation()
+        self.assertEqual(writer.rotations, 0)
+        self.assertEqual(os.listdir(self.dir), ["task.log"])
+
+
+class StalledWriter:
+    """
+    A LogWriter stand-in whose first write blocks until released.
+    """
+
+    log_path = "stalled.log"
+
+    def __init__(self):
+        self.data = b""
+        self.stalled = threading.Event()
+        self.released = threading.Event()
+
+    def write(self, data):
+        if not self.stalled.is_set():
+            self.stalled.set()
+            self.released.wait(10)
+        self.data += data
+
+    def reopen(self):
+        pass
+
+    def close(self):
+        pass
+
+    def stats(self):
+        return {}
+
+
+class TestQueuedWriter(unittest.TestCase):
+    def make_writer(self, max_bytes, policy):
+        self.writer = StalledWriter()
+        queued = QueuedWriter(self.writer, max_bytes, policy)
+        # first chunk in flight; the queue only drains once released
+        queued.write(b"first\n")
+        self.assertTrue(self.writer.stalled.wait(10))
+        return queued
+
+    def finish(self, queued):
+        self.writer.released.set()
+        queued.close()
+        return self.writer.data
+
+    def test_drop_newest(self):
+        queued = self.make_writer(10, "drop_newest")
+        queued.write(b"second\n")
+        queued.write(b"abc\n")
+        self.assertEqual(
+            self.finish(queued),
+            b"first\n[dmon] 7 bytes lost (log queue full)\nabc\n",
+        )
+        self.assertEqual((queued.lost_bytes, queued.lost_lines), (7, 1))
+
+    def test_drop_oldest(self):
+        queued = self.make_writer(16, "drop_oldest")
+        queued.write(b"aaaa\n")
+        queued.write(b"bbbbbb\n")
+        self.assertEqual(
+            self.finish(queued),
+            b"first\n[dmon] 5 bytes lost (log queue full)\nbbbbbb\n",
+        )
+
+    def test_block(self):
+        queued = self.make_writer(10, "block")
+        writing = threading.Thread(target=queued.write, args=(b"second\n",))
+        writing.start()
+        writing.join(0.2)
+        self.assertTrue(writing.is_alive())
+        self.writer.released.set()
+        writing.join(10)
+        self.assertEqual(self.finish(queued), b"first\nsecond\n")
+        self.assertEqual(queued.lost_bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
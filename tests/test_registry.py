@@ -0,0 +1,53 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from dmon.registry import get_registry_path, load_registry, register, unregister
+from dmon.types import DmonMeta
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.dict(os.environ, {"DMON_STATE_DIR": tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.meta = DmonMeta(
+            task="web",
+            cmd="python app.py",
+            env={"API_TOKEN": "secret"},
+            meta_path="/srv/app/.dmon/web.meta.json",
+            pid=1234,
+            create_time=1.5,
+        )
+
+    def test_disabled_by_default(self):
+        with mock.patch.dict(os.environ, {"DMON_REGISTRY": ""}):
+            register(self.meta)
+        self.assertFalse(get_registry_path().exists())
+
+    def test_stores_only_listing_fields(self):
+        with mock.patch.dict(os.environ, {"DMON_REGISTRY": "1"}):
+            register(self.meta)
+        with get_registry_path().open() as f:
+            entry = json.load(f)[self.meta.meta_path]
+        self.assertNotIn("env", entry)
+        self.assertNotIn("secret", json.dumps(entry))
+        meta = load_registry()[self.meta.meta_path]
+        self.assertEqual(
+            (meta.task, meta.pid, meta.cmd), ("web", 1234, "python app.py")
+        )
+
+    def test_unregister_after_disabling(self):
+        with mock.patch.dict(os.environ, {"DMON_REGISTRY": "1"}):
+            register(self.meta)
+        with mock.patch.dict(os.environ, {"DMON_REGISTRY": "0"}):
+            unregister(self.meta.meta_path)
+        self.assertEqual(load_registry(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
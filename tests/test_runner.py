@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+import signal
+import subprocess
+import tempfile
+import time
+import unittest
+
+from dmon.constants import ON_WINDOWS
+from dmon.control import get_runner_command
+from dmon.runner import CONFIG_ENV, encode_options, get_exit_code
+
+
+class TestExitCode(unittest.TestCase):
+    def test_exit_code(self):
+        self.assertEqual(get_exit_code(0), 0)
+        self.assertEqual(get_exit_code(3), 3)
+        self.assertEqual(get_exit_code(-15), 143)
+
+
+@unittest.skipIf(ON_WINDOWS, "POSIX only")
+class TestRunner(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.log_path = self.dir / "task.log"
+
+    def start(self, cmd, **options):
+        options = {
+            "cmd": cmd,
+            "log_path": str(self.log_path),
+            "max_log_size": 0,
+            "rotate_log_path": None,
+            "max_rotate_log_size": 0,
+            "index": False,
+            **options,
+        }
+        env = {**os.environ, CONFIG_ENV: encode_options(options)}
+        return subprocess.Popen(
+            get_runner_command(),
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+
+    def test_exits_with_child_code(self):
+        proc = self.start("echo out; exit 3")
+        stdout, _ = proc.communicate(timeout=10)
+        self.assertEqual(proc.returncode, 3)
+        self.assertEqual(self.log_path.read_bytes(), b"out\n")
+
+    def test_tee_without_runner_log_is_quiet(self):
+        proc = self.start("echo out; echo err >&2", tee=True)
+        stdout, stderr = proc.communicate(timeout=10)
+        # stderr is merged into stdout by default
+        self.assertEqual((stdout, stderr), (b"out\nerr\n", b""))
+        self.assertEqual(self.log_path.read_bytes(), b"out\nerr\n")
+
+    def test_signal_exit_code(self):
+        proc = self.start("echo started; exec sleep 30", tee=True)
+        self.assertEqual(proc.stdout.readline(), b"started\n")
+        time.sleep(0.2)  # let the child exec
+        proc.send_signal(signal.SIGTERM)
+        proc.communicate(timeout=10)
+        self.assertEqual(proc.returncode, 128 + signal.SIGTERM)
+
+
+if __name__ == "__main__":
+    unittest.main()
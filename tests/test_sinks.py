@@ -0,0 +1,44 @@
+import os
+import socket
+import tempfile
+import unittest
+
+from dmon.sinks import SocketSink
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets not supported")
+class TestSocketSink(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "collector.sock")
+        self.collector = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.addCleanup(self.collector.close)
+        self.collector.bind(self.path)
+        self.collector.settimeout(5)
+
+    def receive(self, n):
+        return [self.collector.recv(65536) for _ in range(n)]
+
+    def test_raw_lines_split_at_newlines_only(self):
+        sink = SocketSink("unix_dgram", self.path, format="raw")
+        self.addCleanup(sink.close)
+        sink.write(b"10%\r100%\nstart")
+        sink.write(b" end\n")
+        self.assertEqual(self.receive(2), [b"10%\r100%\n", b"start end\n"])
+        sink.write(b"tail\r")
+        sink.finish()
+        self.assertEqual(self.receive(1), [b"tail\r\n"])
+
+    def test_rfc5424_header(self):
+        sink = SocketSink("unix_dgram", self.path, task="web", pid=42)
+        self.addCleanup(sink.close)
+        sink.write(b"hello\n", stream="stderr")
+        msg = self.receive(1)[0]
+        self.assertTrue(msg.startswith(b"<"))
+        self.assertIn(b" web 42 ", msg)
+        self.assertTrue(msg.endswith(b"hello"))
+
+
+if __name__ == "__main__":
+    unittest.main()
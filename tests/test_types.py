@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import tempfile
+import unittest
+
+from dmon.types import DmonMeta
+
+
+class TestMetaDump(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+
+    def test_round_trip(self):
+        path = self.dir / "web.meta.json"
+        DmonMeta(task="web", cmd=["sleep", "1"], pid=42).dump(path)
+        meta = DmonMeta.load(path)
+        self.assertEqual((meta.task, meta.cmd, meta.pid), ("web", ["sleep", "1"], 42))
+
+    def test_concurrent_dumps_from_threads(self):
+        path = self.dir / "web.meta.json"
+
+        def dump(pid):
+            DmonMeta(task="web", pid=pid).dump(path)
+
+        with ThreadPoolExecutor(8) as executor:
+            list(executor.map(dump, range(200)))
+        self.assertIn(DmonMeta.load(path).pid, range(200))
+        self.assertEqual([p.name for p in self.dir.iterdir()], ["web.meta.json"])
+
+    def test_load_missing_and_invalid(self):
+        self.assertIsNone(DmonMeta.load(self.dir / "missing.meta.json"))
+        path = self.dir / "bad.meta.json"
+        path.write_text("{not json")
+        with self.assertRaises(ValueError):
+            DmonMeta.load(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
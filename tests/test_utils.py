@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from dmon.constants import ON_WINDOWS
+from dmon.utils import resolve_command
+
+
+@unittest.skipIf(ON_WINDOWS, "POSIX only")
+class TestResolveCommand(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.app = os.path.join(self.dir, "app")
+        with open(self.app, "w") as f:
+            f.write("#!/bin/sh\n")
+        os.chmod(self.app, 0o755)
+
+    def resolve(self, cmd):
+        return resolve_command(cmd, cwd=self.dir, path=self.dir)
+
+    def test_simple_command_is_split(self):
+        self.assertEqual(self.resolve("app -m 'a b'"), ["app", "-m", "a b"])
+        self.assertEqual(self.resolve("./app x"), ["./app", "x"])
+
+    def test_shell_features_get_exec(self):
+        self.assertEqual(self.resolve("app $HOME > out"), "exec app $HOME > out")
+        self.assertEqual(self.resolve("  app 2>&1"), "exec app 2>&1")
+
+    def test_lists_and_pipelines_unchanged(self):
+        for cmd in ["app; app", "app | app", "app && app", "(app)", "app &"]:
+            self.assertEqual(self.resolve(cmd), cmd)
+
+    def test_non_executables_unchanged(self):
+        for cmd in [
+            "read x",
+            "local a=1",
+            "return 0",
+            "cd /tmp",
+            "missing --flag",
+            "missing $HOME",
+            "$APP x",
+            "FOO=1 app",
+            "./missing x",
+        ]:
+            self.assertEqual(self.resolve(cmd), cmd)
+
+    def test_list_command_unchanged(self):
+        self.assertEqual(self.resolve(["app", "x"]), ["app", "x"])
+
+
+if __name__ == "__main__":
+    unittest.main()